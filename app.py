@@ -1,31 +1,30 @@
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, session, flash, make_response
+from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, session, flash, make_response, Response, stream_with_context
 import os
+import json
+import time
 import traceback
 from werkzeug.utils import secure_filename
 from functools import wraps
-import threading
+import hashlib
+import html
 import secrets
 from datetime import datetime, timedelta
+import metrics
 from config import Config
-from database.db_manager import DatabaseManager
+from database.db_manager import DatabaseManager, SNIPPET_START, SNIPPET_END
+from database.status_notifier import StatusNotifier, ACTIVE_STATUSES
+from database.stage_timeline import layout_timeline, summarize_report
 from processors.video_handler import VideoHandler
-from processors.transcriber import Transcriber
-from processors.note_generator import NoteGenerator
 
 app = Flask(__name__)
 app.config.from_object(Config)
 app.secret_key = Config.SECRET_KEY
 
 # Initialize components
+# Processing itself runs in worker.py; the web app only queues jobs
 Config.init_app()
 db = DatabaseManager()
-video_handler = VideoHandler()
-transcriber = Transcriber()
-note_generator = NoteGenerator()
-
-# Track active processing threads
-active_processes = {}  # {video_id: {'thread': thread_obj, 'cancel': threading.Event()}}
-process_lock = threading.Lock()
+status_notifier = StatusNotifier(db, interval=Config.STATUS_POLL_INTERVAL)
 
 
 def login_required(f):
@@ -44,6 +43,27 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
 
+def save_upload(uploaded_file, file_path, chunk_size=1024 * 1024):
+    """
+    Save an uploaded file while hashing it
+
+    Returns:
+        str: content key ('sha256:<hex>') for the artifact cache
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, 'wb') as f:
+        for chunk in iter(lambda: uploaded_file.stream.read(chunk_size), b''):
+            sha256.update(chunk)
+            f.write(chunk)
+    return f"sha256:{sha256.hexdigest()}"
+
+
+def youtube_content_key(url):
+    """Artifact cache key for a YouTube URL ('youtube:<video id>'), or None"""
+    youtube_id = VideoHandler.extract_youtube_id(url)
+    return f"youtube:{youtube_id}" if youtube_id else None
+
+
 # Context processor to make current_user available in templates
 @app.context_processor
 def inject_user():
@@ -53,6 +73,27 @@ def inject_user():
     return {'current_user': None}
 
 
+@app.template_filter('seconds')
+def format_seconds(value):
+    """Format a duration in seconds for display (850ms, 42.3s, 7m 05s, 1h 02m)"""
+    if value is None:
+        return '–'
+    if value < 1:
+        return f"{value * 1000:.0f}ms"
+    if value < 60:
+        return f"{value:.1f}s"
+    minutes, seconds = divmod(int(round(value)), 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{minutes // 60}h {minutes % 60:02d}m"
+
+
+@app.before_request
+def start_metrics():
+    """Start writing this process's metrics (gunicorn workers are forked after import)"""
+    metrics.registry.start()
+
+
 # Check for remember me token before each request
 @app.before_request
 def check_remember_me():
@@ -222,157 +263,6 @@ def history():
     return render_template('history.html', videos=videos)
 
 
-def process_video_background(video_id, source, is_file, file_path, cancel_event):
-    """Background task to process video"""
-    try:
-        # Step 1: Extract audio (10-30%)
-        print(f"\n{'='*50}")
-        print(f"STEP 1: Extracting audio [Video ID: {video_id}]")
-        print(f"{'='*50}")
-
-        db.update_processing_status(video_id, 'extracting', progress=10)
-
-        # Check for cancellation
-        if cancel_event.is_set():
-            raise Exception("Processing cancelled by user")
-
-        # Progress: Processing source
-        db.update_processing_status(video_id, 'extracting', progress=15)
-
-        metadata = video_handler.process_source(
-            source,
-            is_file=is_file,
-            file_path=file_path
-        )
-
-        # Progress: Audio extracted
-        db.update_processing_status(video_id, 'extracting', progress=25)
-
-        # Check for cancellation
-        if cancel_event.is_set():
-            video_handler.cleanup_audio(metadata.get('audio_path'))
-            raise Exception("Processing cancelled by user")
-
-        # Update video metadata
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE videos
-            SET title = ?, creator = ?, duration = ?, source_url = ?
-            WHERE id = ?
-        ''', (metadata['title'], metadata.get('channel'), metadata.get('duration'),
-              metadata.get('url'), video_id))
-        conn.commit()
-        conn.close()
-
-        # Progress: Metadata saved
-        db.update_processing_status(video_id, 'extracting', progress=28)
-
-        db.update_processing_status(video_id, 'transcribing', progress=30)
-
-        # Step 2: Transcribe audio (30-60%)
-        print(f"\n{'='*50}")
-        print(f"STEP 2: Transcribing audio [Video ID: {video_id}]")
-        print(f"{'='*50}")
-
-        # Check for cancellation
-        if cancel_event.is_set():
-            video_handler.cleanup_audio(metadata['audio_path'])
-            raise Exception("Processing cancelled by user")
-
-        # Progress: Loading transcription model
-        db.update_processing_status(video_id, 'transcribing', progress=35)
-
-        # Progress: Starting transcription
-        db.update_processing_status(video_id, 'transcribing', progress=40)
-
-        transcript_result = transcriber.transcribe(metadata['audio_path'])
-        transcript_text = transcript_result['transcript_text']
-
-        # Progress: Transcription complete
-        db.update_processing_status(video_id, 'transcribing', progress=55)
-
-        # Check for cancellation
-        if cancel_event.is_set():
-            video_handler.cleanup_audio(metadata['audio_path'])
-            raise Exception("Processing cancelled by user")
-
-        # Save transcript
-        db.create_transcript(
-            video_id,
-            transcript_text,
-            transcript_result.get('timestamps')
-        )
-
-        # Progress: Transcript saved
-        db.update_processing_status(video_id, 'transcribing', progress=58)
-
-        db.update_processing_status(video_id, 'generating', progress=60)
-
-        # Step 3: Generate notes (60-100%)
-        print(f"\n{'='*50}")
-        print(f"STEP 3: Generating notes [Video ID: {video_id}]")
-        print(f"{'='*50}")
-
-        # Check for cancellation
-        if cancel_event.is_set():
-            video_handler.cleanup_audio(metadata['audio_path'])
-            raise Exception("Processing cancelled by user")
-
-        # Progress: Analyzing transcript
-        db.update_processing_status(video_id, 'generating', progress=70)
-
-        # Progress: Generating notes
-        db.update_processing_status(video_id, 'generating', progress=80)
-
-        notes = note_generator.generate_notes(transcript_text, metadata)
-
-        # Progress: Formatting notes
-        db.update_processing_status(video_id, 'generating', progress=90)
-
-        # Check for cancellation
-        if cancel_event.is_set():
-            video_handler.cleanup_audio(metadata['audio_path'])
-            raise Exception("Processing cancelled by user")
-
-        # Save notes
-        db.create_notes(video_id, notes)
-
-        # Progress: Saving notes
-        db.update_processing_status(video_id, 'generating', progress=95)
-
-        db.update_processing_status(video_id, 'completed', progress=100)
-
-        # Cleanup
-        video_handler.cleanup_audio(metadata['audio_path'])
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-
-        print(f"\n{'='*50}")
-        print(f"✓ Processing completed successfully! [Video ID: {video_id}]")
-        print(f"{'='*50}\n")
-
-    except Exception as e:
-        error_msg = str(e)
-        is_cancelled = "cancelled" in error_msg.lower()
-
-        print(f"\n❌ {'Cancelled' if is_cancelled else 'Error'} processing video {video_id}: {error_msg}")
-        if not is_cancelled:
-            traceback.print_exc()
-
-        db.update_processing_status(
-            video_id,
-            'cancelled' if is_cancelled else 'failed',
-            progress=0,
-            error_message=error_msg
-        )
-    finally:
-        # Remove from active processes
-        with process_lock:
-            if video_id in active_processes:
-                del active_processes[video_id]
-
-
 @app.route('/process', methods=['POST'])
 @login_required
 def process():
@@ -397,46 +287,63 @@ def process():
 
             filename = secure_filename(uploaded_file.filename)
             file_path = os.path.join(Config.TEMP_DIR, filename)
-            uploaded_file.save(file_path)
+            content_key = save_upload(uploaded_file, file_path)
             source = filename
         else:
             source = youtube_url
+            content_key = youtube_content_key(youtube_url)
+
+        # Known video: show its real title right away instead of 'Processing...'
+        cached_metadata = None
+        if not is_file and content_key:
+            cached_metadata = db.get_video_metadata(content_key, Config.METADATA_CACHE_TTL)
 
         # Create video record
         video_id = db.create_video(
             user_id=session['user_id'],
             source_url=source if source_type == 'youtube' else None,
             source_type=source_type,
-            title='Processing...',
+            title=cached_metadata['title'] if cached_metadata else 'Processing...',
+            creator=cached_metadata['channel'] if cached_metadata else None,
+            duration=cached_metadata['duration'] if cached_metadata else None,
         )
 
+        # Same content processed before: reuse its transcript and notes
+        artifact = db.get_artifact(content_key) if content_key else None
+        if artifact:
+            db.apply_artifact(video_id, artifact, title=source if is_file else None)
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+
+            print(f"✓ Reused stored results for video {video_id} ({content_key})")
+            # Finished here, so there is no job for the client to watch
+            return jsonify({
+                'success': True,
+                'video_id': video_id,
+                'title': db.get_video(video_id)['title'],
+                'message': 'This content was processed before - notes are ready.',
+                'processing': False
+            })
+
         # Initialize processing status
         db.update_processing_status(video_id, 'pending', progress=5)
 
-        # Create cancel event and start background processing
-        cancel_event = threading.Event()
-        thread = threading.Thread(
-            target=process_video_background,
-            args=(video_id, source, is_file, file_path, cancel_event),
-            daemon=True
-        )
+        # Queue for a worker to pick up (attaches to an identical in-flight job if there is one)
+        job = db.enqueue_job(video_id, source, is_file=bool(is_file), file_path=file_path,
+                             content_key=content_key)
 
-        # Track the thread
-        with process_lock:
-            active_processes[video_id] = {
-                'thread': thread,
-                'cancel': cancel_event
-            }
-
-        thread.start()
-
-        print(f"✓ Started background processing for video {video_id}")
+        if job['state'] == 'attached':
+            print(f"✓ Attached video {video_id} to in-flight job {job['leader_job_id']}")
+            message = 'The same content is already processing - your notes will be ready when it finishes.'
+        else:
+            print(f"✓ Queued job {job['id']} for video {video_id}")
+            message = 'Processing queued in background. You can navigate away and check progress later.'
 
         # Return immediately
         return jsonify({
             'success': True,
             'video_id': video_id,
-            'message': 'Processing started in background. You can navigate away and check progress later.',
+            'message': message,
             'processing': True
         })
 
@@ -451,15 +358,83 @@ def process():
 @app.route('/notes/<int:video_id>')
 @login_required
 def view_notes(video_id):
-    """View generated notes"""
+    """View generated notes, or the notes written so far while they are being generated"""
     video = db.get_video(video_id)
-    notes = db.get_notes(video_id)
 
     # Verify ownership
-    if not video or not notes or video['user_id'] != session['user_id']:
+    if not video or video['user_id'] != session['user_id']:
+        return "Notes not found", 404
+
+    notes = db.get_notes(video_id)
+    if notes:
+        return render_template('notes.html', video=video, notes=notes)
+
+    # Not finished: show what has streamed in so far (also after an interrupted generation)
+    status = db.get_processing_status(video_id)
+    partial = db.get_partial_notes(video_id)
+    if not partial and not (status and status['status'] in ACTIVE_STATUSES):
         return "Notes not found", 404
 
-    return render_template('notes.html', video=video, notes=notes)
+    return render_template('notes.html', video=video, notes=None, partial=partial, status=status)
+
+
+@app.route('/notes/<int:video_id>/stream')
+@login_required
+def notes_stream(video_id):
+    """
+    Server-Sent Events stream of a video's notes while they are generated
+
+    'notes' events carry the partial notes ({"content"} for a new snapshot,
+    or {"append"} when it only grew), 'status' events the processing status.
+    The stream ends with a 'done' event once the finished notes are saved,
+    or after the status event of a failed or cancelled job.
+    """
+    video = db.get_video(video_id)
+    if not video or video['user_id'] != session['user_id']:
+        return "Video not found", 404
+
+    def generate():
+        yield 'retry: 3000\n\n'
+        since = None
+        content = ''
+        last_status = None
+        deadline = time.monotonic() + Config.STATUS_STREAM_MAX_SECONDS
+        keepalive_at = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            progress = db.get_notes_progress(video_id, since)
+            if not progress:
+                return
+
+            if progress['updated_at'] is not None:
+                since = progress['updated_at']
+                if content and progress['content'].startswith(content):
+                    data = {'append': progress['content'][len(content):]}
+                else:
+                    data = {'content': progress['content']}
+                content = progress['content']
+                yield f"event: notes\ndata: {json.dumps(data)}\n\n"
+
+            status = {key: progress[key] for key in ('status', 'progress', 'error_message')}
+            if status != last_status:
+                last_status = status
+                yield f"event: status\ndata: {json.dumps(status)}\n\n"
+
+            if status['status'] == 'completed':
+                yield 'event: done\ndata: {}\n\n'
+                return
+            if status['status'] not in ACTIVE_STATUSES:
+                return
+
+            if time.monotonic() >= keepalive_at:
+                keepalive_at = time.monotonic() + 15
+                yield ': keepalive\n\n'
+            time.sleep(Config.STATUS_POLL_INTERVAL)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/transcript/<int:video_id>')
@@ -485,6 +460,29 @@ def view_transcript(video_id):
     return render_template('transcript.html', video=video, transcript=transcript)
 
 
+@app.route('/timeline/<int:video_id>')
+@login_required
+def view_timeline(video_id):
+    """Where a video's processing time went, stage by stage (every attempt)"""
+    video = db.get_video(video_id)
+
+    # Verify ownership
+    if not video or video['user_id'] != session['user_id']:
+        return "Video not found", 404
+
+    timeline = layout_timeline(db.get_processing_events(video_id))
+    return render_template('timeline.html', video=video, **timeline)
+
+
+@app.route('/reports/time')
+@login_required
+def time_report():
+    """Where processing time went per day and per stage, over the user's videos"""
+    days = min(max(request.args.get('days', 14, type=int), 1), 90)
+    report = summarize_report(db.get_time_report(days, user_id=session['user_id']))
+    return render_template('time_report.html', days=days, stages=report['stages'], report_days=report['days'])
+
+
 @app.route('/download/<int:video_id>')
 @login_required
 def download_notes(video_id):
@@ -567,6 +565,85 @@ def get_status(video_id):
     })
 
 
+def parse_video_ids(value):
+    """Parse a comma-separated list of video IDs from a query parameter"""
+    return [int(part) for part in (value or '').split(',') if part.strip().isdigit()]
+
+
+def format_status(status):
+    """Status dict as returned by the status endpoints"""
+    return {
+        'video_id': status['video_id'],
+        'title': status['title'],
+        'status': status['status'],
+        'progress': status['progress'],
+        'error_message': status.get('error_message')
+    }
+
+
+@app.route('/status/stream')
+@login_required
+def status_stream():
+    """
+    Server-Sent Events stream of status changes for all of the user's active
+    videos (plus any listed in ?ids=), replacing per-video polling
+    """
+    user_id = session['user_id']
+    video_ids = parse_video_ids(request.args.get('ids'))
+
+    def generate():
+        # Subscribe before reading the initial state so no change is missed
+        subscription = status_notifier.subscribe(user_id)
+        try:
+            yield 'retry: 3000\n\n'
+            for status in db.get_active_processing_statuses([user_id], video_ids):
+                yield f"data: {json.dumps(format_status(status))}\n\n"
+
+            # Close periodically; EventSource reconnects on its own
+            deadline = time.monotonic() + Config.STATUS_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                changes = subscription.get(timeout=15)
+                if not changes:
+                    yield ': keepalive\n\n'
+                    continue
+                for status in changes:
+                    yield f"data: {json.dumps(format_status(status))}\n\n"
+        finally:
+            status_notifier.unsubscribe(subscription)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/status/bulk')
+@login_required
+def get_bulk_status():
+    """Status of all of the user's active videos (plus any listed in ?ids=) in one request"""
+    video_ids = parse_video_ids(request.args.get('ids'))
+    statuses = db.get_active_processing_statuses([session['user_id']], video_ids)
+    return jsonify([format_status(status) for status in statuses])
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint: pipeline metrics of every web and worker process"""
+    if not Config.METRICS_ENABLED:
+        return Response('Metrics are disabled\n', status=404, mimetype='text/plain')
+    if Config.METRICS_TOKEN and not secrets.compare_digest(
+            request.headers.get('Authorization', ''), f'Bearer {Config.METRICS_TOKEN}'):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+    # Queue depth comes straight from the jobs table at scrape time
+    jobs = db.count_jobs_by_state()
+    queue = ('voice2note_jobs', 'Jobs in the queue by state (attached = waiting on an identical job)',
+             [((('state', state),), count) for state, count in jobs.items()])
+    return Response(metrics.render(extra_gauges=[queue]),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/api/videos')
 @login_required
 def api_videos():
@@ -575,18 +652,32 @@ def api_videos():
     return jsonify(videos)
 
 
+def highlight_snippet(snippet):
+    """Escape a search snippet and wrap its matched terms in <mark>"""
+    escaped = html.escape(snippet or '')
+    return escaped.replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+
+
 @app.route('/api/search')
 @login_required
 def api_search():
-    """API endpoint to search videos"""
-    query = request.args.get('q', '')
-    user_id = session['user_id']
+    """API endpoint to search titles, transcripts and notes"""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
 
-    # Get user's videos and filter by query
-    videos = db.get_user_videos(user_id, limit=100)
-    filtered = [v for v in videos if query.lower() in v['title'].lower() or
-                (v.get('creator') and query.lower() in v['creator'].lower())]
-    return jsonify(filtered)
+    results, has_more = db.search_videos(session['user_id'], query,
+                                         limit=per_page, offset=(page - 1) * per_page)
+    for result in results:
+        result['snippet'] = highlight_snippet(result['snippet'])
+
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more,
+        'results': results
+    })
 
 
 @app.route('/cancel/<int:video_id>', methods=['POST'])
@@ -605,32 +696,24 @@ def cancel_processing(video_id):
             return jsonify({'success': False, 'error': 'No processing status found'}), 404
 
         # Check if video is in a cancellable state
-        processing_states = ['pending', 'extracting', 'transcribing', 'generating']
-        if status['status'] not in processing_states:
+        if status['status'] not in ACTIVE_STATUSES:
             return jsonify({'success': False, 'error': f'Cannot cancel video with status: {status["status"]}'}), 400
 
-        # Try to cancel active thread if it exists
-        with process_lock:
-            if video_id in active_processes:
-                # Set cancel flag for active thread
-                active_processes[video_id]['cancel'].set()
-
-                # Immediately update database status to prevent duplicate cancellations
-                db.update_processing_status(video_id, 'cancelled', progress=0,
-                                          error_message='Cancelled by user')
-
-                # Remove from active processes immediately
-                del active_processes[video_id]
-
-                print(f"✓ Cancelled active thread for video {video_id}")
-                return jsonify({'success': True, 'message': 'Processing cancelled'})
-            else:
-                # Thread reference lost (server restart, crashed thread, etc.)
-                # Directly update database to mark as cancelled
-                db.update_processing_status(video_id, 'cancelled', progress=0,
-                                          error_message='Cancelled by user (thread reference lost)')
-                print(f"✓ Marked video {video_id} as cancelled in database (no active thread found)")
-                return jsonify({'success': True, 'message': 'Processing cancelled (thread was not found, status updated)'})
+        # Flag the job; the worker running it notices on its next heartbeat
+        cancelled_jobs = db.request_job_cancel(video_id)
+
+        # Immediately update database status to prevent duplicate cancellations
+        if cancelled_jobs:
+            db.update_processing_status(video_id, 'cancelled', progress=0,
+                                        error_message='Cancelled by user')
+            print(f"✓ Requested cancellation of video {video_id}")
+            return jsonify({'success': True, 'message': 'Processing cancelled'})
+        else:
+            # No queued or running job (e.g. processed before the job queue existed)
+            db.update_processing_status(video_id, 'cancelled', progress=0,
+                                        error_message='Cancelled by user (no active job found)')
+            print(f"✓ Marked video {video_id} as cancelled in database (no active job found)")
+            return jsonify({'success': True, 'message': 'Processing cancelled (no active job was found, status updated)'})
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -639,7 +722,13 @@ def cancel_processing(video_id):
 @app.route('/restart/<int:video_id>', methods=['POST'])
 @login_required
 def restart_processing(video_id):
-    """Restart processing of a failed or cancelled video"""
+    """
+    Restart processing of a failed or cancelled video
+
+    With regenerate=true (form or query) the video is processed from scratch:
+    stored results for the same content and cached model responses are not reused.
+    """
+    regenerate = request.values.get('regenerate', '').lower() in ('true', '1', 'yes')
     try:
         # Verify ownership
         video = db.get_video(video_id)
@@ -660,27 +749,22 @@ def restart_processing(video_id):
         if is_file:
             return jsonify({'success': False, 'error': 'Cannot restart local file uploads - please re-upload the file'}), 400
 
+        # Same content processed since (e.g. by another user): reuse it, unless asked to regenerate
+        content_key = youtube_content_key(source)
+        artifact = db.get_artifact(content_key) if content_key and not regenerate else None
+        if artifact:
+            db.apply_artifact(video_id, artifact)
+            print(f"✓ Restarted video {video_id} from stored results ({content_key})")
+            return jsonify({'success': True, 'message': 'Processing restarted', 'video_id': video_id})
+
         # Reset processing status
         db.update_processing_status(video_id, 'pending', progress=5)
 
-        # Start background processing
-        cancel_event = threading.Event()
-        thread = threading.Thread(
-            target=process_video_background,
-            args=(video_id, source, is_file, file_path, cancel_event),
-            daemon=True
-        )
-
-        # Track the thread
-        with process_lock:
-            active_processes[video_id] = {
-                'thread': thread,
-                'cancel': cancel_event
-            }
-
-        thread.start()
+        # Queue for a worker to pick up
+        db.enqueue_job(video_id, source, is_file=is_file, file_path=file_path, content_key=content_key,
+                       regenerate=regenerate)
 
-        print(f"✓ Restarted processing for video {video_id}")
+        print(f"✓ Restarted processing for video {video_id}{' (regenerating)' if regenerate else ''}")
 
         return jsonify({'success': True, 'message': 'Processing restarted', 'video_id': video_id})
 
@@ -698,10 +782,8 @@ def delete_video(video_id):
         if not video or video['user_id'] != session['user_id']:
             return jsonify({'success': False, 'error': 'Video not found'}), 404
 
-        # Cancel if currently processing
-        with process_lock:
-            if video_id in active_processes:
-                active_processes[video_id]['cancel'].set()
+        # Cancel if currently processing; a running job's worker also stops on finding its job row gone
+        db.request_job_cancel(video_id)
 
         db.delete_video(video_id)
         return jsonify({'success': True, 'message': 'Video deleted successfully'})
@@ -752,8 +834,15 @@ if __name__ == '__main__':
     print(f"Notes directory: {Config.NOTES_DIR}")
     print(f"Whisper model: {Config.WHISPER_MODEL}")
     print(f"Ollama model: {Config.OLLAMA_MODEL}")
+    print(f"Embedded worker: {'enabled' if Config.EMBEDDED_WORKER else 'disabled (run worker.py)'}")
     print(f"{'='*60}\n")
 
+    # The development server processes jobs in-process; production runs worker.py
+    # (avoid starting a second worker in the reloader's parent process)
+    if Config.EMBEDDED_WORKER and (not Config.DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        from worker import JobWorker
+        JobWorker().start()
+
     app.run(
         host=Config.HOST,
         port=Config.PORT,
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: token-budgeted, segment-aware chunker vs the old '. ' splitter
+
+Builds a synthetic transcript of whisper segments (with timestamps and
+yt-dlp style chapters) and chunks it with processors.chunker.chunk_transcript
+and with the character splitter it replaced. Reports chunking time, chunk
+sizes in estimated tokens, how many chunks exceed the budget, how many cuts
+fall mid-sentence, and how many chapter starts are also chunk starts.
+
+The chunker's guarantees are checked over randomized inputs by
+tests/test_chunker.py.
+
+Usage:
+    python benchmarks/chunker_benchmark.py [--chars 500000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fixtures import whisper_segments
+from config import Config
+from processors.chunker import chunk_transcript, estimate_tokens, SENTENCE_END_CHARS
+
+
+def old_chunk_transcript(transcript_text, chunk_size=5000):
+    """The character chunker notes used before (Transcriber.chunk_transcript), for comparison"""
+    if len(transcript_text) <= chunk_size:
+        return [transcript_text]
+
+    chunks = []
+    sentences = transcript_text.split('. ')
+    current_chunk = ""
+
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) < chunk_size:
+            current_chunk += sentence + ". "
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = sentence + ". "
+
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+
+    return chunks
+
+
+def mid_sentence_cuts(chunks):
+    """Chunks (except the last) that don't end at the end of a sentence"""
+    return sum(1 for chunk in chunks[:-1] if not chunk.rstrip().endswith(SENTENCE_END_CHARS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transcript chunker benchmark')
+    parser.add_argument('--chars', type=int, default=500000, help='Transcript length')
+    parser.add_argument('--max-tokens', type=int, default=Config.NOTES_CHUNK_TOKENS, help='Token budget per chunk')
+    parser.add_argument('--overlap-tokens', type=int, default=Config.NOTES_CHUNK_OVERLAP_TOKENS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs (best is reported)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    text, segments, chapters = whisper_segments(args.chars, seed=args.seed)
+    max_chars = int(args.max_tokens * Config.LLM_CHARS_PER_TOKEN)
+
+    def best_of(function):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - start)
+        return result, min(timings)
+
+    old_chunks, old_seconds = best_of(lambda: old_chunk_transcript(text, max_chars))
+    new_chunks, new_seconds = best_of(lambda: chunk_transcript(text, segments, chapters, max_tokens=args.max_tokens,
+                                                               overlap_tokens=args.overlap_tokens))
+
+    # Chapters whose first segment starts a chunk (the first chapter always does)
+    chapter_openings = []
+    for chapter in chapters:
+        start_ms = int(chapter['start_time'] * 1000)
+        chapter_openings.append(next(segment['text'].strip() for segment in segments
+                                     if segment['offsets']['from'] >= start_ms))
+
+    def aligned(texts):
+        return sum(1 for opening in chapter_openings if any(chunk.startswith(opening) for chunk in texts))
+
+    def row(texts, seconds):
+        tokens = [estimate_tokens(chunk) for chunk in texts]
+        return {
+            'ms': round(seconds * 1000, 1),
+            'chunks': len(texts),
+            'mean_tokens': round(sum(tokens) / len(tokens)),
+            'max_tokens': max(tokens),
+            'over_budget': sum(1 for count in tokens if count > args.max_tokens),
+            'mid_sentence_cuts': mid_sentence_cuts(texts),
+            'chapters_aligned': aligned(texts),
+        }
+
+    results = {
+        'transcript_chars': len(text),
+        'segments': len(segments),
+        'chapters': len(chapters),
+        'budget_tokens': args.max_tokens,
+        'old': row(old_chunks, old_seconds),
+        'new': row([chunk['text'] for chunk in new_chunks], new_seconds),
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"\nTranscript: {len(text)} characters, {len(segments)} segments, {len(chapters)} chapters, "
+          f"{args.max_tokens}-token budget")
+    print(f"{'':26}{'ms':>8}{'chunks':>8}{'mean tok':>10}{'max tok':>9}{'over':>6}{'mid-sent':>10}{'chapters':>10}")
+    for name, label in (('old', "Old '. ' splitter"), ('new', 'Segment-aware chunker')):
+        r = results[name]
+        chapters_cell = f"{r['chapters_aligned']}/{len(chapters)}"
+        print(f"{label:26}{r['ms']:>8.1f}{r['chunks']:>8}{r['mean_tokens']:>10}{r['max_tokens']:>9}"
+              f"{r['over_budget']:>6}{r['mid_sentence_cuts']:>10}{chapters_cell:>10}")
+
+
+if __name__ == '__main__':
+    main()
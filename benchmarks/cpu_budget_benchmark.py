@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark: whisper-cli thread sizing with the CPU budget (processors/cpu_budget.py)
+
+Simulates concurrent whisper-cli runs on a machine with --cores cores, so
+core contention can be studied on any machine (a real run needs a machine
+with the cores and whisper.cpp). Runs are sized by:
+
+- fixed: --threads 4 for every run (as before)
+- budget: a CpuBudget lease per run, sized when the run starts
+- budget+pin: the same with WHISPER_PIN_CPUS, so runs are bound to their
+  lease's cores and spread back out when another run finishes
+
+Each of --concurrency submitters transcribes one file after another
+(lengths vary around --minutes), until --jobs files are done. A run's speed
+follows Amdahl's law in its thread count (--parallel-fraction of the work
+scales with threads). Unpinned threads share all cores evenly; pinned
+threads share their own cores. Threads beyond the cores also lose
+--switch-penalty of their speed per extra thread per core, to
+context switching and cache thrashing.
+
+Reports per policy and concurrency: audio hours transcribed per hour, mean
+job latency and average busy cores. With few jobs per submitter the
+results are dominated by the last, longest files, whose thread counts
+were fixed when they started. Asserts that a lease never exceeds
+WHISPER_MAX_THREADS or the core count, and that a lone run gets every core
+up to that cap.
+
+Usage:
+    python benchmarks/cpu_budget_benchmark.py [--cores 16] [--concurrency 1,2,4,8,16] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import numpy as np
+from processors.cpu_budget import CpuBudget, CpuLease
+
+FIXED_THREADS = 4
+
+
+class FixedThreads:
+    """The old sizing: every run gets FIXED_THREADS threads, on no particular cores"""
+
+    pin = False
+
+    def __init__(self, cores):
+        self.cpus = list(range(cores))
+        self.leases = []
+
+    def acquire(self):
+        lease = CpuLease(FIXED_THREADS, [])
+        self.leases.append(lease)
+        return lease
+
+    def release(self, lease):
+        self.leases.remove(lease)
+
+
+def make_budget(cores, max_threads, pin):
+    budget = CpuBudget(max_threads=max_threads, pin=False)
+    budget.cpus = list(range(cores))  # The simulated machine, not this one
+    budget.pin = pin  # No processes are started, so nothing is really pinned
+    return budget
+
+
+def speeds(runs, policy, cores, parallel_fraction, switch_penalty):
+    """Audio seconds per second of each run, from the threads and cores the runs hold right now"""
+    def amdahl(threads):
+        return 1 / ((1 - parallel_fraction) + parallel_fraction / threads)
+
+    def contention(threads_per_core):
+        return 1 / (threads_per_core * (1 + switch_penalty * (threads_per_core - 1))) if threads_per_core > 1 else 1
+
+    if policy.pin:
+        usage = {cpu: 0 for cpu in range(cores)}
+        for run in runs:
+            for cpu in run['lease'].cpus:
+                usage[cpu] += run['lease'].threads / len(run['lease'].cpus)
+        return [amdahl(run['lease'].threads) / run['rtf']
+                * np.mean([contention(usage[cpu]) for cpu in run['lease'].cpus]) for run in runs]
+
+    total_threads = sum(run['lease'].threads for run in runs)
+    share = contention(total_threads / cores)
+    return [amdahl(run['lease'].threads) * share / run['rtf'] for run in runs]
+
+
+def simulate(policy, args, concurrency, cores):
+    """Run the closed-loop workload against a sizing policy; returns its results"""
+    rng = np.random.default_rng(args.seed)
+    lengths = rng.lognormal(np.log(args.minutes * 60), 0.5, size=args.jobs)
+    submitted = 0
+    now = 0.0
+    runs = []
+    latencies = []
+    busy_core_seconds = 0.0
+
+    def start():
+        nonlocal submitted
+        lease = policy.acquire()
+        assert 1 <= lease.threads <= min(args.max_threads, cores) or isinstance(policy, FixedThreads), \
+            f"lease of {lease.threads} threads"
+        runs.append({'lease': lease, 'remaining': lengths[submitted], 'started': now, 'rtf': args.rtf})
+        submitted += 1
+
+    for _ in range(min(concurrency, args.jobs)):
+        start()
+    if concurrency == 1 and not isinstance(policy, FixedThreads):
+        assert runs[0]['lease'].threads == min(args.max_threads, cores), 'a lone run did not get the free cores'
+
+    while runs:
+        rates = speeds(runs, policy, cores, args.parallel_fraction, args.switch_penalty)
+        step, finished = min((run['remaining'] / rate, index) for index, (run, rate) in enumerate(zip(runs, rates)))
+        for run, rate in zip(runs, rates):
+            run['remaining'] -= rate * step
+        busy_core_seconds += min(cores, sum(run['lease'].threads for run in runs)) * step
+        now += step
+
+        run = runs.pop(finished)
+        policy.release(run['lease'])
+        latencies.append(now - run['started'])
+        if submitted < args.jobs:
+            start()
+
+    return {
+        'audio_hours_per_hour': round(lengths.sum() / now, 2),
+        'mean_latency': round(float(np.mean(latencies)), 1),
+        'busy_cores': round(busy_core_seconds / now, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CPU budget thread sizing benchmark (simulated cores)')
+    parser.add_argument('--cores', type=int, default=16, help='Cores of the simulated machine')
+    parser.add_argument('--concurrency', default='1,2,4,8,16', help='Comma-separated concurrent transcriptions')
+    parser.add_argument('--jobs', type=int, default=256, help='Files transcribed per run')
+    parser.add_argument('--minutes', type=float, default=30, help='Typical file length')
+    parser.add_argument('--rtf', type=float, default=1.0, help='Seconds per audio second on one thread')
+    parser.add_argument('--max-threads', type=int, default=8, help='WHISPER_MAX_THREADS')
+    parser.add_argument('--parallel-fraction', type=float, default=0.9,
+                        help='Share of whisper.cpp\'s work that scales with threads')
+    parser.add_argument('--switch-penalty', type=float, default=0.05,
+                        help='Speed lost per extra thread on a core')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    policies = {
+        'fixed': lambda: FixedThreads(args.cores),
+        'budget': lambda: make_budget(args.cores, args.max_threads, pin=False),
+        'budget+pin': lambda: make_budget(args.cores, args.max_threads, pin=True),
+    }
+    results = {name: {concurrency: simulate(make(), args, concurrency, args.cores) for concurrency in levels}
+               for name, make in policies.items()}
+
+    if args.json:
+        print(json.dumps({'cores': args.cores, 'max_threads': args.max_threads, 'results': results}))
+        return
+
+    print(f"\n{args.cores} simulated cores, {args.jobs} files of ~{args.minutes:g} min, "
+          f"WHISPER_MAX_THREADS={args.max_threads}")
+    for key, title, fmt in (('audio_hours_per_hour', 'Audio hours per hour', '.2f'),
+                            ('mean_latency', 'Mean latency (s)', '.0f'),
+                            ('busy_cores', 'Busy cores (average)', '.1f')):
+        print(f"\n{title:<20}" + ''.join(f"{name:>12}" for name in policies))
+        for concurrency in levels:
+            print(f"{concurrency:>4} at once{'':8}"
+                  + ''.join(f"{results[name][concurrency][key]:>12{fmt}}" for name in policies))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: DatabaseManager hot paths with and without the connection pool
+
+Measures single-threaded ops/sec for get_video, get_processing_status and
+update_processing_status, then a mixed workload (status writers plus
+history/status readers on several threads) counting "database is locked"
+errors. "before" opens a fresh connection per call with the default
+rollback journal; "after" uses the pooled WAL connections.
+
+Usage:
+    python benchmarks/db_benchmark.py [--seconds 2] [--threads 8]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from database.db_manager import DatabaseManager
+
+
+def setup_database(db_path, pooled, videos=200):
+    """Create a database with one user and some videos with status rows"""
+    db = DatabaseManager(db_path, pooled=pooled)
+    db.init_database()
+    user_id = db.create_user('bench', 'bench@example.com', 'password')
+    video_ids = []
+    for i in range(videos):
+        video_id = db.create_video(user_id, None, 'youtube', f'Video {i}')
+        db.update_processing_status(video_id, 'transcribing', progress=40)
+        video_ids.append(video_id)
+    return db, user_id, video_ids
+
+
+def ops_per_second(func, seconds):
+    """Call func repeatedly for about `seconds` and return calls per second"""
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            func(calls)
+            calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def mixed_workload(db, user_id, video_ids, seconds, threads):
+    """Writers update status while readers load history and status; returns ops/sec and lock errors"""
+    stop = threading.Event()
+    counts = {'ops': 0, 'locked': 0}
+    lock = threading.Lock()
+
+    def writer(offset):
+        i = offset
+        while not stop.is_set():
+            try:
+                db.update_processing_status(video_ids[i % len(video_ids)], 'transcribing', progress=i % 100)
+                with lock:
+                    counts['ops'] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts['locked'] += 1
+            i += 1
+
+    def reader(offset):
+        i = offset
+        while not stop.is_set():
+            try:
+                db.get_user_videos(user_id, limit=50)
+                video_id = video_ids[i % len(video_ids)]
+                db.get_video(video_id)
+                db.get_processing_status(video_id)
+                with lock:
+                    counts['ops'] += 3
+            except sqlite3.OperationalError:
+                with lock:
+                    counts['locked'] += 1
+            i += 1
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(max(1, threads // 4))]
+    workers += [threading.Thread(target=reader, args=(i,)) for i in range(threads - len(workers))]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    return counts['ops'] / (time.perf_counter() - start), counts['locked']
+
+
+def run(pooled, work_dir, seconds, threads):
+    db_path = os.path.join(work_dir, f"{'pooled' if pooled else 'unpooled'}.db")
+    db, user_id, video_ids = setup_database(db_path, pooled)
+    n = len(video_ids)
+
+    results = {
+        'get_video': ops_per_second(lambda i: db.get_video(video_ids[i % n]), seconds),
+        'get_processing_status': ops_per_second(lambda i: db.get_processing_status(video_ids[i % n]), seconds),
+        'update_processing_status': ops_per_second(
+            lambda i: db.update_processing_status(video_ids[i % n], 'transcribing', progress=i % 100), seconds),
+    }
+    results['mixed_ops'], results['mixed_locked_errors'] = mixed_workload(db, user_id, video_ids, seconds, threads)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Database connection pool benchmark')
+    parser.add_argument('--seconds', type=float, default=2, help='Duration of each measurement')
+    parser.add_argument('--threads', type=int, default=8, help='Threads in the mixed workload')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        before = run(False, work_dir, args.seconds, args.threads)
+        after = run(True, work_dir, args.seconds, args.threads)
+
+    if args.json:
+        print(json.dumps({'before': before, 'after': after}))
+        return
+
+    print(f"\n{'Operation':<28}{'before':>12}{'after':>12}{'speedup':>10}")
+    for name in before:
+        if name == 'mixed_locked_errors':
+            print(f"{name:<28}{before[name]:>12}{after[name]:>12}")
+        else:
+            print(f"{name + ' (ops/s)':<28}{before[name]:>12.0f}{after[name]:>12.0f}{after[name] / before[name]:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-video download vs audio-only streaming for YouTube sources
+
+Runs VideoHandler.download_youtube_audio against a local fixture server
+(benchmarks/fixture_server.py) through the stub yt-dlp and ffmpeg in
+benchmarks/stubs. "before" downloads the muxed 1080p video, converts it and
+deletes it (YT_DLP_STREAM_AUDIO off); "after" pipes the audio-only format
+straight into ffmpeg. Reports wall time, bytes fetched from the server and
+peak disk used in the temp directory.
+
+Usage:
+    python benchmarks/download_benchmark.py [--minutes 10] [--mbps 400]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fixtures import STUBS_DIR
+from benchmarks.fixture_server import FixtureVideoServer
+from config import Config
+from processors.video_handler import VideoHandler
+
+
+class DiskSampler:
+    """Track the peak total size of the files in a directory"""
+
+    def __init__(self, path, interval=0.01):
+        self.path = path
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            total = 0
+            for entry in os.scandir(self.path):
+                try:
+                    total += entry.stat().st_size
+                except FileNotFoundError:
+                    pass
+            self.peak = max(self.peak, total)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run(server, stream_audio, work_dir):
+    temp_dir = os.path.join(work_dir, 'stream' if stream_audio else 'full')
+    os.makedirs(temp_dir)
+    Config.YT_DLP_STREAM_AUDIO = stream_audio
+    handler = VideoHandler()
+    handler.temp_dir = temp_dir
+
+    server.reset_counters()
+    with DiskSampler(temp_dir) as disk:
+        start = time.perf_counter()
+        result = handler.download_youtube_audio('https://www.youtube.com/watch?v=fixture0001')
+        elapsed = time.perf_counter() - start
+
+    return {
+        'seconds': round(elapsed, 2),
+        'bytes_fetched': server.bytes_sent,
+        'peak_disk_bytes': disk.peak,
+        'wav_bytes': os.path.getsize(result['audio_path']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='YouTube audio download benchmark')
+    parser.add_argument('--minutes', type=int, default=10, help='Length of the fixture video')
+    parser.add_argument('--mbps', type=float, default=400, help='Fixture server bandwidth (0 = unthrottled)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    Config.YT_DLP_PATH = os.path.join(STUBS_DIR, 'yt-dlp')
+    os.environ['PATH'] = STUBS_DIR + os.pathsep + os.environ.get('PATH', '')
+
+    with tempfile.TemporaryDirectory() as work_dir, \
+            FixtureVideoServer(duration=args.minutes * 60, bandwidth_mbps=args.mbps or None) as server:
+        os.environ['STUB_YOUTUBE_SERVER'] = server.url
+        before = run(server, False, work_dir)
+        after = run(server, True, work_dir)
+
+    if args.json:
+        print(json.dumps({'minutes': args.minutes, 'mbps': args.mbps, 'before': before, 'after': after}))
+        return
+
+    mb = 1024 * 1024
+    print(f"\n{args.minutes}-minute 1080p fixture video, {args.mbps:g} Mbit/s link")
+    print(f"{'':<20}{'before':>12}{'after':>12}")
+    print(f"{'wall time':<20}{before['seconds']:>11.2f}s{after['seconds']:>11.2f}s"
+          f"   ({before['seconds'] / after['seconds']:.1f}x)")
+    print(f"{'fetched':<20}{before['bytes_fetched'] / mb:>10.1f}MB{after['bytes_fetched'] / mb:>10.1f}MB")
+    print(f"{'peak temp disk':<20}{before['peak_disk_bytes'] / mb:>10.1f}MB{after['peak_disk_bytes'] / mb:>10.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end pipeline throughput (worker.process_video_background)
+
+Runs whole YouTube jobs through the real worker code, offline: the stub
+yt-dlp, ffmpeg and whisper-cli in benchmarks/stubs stand in for the
+tools, benchmarks/fixture_server.py for YouTube and benchmarks/fake_ollama.py
+for the model. Each level keeps that many jobs submitted at once (1, 4, 16
+and 64 by default): as a job finishes the next one is submitted, until the
+level's jobs are done. Stage limits are the worker's own
+(DOWNLOAD/TRANSCRIBE/GENERATE_CONCURRENCY), so jobs queue for slots as
+they would in production.
+
+Reports per level jobs/hour, p50/p95 job latency (submission to
+completion) and the peak RSS of this process, which runs every job thread
+as a worker does. With --baseline it also compares against the --json
+output of an earlier run, e.g. of the previous version.
+
+Asserts that every job completed with its notes saved, left no audio
+behind and has download, whisper and notes events on its timeline.
+
+The LLM response cache is off, so every job asks the fake model.
+
+Usage:
+    python benchmarks/e2e_benchmark.py [--concurrency 1,4,16,64] [--jobs 8] [--minutes 10] [--json]
+    python benchmarks/e2e_benchmark.py --json > before.json
+    python benchmarks/e2e_benchmark.py --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import numpy as np
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.fixtures import STUBS_DIR
+from benchmarks.fixture_server import FixtureVideoServer
+from config import Config
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak so far where /proc is missing)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class RssSampler:
+    """Track the peak resident set size of this process"""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def configure(work_dir, args, video_server, llm_server):
+    """Point Config and the stubs at the fixtures; must run before worker is imported"""
+    os.environ['PATH'] = STUBS_DIR + os.pathsep + os.environ.get('PATH', '')
+    os.environ['STUB_YOUTUBE_SERVER'] = video_server.url
+    os.environ['STUB_YT_DLP_STARTUP_SECONDS'] = str(args.ytdlp_startup)
+    os.environ['STUB_FFMPEG_RTF'] = str(args.ffmpeg_rtf)
+    os.environ['STUB_WHISPER_RTF'] = str(args.whisper_rtf)
+    os.environ['STUB_WHISPER_LOAD_SECONDS'] = str(args.whisper_load)
+    os.environ['STUB_WHISPER_CHARS_PER_SECOND'] = str(args.chars_per_second)
+
+    Config.DATABASE_PATH = os.path.join(work_dir, 'bench.db')
+    Config.TEMP_DIR = os.path.join(work_dir, 'temp')
+    Config.NOTES_DIR = os.path.join(work_dir, 'notes')
+    Config.METRICS_DIR = os.path.join(work_dir, 'metrics')
+    Config.YT_DLP_PATH = os.path.join(STUBS_DIR, 'yt-dlp')
+    Config.WHISPER_PATH = os.path.join(STUBS_DIR, 'whisper-cli')
+    Config.WHISPER_MODEL_PATH = os.path.join(work_dir, 'ggml-stub.bin')
+    Config.WHISPER_SERVER_INSTANCES = 0  # whisper-cli per job
+    Config.LLM_BACKENDS = f'{llm_server.url}|fake-model'
+    Config.LLM_CACHE_ENABLED = False
+    open(Config.WHISPER_MODEL_PATH, 'w').close()
+
+
+def run_level(worker, user_id, concurrency, jobs, first_number):
+    """Run `jobs` jobs with `concurrency` submitted at a time; returns the level's results"""
+    video_ids = []
+    latencies = []
+    statuses = []
+
+    def submit(number):
+        youtube_id = f'bench{number:06d}'  # 11 characters, like a YouTube ID
+        url = f'https://www.youtube.com/watch?v={youtube_id}'
+        video_id = worker.db.create_video(user_id, url, 'youtube', 'Processing...')
+        video_ids.append(video_id)
+        start = time.perf_counter()
+        statuses.append(worker.process_video_background(video_id, url, False, None, threading.Event(),
+                                                        content_key=f'youtube:{youtube_id}'))
+        latencies.append(time.perf_counter() - start)
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(submit, range(first_number, first_number + jobs)))
+        elapsed = time.perf_counter() - start
+
+    assert statuses.count('completed') == jobs, f"{jobs - statuses.count('completed')} of {jobs} jobs did not complete"
+    for video_id in video_ids:
+        assert worker.db.get_notes(video_id), f"video {video_id} has no notes"
+        stages = {event['stage'] for event in worker.db.get_processing_events(video_id)}
+        assert {'download', 'whisper', 'notes'} <= stages, f"video {video_id} timeline is missing stages: {stages}"
+    assert not os.listdir(Config.TEMP_DIR), f"audio left behind: {os.listdir(Config.TEMP_DIR)}"
+
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        'concurrency': concurrency,
+        'jobs': jobs,
+        'seconds': round(elapsed, 2),
+        'jobs_per_hour': round(jobs / elapsed * 3600, 1),
+        'p50': round(float(p50), 3),
+        'p95': round(float(p95), 3),
+        'max': round(max(latencies), 3),
+        'peak_rss_mb': round(rss.peak / 1048576, 1),
+    }
+
+
+def compare(results, baseline):
+    """Print each level's change from a baseline --json output"""
+    before = {level['concurrency']: level for level in baseline['levels']}
+    print(f"\nAgainst baseline{'':8}{'jobs/h':>10}{'p50':>10}{'p95':>10}{'peak RSS':>10}")
+    for level in results['levels']:
+        old = before.get(level['concurrency'])
+        if not old:
+            continue
+        changes = [(level[key] / old[key] - 1) * 100 if old[key] else 0.0
+                   for key in ('jobs_per_hour', 'p50', 'p95', 'peak_rss_mb')]
+        print(f"{level['concurrency']:>4} submitted{'':10}" + ''.join(f"{change:>+9.1f}%" for change in changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end pipeline throughput benchmark')
+    parser.add_argument('--concurrency', default='1,4,16,64', help='Comma-separated jobs submitted at once')
+    parser.add_argument('--jobs', type=int, default=8, help='Jobs per level (at least the level\'s concurrency)')
+    parser.add_argument('--minutes', type=int, default=10, help='Length of each fixture video')
+    parser.add_argument('--mbps', type=float, default=400, help='Fixture server bandwidth (0 = unthrottled)')
+    parser.add_argument('--ytdlp-startup', type=float, default=0.5, help='Stub yt-dlp seconds before downloading')
+    parser.add_argument('--ffmpeg-rtf', type=float, default=0.0005, help='Stub ffmpeg seconds per audio second')
+    parser.add_argument('--whisper-rtf', type=float, default=0.002,
+                        help='Stub whisper-cli seconds per audio second (at 4 threads)')
+    parser.add_argument('--whisper-load', type=float, default=0.2, help='Stub whisper-cli model load seconds')
+    parser.add_argument('--chars-per-second', type=float, default=15, help='Speech rate of the stub transcripts')
+    parser.add_argument('--time-scale', type=float, default=0.05, help='Fraction of real time the fake LLM waits')
+    parser.add_argument('--llm-parallel', type=int, default=16, help='Requests the fake LLM serves at once')
+    parser.add_argument('--baseline', help='--json output of an earlier run to compare against')
+    parser.add_argument('--verbose', action='store_true', help='Show the pipeline\'s own log')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    with tempfile.TemporaryDirectory() as work_dir, \
+            FixtureVideoServer(duration=args.minutes * 60, bandwidth_mbps=args.mbps or None) as video_server, \
+            FakeOllamaServer(time_scale=args.time_scale, parallel=args.llm_parallel) as llm_server:
+        configure(work_dir, args, video_server, llm_server)
+        with open(os.devnull, 'w') as devnull, redirect_stdout(sys.stdout if args.verbose else devnull):
+            import worker  # Builds its database, handlers and stage limits from Config
+
+            worker.db.init_database()
+            user_id = worker.db.create_user('bench', 'bench@example.com', 'password')
+
+            results = {
+                'config': {
+                    'minutes': args.minutes,
+                    'mbps': args.mbps,
+                    'ytdlp_startup': args.ytdlp_startup,
+                    'ffmpeg_rtf': args.ffmpeg_rtf,
+                    'whisper_rtf': args.whisper_rtf,
+                    'whisper_load': args.whisper_load,
+                    'time_scale': args.time_scale,
+                    'stage_limits': worker.stages.limits,
+                    'cpus': os.cpu_count(),
+                },
+                'levels': [],
+            }
+            number = 0
+            for concurrency in levels:
+                jobs = max(args.jobs, concurrency)
+                results['levels'].append(run_level(worker, user_id, concurrency, jobs, number))
+                number += jobs
+        results['llm_requests'] = llm_server.requests
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    limits = results['config']['stage_limits']
+    print(f"\n{args.minutes}-minute videos; stage slots: download {limits['download']}, "
+          f"transcribe {limits['transcribe']}, generate {limits['generate']}")
+    print(f"{'':16}{'jobs':>6}{'jobs/h':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}{'peak RSS':>11}")
+    for level in results['levels']:
+        print(f"{level['concurrency']:>4} submitted{'':2}{level['jobs']:>6}{level['jobs_per_hour']:>10.0f}"
+              f"{level['p50']:>9.2f}{level['p95']:>9.2f}{level['max']:>9.2f}{level['peak_rss_mb']:>9.1f}MB")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Local stand-in for an Ollama server used by the benchmarks
+
+Answers POST /api/chat with streamed NDJSON like Ollama. Response timing
+follows a simple model of a real deployment: prompt processing at
+prefill_tps tokens/s, then generation at decode_tps tokens/s, with at most
+`parallel` requests served at once (others queue, like OLLAMA_NUM_PARALLEL).
+Prompts longer than the context window are truncated from the front, as
+Ollama does, and the reply length grows with the prompt up to
+max_output_tokens.
+
+Replies echo every sentence marker ([S123], see fixtures.speech_like_transcript)
+the model "saw", so benchmarks can measure how much of a transcript made it
+into the final notes. Token counts are estimated as characters / 4.
+
+Faults can be injected to exercise the client's retries and circuit
+breaker: a share of requests answered with an HTTP error (error_rate,
+error_status), a share of streams cut off part way (drop_rate), random
+extra latency before the first token (latency_jitter), a slow tail of
+requests that stall tail_latency seconds before their first token
+(tail_rate, like an overloaded remote queueing them), and a full outage
+(set `outage` to answer every request with 503 until it is cleared).
+Connections are kept alive (HTTP/1.1, chunked replies) and counted, so
+connection reuse can be measured.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+MARKER_RE = re.compile(r'\[S\d+\]')
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 16  # Tokens per streamed NDJSON line
+
+
+class FakeOllamaServer:
+    """Threaded HTTP server imitating Ollama's chat API; use as a context manager"""
+
+    def __init__(self, prefill_tps=2000, decode_tps=50, context_tokens=32768, max_output_tokens=4096,
+                 output_ratio=0.3, parallel=4, time_scale=1.0, error_rate=0.0, error_status=503, drop_rate=0.0,
+                 latency_jitter=0.0, tail_rate=0.0, tail_latency=0.0, seed=None, host='127.0.0.1', port=0):
+        self.prefill_tps = prefill_tps
+        self.decode_tps = decode_tps
+        self.context_tokens = context_tokens
+        self.max_output_tokens = max_output_tokens
+        self.output_ratio = output_ratio
+        self.time_scale = time_scale  # Multiplies every delay, to run benchmarks faster than real time
+        self.slots = threading.Semaphore(parallel)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.latency_jitter = latency_jitter  # Up to this many extra (scaled) seconds before the first token
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.outage = False  # While True every request gets a 503
+        self.random = random.Random(seed)
+        self.attempts = 0  # Every /api/chat request, including failed ones
+        self.errors = 0  # Requests answered with an error status
+        self.drops = 0  # Streams cut off part way
+        self.connections = 0  # TCP connections accepted
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def reset_counters(self):
+        with self._lock:
+            self.attempts = 0
+            self.errors = 0
+            self.drops = 0
+            self.connections = 0
+            self.requests = 0
+            self.prompt_tokens = 0
+            self.peak_in_flight = 0
+
+    def reply(self, prompt):
+        """The reply text and the delays (prefill seconds, seconds per message) for a prompt"""
+        seen = prompt[-self.context_tokens * CHARS_PER_TOKEN:]
+        seen_tokens = len(seen) // CHARS_PER_TOKEN
+        output_tokens = max(64, min(self.max_output_tokens, int(seen_tokens * self.output_ratio)))
+
+        text = ' '.join(f'- Notes on {marker}.' for marker in MARKER_RE.findall(seen))
+        target = output_tokens * CHARS_PER_TOKEN
+        if len(text) < target:
+            text += ' ' + ' '.join(['detail'] * ((target - len(text)) // 7))
+        return text, seen_tokens / self.prefill_tps * self.time_scale, \
+            TOKENS_PER_MESSAGE / self.decode_tps * self.time_scale
+
+    def _fault(self):
+        """The fault to inject into the next request: an error status, 'drop' or None"""
+        with self._lock:
+            self.attempts += 1
+            if self.outage:
+                self.errors += 1
+                return 503
+            roll = self.random.random()
+            if roll < self.error_rate:
+                self.errors += 1
+                return self.error_status
+            if roll < self.error_rate + self.drop_rate:
+                self.drops += 1
+                return 'drop'
+            return None
+
+    def _jitter(self):
+        """Extra (scaled) seconds before the next request's first token"""
+        with self._lock:
+            delay = self.random.uniform(0, self.latency_jitter)
+            if self.random.random() < self.tail_rate:
+                delay += self.tail_latency
+            return delay * self.time_scale
+
+    def _started(self, prompt_tokens):
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, so clients can reuse connections
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if self.path != '/api/chat':
+                    self.send_error(404)
+                    return
+                fault = fake._fault()
+                if isinstance(fault, int):
+                    body = json.dumps({'error': 'injected fault'}).encode()
+                    self.send_response(fault)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                prompt = '\n'.join(message.get('content', '') for message in request.get('messages', []))
+                text, prefill, per_message = fake.reply(prompt)
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                with fake.slots:
+                    fake._started(len(prompt) // CHARS_PER_TOKEN)
+                    try:
+                        time.sleep(prefill + fake._jitter())
+                        step = TOKENS_PER_MESSAGE * CHARS_PER_TOKEN
+                        starts = range(0, len(text), step)
+                        drop_after = len(starts) // 2 if fault == 'drop' else None
+                        for number, start in enumerate(starts):
+                            if number == drop_after:
+                                self.close_connection = True  # Cut off without the closing chunk
+                                return
+                            time.sleep(per_message)
+                            self._send_line({'model': request.get('model'), 'done': False,
+                                             'message': {'role': 'assistant', 'content': text[start:start + step]}})
+                        self._send_line({'model': request.get('model'), 'done': True,
+                                         'message': {'role': 'assistant', 'content': ''}})
+                        self.wfile.write(b'0\r\n\r\n')
+                        self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        self.close_connection = True  # Client abandoned the stream
+                    finally:
+                        fake._finished()
+
+            def _send_line(self, data):
+                line = json.dumps(data).encode() + b'\n'
+                self.wfile.write(f'{len(line):x}\r\n'.encode() + line + b'\r\n')
+                self.wfile.flush()
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
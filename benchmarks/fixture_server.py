@@ -0,0 +1,146 @@
+"""
+Local stand-in for YouTube used by the benchmarks
+
+Serves video metadata and media bytes for the stub yt-dlp in
+benchmarks/stubs. Each video offers a muxed 1080p format and an audio-only
+format with realistic bitrates; media is generated on the fly (a short
+header carrying the duration, then filler) and can be throttled to a given
+bandwidth. Bytes sent are counted so benchmarks can report network use.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+MEDIA_HEADER = b'V2NSTUB duration=%d\n'
+CHUNK_SIZE = 256 * 1024
+
+# (format_id, ext, vcodec, acodec, kbit/s) - roughly YouTube's 1080p avc1 + m4a formats
+FORMATS = (
+    ('137+140', 'mp4', 'avc1.640028', 'mp4a.40.2', 4600),
+    ('140', 'm4a', 'none', 'mp4a.40.2', 129),
+)
+
+
+class FixtureVideoServer:
+    """Threaded HTTP server for video info and media; use as a context manager"""
+
+    def __init__(self, duration=600, bandwidth_mbps=None, host='127.0.0.1', port=0):
+        self.duration = duration
+        self.bandwidth = bandwidth_mbps * 125000 if bandwidth_mbps else None  # bytes/sec
+        self.bytes_sent = 0
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def info(self, video_id):
+        """yt-dlp-style info dict for a video"""
+        chapters = [{'start_time': start, 'end_time': min(start + 300, self.duration), 'title': f'Part {i + 1}'}
+                    for i, start in enumerate(range(0, self.duration, 300))]
+        return {
+            'id': video_id,
+            'title': f'Fixture lecture {video_id}',
+            'uploader': 'Fixture Channel',
+            'duration': self.duration,
+            'description': 'Served by benchmarks/fixture_server.py',
+            'chapters': chapters,
+            'webpage_url': f'https://www.youtube.com/watch?v={video_id}',
+            'formats': [{
+                'format_id': format_id,
+                'ext': ext,
+                'vcodec': vcodec,
+                'acodec': acodec,
+                'tbr': kbps,
+                'filesize': self.media_size(kbps),
+                'url': f'{self.url}/media/{video_id}/{format_id}',
+            } for format_id, ext, vcodec, acodec, kbps in FORMATS],
+        }
+
+    def media_size(self, kbps):
+        return int(self.duration * kbps * 1000 / 8)
+
+    def reset_counters(self):
+        with self._lock:
+            self.bytes_sent = 0
+            self.requests = []
+
+    def _count(self, path, sent):
+        with self._lock:
+            self.bytes_sent += sent
+            self.requests.append(path)
+
+    def _handler_class(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                media = re.match(r'^/media/([\w-]+)/([\w+]+)$', parsed.path)
+                if parsed.path == '/watch':
+                    video_id = parse_qs(parsed.query).get('v', ['unknown'])[0]
+                    self._send_json(fixture.info(video_id))
+                elif media:
+                    self._send_media(*media.groups())
+                else:
+                    self.send_error(404)
+
+            def _send_json(self, data):
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                fixture._count(self.path, len(body))
+
+            def _send_media(self, video_id, format_id):
+                kbps = next((f[4] for f in FORMATS if f[0] == format_id), None)
+                if kbps is None:
+                    self.send_error(404)
+                    return
+                size = fixture.media_size(kbps)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(size))
+                self.end_headers()
+
+                header = MEDIA_HEADER % fixture.duration
+                filler = b'\0' * CHUNK_SIZE
+                sent = 0
+                start = time.monotonic()
+                try:
+                    while sent < size:
+                        chunk = header if sent == 0 else filler[:min(CHUNK_SIZE, size - sent)]
+                        self.wfile.write(chunk)
+                        sent += len(chunk)
+                        if fixture.bandwidth:
+                            ahead = sent / fixture.bandwidth - (time.monotonic() - start)
+                            if ahead > 0:
+                                time.sleep(ahead)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                fixture._count(self.path, sent)
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
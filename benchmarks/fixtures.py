@@ -0,0 +1,96 @@
+"""Synthetic inputs shared by the benchmark scripts and tests"""
+
+import os
+import wave
+import numpy as np
+from processors.chunker import SENTENCE_END_CHARS
+
+STUBS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+SAMPLE_RATE = 16000
+
+
+def write_speech_like_wav(path, seconds, speech_seconds=8.0, pause_seconds=1.5, seed=0):
+    """
+    Write a 16 kHz mono 16-bit WAV alternating noisy "speech" bursts and quiet pauses
+
+    Written in one-minute blocks so multi-hour fixtures don't need the whole
+    signal in memory.
+    """
+    rng = np.random.default_rng(seed)
+    period = speech_seconds + pause_seconds
+    block = SAMPLE_RATE * 60
+
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+
+        total = int(seconds * SAMPLE_RATE)
+        for start in range(0, total, block):
+            n = min(block, total - start)
+            t = (start + np.arange(n)) / SAMPLE_RATE
+            speaking = (t % period) < speech_seconds
+            signal = rng.normal(0, 3000, n) * np.where(speaking, 1.0, 0.02)
+            wav.writeframes(signal.clip(-32768, 32767).astype('<i2').tobytes())
+
+    return path
+
+
+def speech_like_transcript(chars, seed=0):
+    """
+    Transcript-like text of about chars characters, one sentence per line
+
+    Every sentence starts with a numbered marker ([S1], [S2], ...) that
+    benchmarks/fake_ollama.py echoes back, so coverage of the final notes
+    can be measured.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = ('the', 'model', 'we', 'data', 'so', 'this', 'is', 'really', 'important', 'because',
+                  'you', 'can', 'see', 'that', 'function', 'returns', 'a', 'value', 'and', 'then')
+    lines = []
+    length = 0
+    while length < chars:
+        words = rng.choice(vocabulary, size=int(rng.integers(8, 20)))
+        line = f"[S{len(lines) + 1}] {' '.join(words).capitalize()}."
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)
+
+
+def whisper_segments(chars, seed=0, sentences_per_segment=(1, 3), split_chance=0.2, chapter_every=60):
+    """
+    Whisper-like JSON segments covering about chars characters, plus chapters
+
+    Segments hold one to three sentences at ~15 characters per second; some
+    sentences are split across two segments (whisper cuts mid-sentence too).
+    A chapter starts at the first sentence start after every chapter_every
+    segments.
+    """
+    rng = np.random.default_rng(seed)
+    sentences = speech_like_transcript(chars, seed=seed).split('\n')
+    segments = []
+    chapters = []
+    position_ms = 0
+    since_chapter = chapter_every
+    i = 0
+    while i < len(sentences):
+        count = int(rng.integers(sentences_per_segment[0], sentences_per_segment[1] + 1))
+        pieces = [' '.join(sentences[i:i + count])]
+        i += count
+        if rng.random() < split_chance:
+            words = pieces[0].split(' ')
+            cut = int(rng.integers(1, len(words))) if len(words) > 1 else 1
+            pieces = [' '.join(words[:cut]), ' '.join(words[cut:])]
+        for piece in pieces:
+            if not piece:
+                continue
+            at_sentence_start = not segments or segments[-1]['text'].endswith(SENTENCE_END_CHARS)
+            if since_chapter >= chapter_every and at_sentence_start:
+                chapters.append({'start_time': position_ms / 1000, 'title': f'Chapter {len(chapters) + 1}'})
+                since_chapter = 0
+            since_chapter += 1
+            duration = int(len(piece) / 15 * 1000) + int(rng.integers(0, 400))
+            segments.append({'text': ' ' + piece, 'offsets': {'from': position_ms, 'to': position_ms + duration}})
+            position_ms += duration + int(rng.integers(0, 800))
+    text = ' '.join(segment['text'].strip() for segment in segments)
+    return text, segments, chapters
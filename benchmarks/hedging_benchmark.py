@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hedged requests across model backends (processors/llm_router.py)
+
+Two fake Ollama servers (benchmarks/fake_ollama.py) stand in for the remote
+model and a local one. The remote one is faster but a few percent of its
+requests stall before their first token, like an overloaded service
+queueing them; the local one is slower but steady and writes different
+replies. Requests are sent:
+
+- remote only: an LLMRouter with just the remote backend (as before)
+- hedged: LLMRouter([remote, local]). Once the remote's time to first
+  token passes its p95 (from its histogram, filled by warm-up requests),
+  the local one is asked too and the first stream to write wins
+- fallback: the hedged router while the remote server is down
+
+Reports p50/p95/p99 request latency, hedges sent and how many the local
+backend won. Asserts that every reply is complete and is exactly the reply
+of the backend it was credited to (streams are never mixed), and that no
+request fails while the remote is down.
+
+Usage:
+    python benchmarks/hedging_benchmark.py [--requests 200] [--threads 8] [--tail-rate 0.03]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import numpy as np
+from benchmarks.fake_ollama import FakeOllamaServer
+from processors.llm_client import LLMClient
+from processors.llm_router import Backend, LLMRouter
+
+
+def prompt_for(number):
+    return f"Summarize lecture part {number}. " + 'word ' * 200
+
+
+def backend(name, server, threads):
+    # No retries or breaker pauses: the router's fallback is what is measured
+    client = LLMClient(server.url, max_in_flight=threads * 2, retry_attempts=1, failure_threshold=3, cooldown=60)
+    return Backend(name, client, f'{name}-model')
+
+
+def run(router, servers, requests, threads, offset=0):
+    """Send requests; returns latencies and which backend answered, checking every reply"""
+    latencies = []
+    answered_by = []
+
+    def one(number):
+        prompt = prompt_for(number)
+        start = time.perf_counter()
+        text, chosen = router.chat([{'role': 'user', 'content': prompt}])
+        latencies.append(time.perf_counter() - start)
+        assert text == servers[chosen.name].reply(prompt)[0], f"reply {number} is not {chosen.name}'s"
+        answered_by.append(chosen.name)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(offset, offset + requests)))
+    return latencies, {name: answered_by.count(name) for name in sorted(set(answered_by))}
+
+
+def summary(latencies, answered, router, hedges_before=0):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': len(latencies),
+        'p50': round(float(p50), 3),
+        'p95': round(float(p95), 3),
+        'p99': round(float(p99), 3),
+        'max': round(max(latencies), 3),
+        'answered': answered,
+        'hedges': router.hedges - hedges_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hedged / fallback model backends benchmark')
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per run')
+    parser.add_argument('--warmup', type=int, default=40, help='Requests that fill the latency histograms first')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent callers')
+    parser.add_argument('--tail-rate', type=float, default=0.03, help='Share of remote requests that stall')
+    parser.add_argument('--tail-latency', type=float, default=30, help='Seconds a stalled request waits')
+    parser.add_argument('--time-scale', type=float, default=0.2, help='Fraction of real time the fake LLMs wait')
+    parser.add_argument('--percentile', type=float, default=95, help='Hedge after this time-to-first-token percentile')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    parallel = args.threads * 4  # Stalled requests must not hold up the others on the fake server
+    with FakeOllamaServer(time_scale=args.time_scale, parallel=parallel, latency_jitter=0.5,
+                          tail_rate=args.tail_rate, tail_latency=args.tail_latency, seed=args.seed) as remote, \
+            FakeOllamaServer(time_scale=args.time_scale, parallel=parallel, prefill_tps=500, decode_tps=20,
+                             output_ratio=0.2) as local:
+        servers = {'remote': remote, 'local': local}
+
+        alone = LLMRouter([backend('remote', remote, args.threads)])
+        baseline = summary(*run(alone, servers, args.requests, args.threads), alone)
+
+        hedged = LLMRouter([backend('remote', remote, args.threads), backend('local', local, args.threads)],
+                           hedge_percentile=args.percentile, hedge_min_samples=min(20, args.warmup),
+                           hedge_min_seconds=0.0)
+        run(hedged, servers, args.warmup, args.threads, offset=args.requests)
+        warm = hedged.hedges
+        threshold = hedged.hedge_after(hedged.backends[0])
+        with_hedging = summary(*run(hedged, servers, args.requests, args.threads), hedged, warm)
+
+        remote.outage = True
+        fallbacks, hedges = hedged.fallbacks, hedged.hedges
+        down = summary(*run(hedged, servers, min(args.requests, 50), args.threads), hedged, hedges)
+        down['fallbacks'] = hedged.fallbacks - fallbacks
+        assert down['answered'] == {'local': down['requests']}, 'requests were lost while the remote was down'
+
+    results = {
+        'tail_rate': args.tail_rate,
+        'tail_latency_seconds': args.tail_latency * args.time_scale,
+        'hedge_after_seconds': round(threshold, 3),
+        'remote_only': baseline,
+        'hedged': with_hedging,
+        'remote_down': down,
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"\nRemote: {args.tail_rate:.0%} of requests stall {results['tail_latency_seconds']:g}s; "
+          f"hedge after p{args.percentile:g} time to first token = {threshold:.2f}s")
+    print(f"{'':22}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}{'hedges':>8}{'local won':>11}")
+    for name, label in (('remote_only', 'Remote only'), ('hedged', 'Remote + local hedge'),
+                        ('remote_down', 'Remote down')):
+        r = results[name]
+        print(f"{label:22}{r['p50']:>8.2f}{r['p95']:>8.2f}{r['p99']:>8.2f}{r['max']:>8.2f}{r['hedges']:>8}"
+              f"{r['answered'].get('local', 0):>8}/{r['requests']:<3}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark: shared LLM client (processors/llm_client.py) against a faulty server
+
+Runs chat requests against the fake Ollama server in benchmarks/fake_ollama.py
+with injected faults, through a plain ollama.Client (one attempt per
+request, as NoteGenerator used to) and through LLMClient:
+
+- flaky: a share of requests get a 503 or have their stream cut off part
+  way, with random extra latency. Reports the share of requests that come
+  back complete and the server-side attempts it took.
+- limits: more threads than max_in_flight, with requests_per_minute set.
+  Reports the peak requests in flight at the server and the time taken
+  against the least the rate limit allows.
+- outage: the server answers everything with 503 for a while. "Jobs" wait
+  for the circuit breaker like worker.py does and retry. Reports how many
+  requests hit the server during the outage with and without the breaker.
+
+Connections opened are reported for each run to show keep-alive reuse.
+The client's retries, limits, circuit breaker and cancellation are
+checked by tests/test_llm_client.py.
+
+Usage:
+    python benchmarks/llm_client_benchmark.py [--requests 60] [--threads 8] [--outage 2]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from ollama import Client
+from benchmarks.fake_ollama import FakeOllamaServer
+from processors.llm_client import LLMClient, LLMUnavailable
+
+MODEL = 'fake-model'
+
+
+def prompt_for(number):
+    return f"Summarize lecture part {number}. " + 'word ' * 200
+
+
+def plain_chat(client, prompt):
+    """One streamed attempt, as NoteGenerator did before the shared client"""
+    text = ''
+    for part in client.chat(MODEL, messages=[{'role': 'user', 'content': prompt}], stream=True):
+        text += part.get('message', {}).get('content', '')
+    return text
+
+
+def run(server, requests, threads, request):
+    """Send requests from a thread pool; returns how many came back complete, the time and server counters"""
+    server.reset_counters()
+    expected = {number: server.reply(prompt_for(number))[0] for number in range(requests)}
+
+    def one(number):
+        try:
+            return request(prompt_for(number)) == expected[number]
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        complete = sum(pool.map(one, range(requests)))
+    return {
+        'complete': complete,
+        'failed': requests - complete,
+        'seconds': round(time.perf_counter() - start, 2),
+        'server_attempts': server.attempts,
+        'connections': server.connections,
+        'peak_in_flight': server.peak_in_flight,
+    }
+
+
+def flaky(args):
+    with FakeOllamaServer(time_scale=args.time_scale, parallel=args.threads, error_rate=0.2, drop_rate=0.1,
+                          latency_jitter=2.0, seed=args.seed) as server:
+        plain = Client(host=server.url)
+        before = run(server, args.requests, args.threads, lambda prompt: plain_chat(plain, prompt))
+
+        llm = LLMClient(server.url, max_in_flight=args.threads, retry_attempts=8, retry_base_delay=0.02,
+                        retry_max_delay=0.2, failure_threshold=10 ** 6)
+        after = run(server, args.requests, args.threads,
+                    lambda prompt: llm.chat(MODEL, [{'role': 'user', 'content': prompt}]))
+        after['retries'] = llm.retries
+
+    return {'plain': before, 'llm_client': after}
+
+
+def limits(args):
+    max_in_flight = max(1, args.threads // 2)
+    requests_per_minute = 1200
+    requests = min(args.requests, 40)
+    # Slower replies than the other runs, so the in-flight cap is what holds requests back
+    with FakeOllamaServer(time_scale=args.time_scale * 10, parallel=args.threads * 2) as server:
+        llm = LLMClient(server.url, max_in_flight=max_in_flight, requests_per_minute=requests_per_minute)
+        result = run(server, requests, args.threads * 2,
+                     lambda prompt: llm.chat(MODEL, [{'role': 'user', 'content': prompt}]))
+
+    min_seconds = (requests - 1) * 60 / requests_per_minute
+    result.update({'max_in_flight': max_in_flight, 'requests_per_minute': requests_per_minute,
+                   'min_seconds': round(min_seconds, 2)})
+    return result
+
+
+def outage(args, breaker):
+    """Jobs that park on LLMUnavailable and retry, while the server is down for args.outage seconds"""
+    jobs = min(args.requests, args.threads * 2)
+    with FakeOllamaServer(time_scale=args.time_scale, parallel=args.threads) as server:
+        llm = LLMClient(server.url, max_in_flight=args.threads, retry_attempts=4, retry_base_delay=0.05,
+                        retry_max_delay=0.2, failure_threshold=3 if breaker else 10 ** 6, cooldown=0.5)
+        server.outage = True
+        recovered = threading.Timer(args.outage, setattr, (server, 'outage', False))
+        recovered.start()
+        during = {}
+
+        def job(prompt):
+            while True:
+                try:
+                    return llm.chat(MODEL, [{'role': 'user', 'content': prompt}])
+                except LLMUnavailable:
+                    llm.breaker.wait_until_available(timeout=args.outage * 10)
+
+        def count_during_outage():
+            recovered.join()
+            during['attempts'] = server.attempts
+
+        counter = threading.Thread(target=count_during_outage)
+        counter.start()
+        server.reset_counters()
+        result = run(server, jobs, jobs, job)
+        counter.join()
+
+    result['attempts_during_outage'] = during['attempts']
+    result['breaker_opened'] = llm.breaker.opened
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared LLM client benchmark (retries, limits, circuit breaker)')
+    parser.add_argument('--requests', type=int, default=60, help='Requests per run')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent callers')
+    parser.add_argument('--outage', type=float, default=2.0, help='Seconds the server is down in the outage run')
+    parser.add_argument('--time-scale', type=float, default=0.02, help='Fraction of real time the fake LLM waits')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = {
+        'flaky': flaky(args),
+        'limits': limits(args),
+        'outage': {'retry_only': outage(args, breaker=False), 'breaker': outage(args, breaker=True)},
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"\nFlaky server (20% HTTP errors, 10% cut-off streams), {args.requests} requests, {args.threads} threads")
+    print(f"{'':24}{'complete':>10}{'seconds':>9}{'attempts':>10}{'connections':>13}")
+    for name, label in (('plain', 'Plain client'), ('llm_client', 'LLMClient')):
+        r = results['flaky'][name]
+        print(f"{label:24}{r['complete']:>6}/{args.requests:<3}{r['seconds']:>9.2f}{r['server_attempts']:>10}"
+              f"{r['connections']:>13}")
+
+    r = results['limits']
+    print(f"\nLimits: peak {r['peak_in_flight']}/{r['max_in_flight']} in flight, {r['complete']} requests "
+          f"in {r['seconds']:.2f}s (rate limit allows no less than {r['min_seconds']:.2f}s)")
+
+    print(f"\n{args.outage:g}s outage, jobs wait for the model and retry")
+    print(f"{'':24}{'complete':>10}{'seconds':>9}{'outage hits':>13}{'breaker opened':>16}")
+    for name, label in (('retry_only', 'Retries only'), ('breaker', 'Circuit breaker')):
+        r = results['outage'][name]
+        print(f"{label:24}{r['complete']:>10}{r['seconds']:>9.2f}{r['attempts_during_outage']:>13}"
+              f"{r['breaker_opened']:>16}")
+
+
+if __name__ == '__main__':
+    main()
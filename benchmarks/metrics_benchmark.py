@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost and correctness of the /metrics instrumentation (metrics.py)
+
+- record: nanoseconds per Counter.inc / Histogram.observe, on one thread and
+  on several at once, with METRICS_ENABLED on and off
+- database: DatabaseManager.get_video calls per second with and without
+  its connection time being recorded
+- processes: forked processes each record a known number of observations
+  (some still running, some exited, like gunicorn workers being recycled);
+  checks the scraped totals equal the sum over all processes and that
+  gauges of exited processes are dropped, then times a scrape
+
+The checks are asserted (the repo has no test suite, so they live here).
+
+Usage:
+    python benchmarks/metrics_benchmark.py [--seconds 1] [--threads 8] [--processes 16]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import metrics
+from config import Config
+from database.db_manager import DatabaseManager
+
+OBSERVATIONS_PER_PROCESS = 1000
+
+
+def nanoseconds_per_call(func, seconds, threads):
+    """Call func from `threads` threads for about `seconds`; returns wall-clock ns per call"""
+    calls = [0] * threads
+    stop = threading.Event()
+
+    def run(index):
+        while not stop.is_set():
+            for _ in range(200):
+                func()
+            calls[index] += 200
+
+    workers = [threading.Thread(target=run, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) * 1e9 / sum(calls)
+
+
+def record(args):
+    results = {}
+    for enabled in (False, True):
+        Config.METRICS_ENABLED = enabled
+        name = 'on' if enabled else 'off'
+        results[name] = {
+            'counter_1_thread': nanoseconds_per_call(
+                lambda: metrics.CACHE_REQUESTS.inc(cache='llm', result='hit'), args.seconds, 1),
+            'histogram_1_thread': nanoseconds_per_call(
+                lambda: metrics.DB_QUERY_SECONDS.observe(0.0003, method='get_video'), args.seconds, 1),
+            f'histogram_{args.threads}_threads': nanoseconds_per_call(
+                lambda: metrics.DB_QUERY_SECONDS.observe(0.0003, method='get_video'), args.seconds, args.threads),
+        }
+    return results
+
+
+def database(args, tmp):
+    db = DatabaseManager(os.path.join(tmp, 'bench.db'))
+    db.init_database()
+    user_id = db.create_user('bench', 'bench@example.com', 'password')
+    video_ids = [db.create_video(user_id, None, 'youtube', f'Video {i}') for i in range(100)]
+
+    def calls_per_second():
+        calls = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.seconds:
+            db.get_video(video_ids[calls % len(video_ids)])
+            calls += 1
+        return calls / (time.perf_counter() - start)
+
+    results = {}
+    for enabled in (False, True, False, True):  # Alternated, so warm-up doesn't favour either
+        Config.METRICS_ENABLED = enabled
+        name = 'on' if enabled else 'off'
+        results[name] = max(results.get(name, 0), calls_per_second())
+    results['overhead_percent'] = (results['off'] / results['on'] - 1) * 100
+    return results
+
+
+def child(ready, finish):
+    """A process that records OBSERVATIONS_PER_PROCESS of each metric, then waits"""
+    metrics.registry.start()
+    for _ in range(OBSERVATIONS_PER_PROCESS):
+        metrics.JOBS.inc(status='completed')
+        metrics.STAGE_SECONDS.observe(2.0, stage='download')
+    metrics.STAGE_ACTIVE.inc(stage='transcribe')
+    metrics.registry.flush()
+    ready.set()
+    finish.wait()
+    metrics.registry.flush()
+
+
+def sample(text, line):
+    match = re.search(rf'^{re.escape(line)} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def processes(args):
+    Config.METRICS_ENABLED = True
+    context = get_context('fork')
+    running = []
+    for index in range(args.processes):
+        ready, finish = context.Event(), context.Event()
+        process = context.Process(target=child, args=(ready, finish))
+        process.start()
+        ready.wait()
+        running.append((process, finish))
+
+    # Half of them exit, as recycled gunicorn workers do
+    exited = args.processes // 2
+    for process, finish in running[:exited]:
+        finish.set()
+        process.join()
+
+    start = time.perf_counter()
+    text = metrics.render()
+    scrape_ms = (time.perf_counter() - start) * 1000
+
+    for process, finish in running[exited:]:
+        finish.set()
+        process.join()
+
+    expected = args.processes * OBSERVATIONS_PER_PROCESS
+    jobs = sample(text, 'voice2note_jobs_total{status="completed"}')
+    stage_count = sample(text, 'voice2note_stage_seconds_count{stage="download"}')
+    stage_sum = sample(text, 'voice2note_stage_seconds_sum{stage="download"}')
+    active = sample(text, 'voice2note_stage_active{stage="transcribe"}')
+    assert jobs == expected, f"{jobs:g} jobs counted, expected {expected}"
+    assert stage_count == expected and stage_sum == expected * 2.0, "histogram totals do not add up"
+    assert active == args.processes - exited, f"gauge {active:g} includes exited processes"
+
+    # Everyone has exited now: totals carry over in the archive, gauges go
+    text = metrics.render()
+    assert sample(text, 'voice2note_jobs_total{status="completed"}') == expected, "totals went backwards"
+    assert sample(text, 'voice2note_stage_active{stage="transcribe"}') == 0
+    return {'processes': args.processes, 'exited': exited, 'jobs_counted': int(jobs),
+            'scrape_ms': round(scrape_ms, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Metrics instrumentation benchmark')
+    parser.add_argument('--seconds', type=float, default=1.0, help='Seconds per measurement')
+    parser.add_argument('--threads', type=int, default=8, help='Threads recording at once')
+    parser.add_argument('--processes', type=int, default=16, help='Processes writing metrics files')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.METRICS_DIR = os.path.join(tmp, 'metrics')
+        results = {
+            'record_ns': record(args),
+            'database': database(args, tmp),
+            'processes': processes(args),
+        }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"\n{'ns per call':28}{'off':>10}{'on':>10}")
+    for name in results['record_ns']['on']:
+        print(f"{name:28}{results['record_ns']['off'][name]:>10.0f}{results['record_ns']['on'][name]:>10.0f}")
+
+    r = results['database']
+    print(f"\nget_video: {r['off']:.0f} calls/s without metrics, {r['on']:.0f} with "
+          f"({r['overhead_percent']:.1f}% overhead)")
+
+    r = results['processes']
+    print(f"\n✓ {r['processes']} processes ({r['exited']} exited): {r['jobs_counted']} jobs counted, "
+          f"scrape took {r['scrape_ms']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: whisper-cli per job vs resident models in whisper-server
+
+Transcribes the same set of short clips one after another, first by
+forking whisper-cli for each (which loads the model every time), then
+through whisper_server.py's supervised instances (which load it once).
+Uses the stubs in benchmarks/stubs, where model loading takes --load-seconds.
+
+Usage:
+    python benchmarks/model_server_benchmark.py [--jobs 20] [--clip-seconds 60] [--load-seconds 2]
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fixtures import STUBS_DIR, write_speech_like_wav
+from processors.transcriber import Transcriber
+from processors.whisper_client import WhisperServerClient, check_health
+from whisper_server import ModelServerSupervisor
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_jobs(transcriber, clips):
+    """Transcribe the clips in turn; returns per-job seconds"""
+    times = []
+    for clip in clips:
+        start = time.perf_counter()
+        transcriber._run_whisper(clip)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resident whisper model benchmark')
+    parser.add_argument('--jobs', type=int, default=20, help='Clips to transcribe')
+    parser.add_argument('--clip-seconds', type=float, default=60, help='Length of each clip')
+    parser.add_argument('--load-seconds', type=float, default=2.0, help='Simulated model load time')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    os.environ['STUB_WHISPER_LOAD_SECONDS'] = str(args.load_seconds)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        model_path = os.path.join(work_dir, 'ggml-stub.bin')
+        open(model_path, 'w').close()
+        clips = [write_speech_like_wav(os.path.join(work_dir, f'clip{i}.wav'), args.clip_seconds, seed=i)
+                 for i in range(args.jobs)]
+
+        transcriber = Transcriber()
+        transcriber.whisper_path = os.path.join(STUBS_DIR, 'whisper-cli')
+        transcriber.model_path = model_path
+        transcriber.server = None
+        cli_times = run_jobs(transcriber, clips)
+
+        port = free_port()
+        supervisor = ModelServerSupervisor(instances=1, base_port=port, health_interval=0.2,
+                                           server_path=os.path.join(STUBS_DIR, 'whisper-server'),
+                                           model_path=model_path)
+        thread = threading.Thread(target=supervisor.run_forever, daemon=True)
+        start = time.perf_counter()
+        thread.start()
+        url = f'http://127.0.0.1:{port}'
+        while check_health(url) != 'ok':
+            time.sleep(0.05)
+        startup = time.perf_counter() - start
+
+        transcriber.server = WhisperServerClient([url])
+        server_times = run_jobs(transcriber, clips)
+
+        supervisor.stop()
+        thread.join()
+
+    results = {
+        'jobs': args.jobs,
+        'clip_seconds': args.clip_seconds,
+        'load_seconds': args.load_seconds,
+        'cli_total_seconds': round(sum(cli_times), 2),
+        'cli_mean_job_seconds': round(sum(cli_times) / len(cli_times), 3),
+        'server_startup_seconds': round(startup, 2),
+        'server_total_seconds': round(sum(server_times), 2),
+        'server_mean_job_seconds': round(sum(server_times) / len(server_times), 3),
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"\n{args.jobs} jobs x {args.clip_seconds:g}s clips, model load {args.load_seconds:g}s")
+    print(f"whisper-cli per job:   {results['cli_total_seconds']:.2f}s total, "
+          f"{results['cli_mean_job_seconds']:.3f}s per job")
+    print(f"resident model:        {results['server_total_seconds']:.2f}s total, "
+          f"{results['server_mean_job_seconds']:.3f}s per job "
+          f"(plus {results['server_startup_seconds']:.2f}s one-off startup)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one-prompt vs map-reduce note generation for long transcripts
+
+Generates notes for a synthetic transcript against the fake Ollama server in
+benchmarks/fake_ollama.py three ways: the whole transcript in one prompt,
+map-reduce with one chunk request at a time, and map-reduce with
+NOTES_MAP_CONCURRENCY requests in flight. Reports simulated wall-clock time
+(at the fake server's token rates) and coverage: the share of transcript
+sentences that made it into the final notes (a single prompt loses
+whatever doesn't fit in the context window).
+
+Usage:
+    python benchmarks/notes_benchmark.py [--chars 300000] [--time-scale 0.01]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fake_ollama import FakeOllamaServer, MARKER_RE
+from benchmarks.fixtures import speech_like_transcript
+from config import Config
+from processors.chunker import chunk_transcript
+from processors.llm_client import LLMClient
+from processors.llm_router import Backend, LLMRouter
+from processors.note_generator import NoteGenerator
+
+
+def measure(server, generate, transcript, time_scale):
+    """Run one generation; returns its simulated seconds, request count, peak concurrency and coverage"""
+    server.reset_counters()
+    start = time.perf_counter()
+    notes = generate()
+    elapsed = time.perf_counter() - start
+    markers = set(MARKER_RE.findall(transcript))
+    return {
+        'seconds': round(elapsed / time_scale, 1),
+        'requests': server.requests,
+        'peak_in_flight': server.peak_in_flight,
+        'coverage_percent': round(len(markers & set(MARKER_RE.findall(notes))) * 100 / len(markers), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Map-reduce note generation benchmark')
+    parser.add_argument('--chars', type=int, default=300000, help='Transcript length (~5 hours of speech)')
+    parser.add_argument('--in-flight', type=int, default=Config.NOTES_MAP_CONCURRENCY,
+                        help='Concurrent chunk requests for map-reduce')
+    parser.add_argument('--context-tokens', type=int, default=32768, help="Fake model's context window")
+    parser.add_argument('--decode-tps', type=float, default=50, help='Fake generation speed (tokens/s)')
+    parser.add_argument('--time-scale', type=float, default=0.01, help='Fraction of real time to wait')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    transcript = speech_like_transcript(args.chars)
+    chunks = chunk_transcript(transcript)
+    metadata = {'title': 'Fixture lecture', 'channel': 'Fixture Channel', 'duration': 5 * 3600}
+
+    with FakeOllamaServer(context_tokens=args.context_tokens, decode_tps=args.decode_tps,
+                          parallel=max(4, args.in_flight), time_scale=args.time_scale) as server:
+        backend = Backend('fake', LLMClient(server.url, max_in_flight=args.in_flight), 'fake-model')
+        generator = NoteGenerator(llm=LLMRouter([backend]))
+
+        def single_prompt():
+            return generator._chat(generator._build_prompt(transcript, metadata), show_progress=False)
+
+        results = {
+            'transcript_chars': len(transcript),
+            'chunks': len(chunks),
+            'single_prompt': measure(server, single_prompt, transcript, args.time_scale),
+            'map_reduce_sequential': measure(
+                server, lambda: generator.generate_notes_chunked(chunks, metadata, max_in_flight=1),
+                transcript, args.time_scale),
+            'map_reduce_concurrent': measure(
+                server, lambda: generator.generate_notes_chunked(chunks, metadata, max_in_flight=args.in_flight),
+                transcript, args.time_scale),
+        }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"\nTranscript: {len(transcript)} characters, {len(chunks)} chunks, "
+          f"{args.context_tokens}-token context, {args.decode_tps:g} tokens/s")
+    print(f"{'':28}{'seconds':>10}{'requests':>10}{'in flight':>11}{'coverage':>10}")
+    for name, label in (('single_prompt', 'One prompt'),
+                        ('map_reduce_sequential', 'Map-reduce, 1 in flight'),
+                        ('map_reduce_concurrent', f'Map-reduce, {args.in_flight} in flight')):
+        row = results[name]
+        print(f"{label:28}{row['seconds']:>10.1f}{row['requests']:>10}{row['peak_in_flight']:>11}"
+              f"{row['coverage_percent']:>9.1f}%")
+
+
+if __name__ == '__main__':
+    main()
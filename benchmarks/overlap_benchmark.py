@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: notes after transcription vs notes overlapped with transcription
+
+Transcribes a synthetic lecture with the stub whisper-cli in
+benchmarks/stubs (printing speech-rate text) and generates its notes
+against the fake Ollama server in benchmarks/fake_ollama.py, twice:
+
+- sequential: Transcriber.transcribe, then NoteGenerator.generate_notes
+  (as before)
+- overlapped: transcribe with a StreamingNotes stage fed the finalized
+  segments, which sends chunk notes while later audio is still being
+  transcribed, then StreamingNotes.finish
+
+Reports wall-clock seconds for each and how close the overlapped run gets
+to max(transcribe, generate). What remains after transcription in the
+overlapped run is the last chunk's notes and the merge, which need the
+whole transcript. Also checks that the chunks sent while
+transcribing are exactly the chunks of the finished transcript.
+
+Usage:
+    python benchmarks/overlap_benchmark.py [--minutes 180] [--rtf 0.0005] [--time-scale 0.1]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.fixtures import STUBS_DIR, write_speech_like_wav
+from processors.chunker import chunk_transcript
+from processors.llm_client import LLMClient
+from processors.llm_router import Backend, LLMRouter
+from processors.note_generator import NoteGenerator
+from processors.streaming_notes import StreamingNotes
+from processors.transcriber import Transcriber
+
+
+class RecordingNoteGenerator(NoteGenerator):
+    """NoteGenerator that remembers the chunk texts it was asked for"""
+
+    def __init__(self, llm):
+        super().__init__(llm=llm)
+        self.chunk_texts = []
+
+    def generate_part_notes(self, chunk, *args, **kwargs):
+        self.chunk_texts.append(chunk['text'])
+        return super().generate_part_notes(chunk, *args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transcription / note generation overlap benchmark')
+    parser.add_argument('--minutes', type=float, default=180, help='Length of the synthetic lecture')
+    parser.add_argument('--rtf', type=float, default=0.0005,
+                        help='Stub whisper-cli seconds per audio second (at 4 threads)')
+    parser.add_argument('--chars-per-second', type=float, default=15, help='Speech rate of the stub transcript')
+    parser.add_argument('--time-scale', type=float, default=0.1, help='Fraction of real time the fake LLM waits')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    os.environ['STUB_WHISPER_RTF'] = str(args.rtf)
+    os.environ['STUB_WHISPER_CHARS_PER_SECOND'] = str(args.chars_per_second)
+    metadata = {'title': 'Fixture lecture', 'channel': 'Fixture Channel', 'duration': args.minutes * 60}
+
+    transcriber = Transcriber()
+    transcriber.server = None
+    with tempfile.TemporaryDirectory() as work_dir, FakeOllamaServer(time_scale=args.time_scale) as server:
+        transcriber.whisper_path = os.path.join(STUBS_DIR, 'whisper-cli')
+        transcriber.model_path = os.path.join(work_dir, 'ggml-stub.bin')
+        open(transcriber.model_path, 'w').close()
+        audio_path = write_speech_like_wav(os.path.join(work_dir, 'lecture.wav'), args.minutes * 60)
+
+        generator = RecordingNoteGenerator(LLMRouter([Backend('fake', LLMClient(server.url), 'fake-model')]))
+
+        # Sequential: the LLM waits for the whole transcript
+        start = time.perf_counter()
+        result = transcriber.transcribe(audio_path)
+        transcribe_seconds = time.perf_counter() - start
+        generator.generate_notes(result['transcript_text'], metadata, timestamps=result['timestamps'])
+        sequential_seconds = time.perf_counter() - start
+        generate_seconds = sequential_seconds - transcribe_seconds
+
+        # Overlapped: chunk notes start while later audio is still being transcribed
+        generator.chunk_texts = []
+        start = time.perf_counter()
+        streaming = StreamingNotes(generator, metadata)
+        try:
+            result = transcriber.transcribe(audio_path, on_segments=streaming.add)
+            overlapped_transcribe_seconds = time.perf_counter() - start
+            sent_during_transcription = len(generator.chunk_texts)
+            notes = streaming.finish()
+        finally:
+            streaming.close()
+        overlapped_seconds = time.perf_counter() - start
+
+    expected = [chunk['text'] for chunk in chunk_transcript(result['transcript_text'], result['timestamps'])]
+    chunks_match = sorted(generator.chunk_texts) == sorted(expected)
+    assert notes is not None, 'transcript too short to start map-reduce; use more --minutes'
+    assert chunks_match, 'chunks sent while transcribing differ from the finished transcript\'s chunks'
+
+    lower_bound = max(transcribe_seconds, generate_seconds)
+    results = {
+        'audio_minutes': args.minutes,
+        'transcript_chars': len(result['transcript_text']),
+        'chunks': len(expected),
+        'chunks_sent_during_transcription': sent_during_transcription,
+        'chunks_match': chunks_match,
+        'transcribe_seconds': round(transcribe_seconds, 2),
+        'generate_seconds': round(generate_seconds, 2),
+        'sequential_seconds': round(sequential_seconds, 2),
+        'overlapped_seconds': round(overlapped_seconds, 2),
+        'overlapped_transcribe_seconds': round(overlapped_transcribe_seconds, 2),
+        'after_transcription_seconds': round(overlapped_seconds - overlapped_transcribe_seconds, 2),
+        'max_transcribe_generate_seconds': round(lower_bound, 2),
+        'speedup': round(sequential_seconds / overlapped_seconds, 2),
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"\nLecture: {args.minutes:g} min, {results['transcript_chars']} characters, {len(expected)} chunks "
+          f"({sent_during_transcription} sent while transcribing; same chunks as the full transcript: "
+          f"{'yes' if chunks_match else 'NO'})")
+    print(f"Transcribe alone:            {transcribe_seconds:>7.2f}s")
+    print(f"Generate alone:              {generate_seconds:>7.2f}s")
+    print(f"Sequential (sum):            {sequential_seconds:>7.2f}s")
+    print(f"Overlapped:                  {overlapped_seconds:>7.2f}s  ({results['speedup']:.2f}x, "
+          f"{results['after_transcription_seconds']:.2f}s of it after transcription)")
+    print(f"max(transcribe, generate):   {lower_bound:>7.2f}s")
+
+
+if __name__ == '__main__':
+    main()
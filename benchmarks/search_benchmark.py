@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-text search over a large library
+
+Builds a synthetic library (titles, transcripts and notes spread across
+several users), then times search queries for one user. "before" is a
+LIKE '%q%' scan over the same title, transcript and note text; "after" is
+DatabaseManager.search_videos on the FTS5 indexes.
+
+Usage:
+    python benchmarks/search_benchmark.py [--videos 50000] [--words 400] [--users 20]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from database.db_manager import DatabaseManager
+
+TOPICS = ['kubernetes', 'photosynthesis', 'baroque', 'compiler', 'sourdough', 'volcano',
+          'derivatives', 'mitochondria', 'negotiation', 'typography', 'quantum', 'espresso']
+
+QUERIES = {
+    'rare word': 'sourdough',
+    'common word': 'people',
+    'two words': 'quantum compiler',
+    'prefix': 'photosynth*',
+    'no match': 'zzyzx',
+}
+
+
+def vocabulary(size=5000, seed=0):
+    """Made-up words; the first few hundred are 'common' and dominate the text"""
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = ['people', 'really', 'think', 'going', 'because', 'something', 'actually']
+    while len(words) < size:
+        words.append(''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return words
+
+
+def build_library(db, videos, words, users, seed=0):
+    """Insert videos, transcripts and notes in bulk; the FTS triggers index them as they go"""
+    rng = random.Random(seed)
+    vocab = vocabulary(seed=seed)
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocab))))  # Zipf-ish
+
+    user_ids = [db.create_user(f'user{i}', f'user{i}@example.com', 'password') for i in range(users)]
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    for i in range(videos):
+        topic = rng.choice(TOPICS)
+        cursor.execute('''
+            INSERT INTO videos (user_id, source_url, source_type, title, creator)
+            VALUES (?, NULL, 'youtube', ?, ?)
+        ''', (user_ids[i % users], f'Lecture {i}: {topic} explained', f'Channel {i % 500}'))
+        video_id = cursor.lastrowid
+
+        text = rng.choices(vocab, cum_weights=weights, k=words)
+        text[rng.randrange(words)] = rng.choice(TOPICS)
+        cursor.execute('INSERT INTO transcripts (video_id, transcript_text) VALUES (?, ?)',
+                       (video_id, ' '.join(text)))
+        cursor.execute('INSERT INTO notes (video_id, content) VALUES (?, ?)',
+                       (video_id, f'# {topic.title()}\n\n- ' + ' '.join(text[:words // 8])))
+    conn.commit()
+    conn.close()
+    return user_ids
+
+
+def like_search(db, user_id, query, limit=20):
+    """What a substring search over the same text costs without an index"""
+    pattern = f'%{query}%'
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT DISTINCT v.id
+        FROM videos v
+        LEFT JOIN transcripts t ON v.id = t.video_id
+        LEFT JOIN notes n ON v.id = n.video_id
+        WHERE v.user_id = ?
+          AND (v.title LIKE ? OR v.creator LIKE ? OR t.transcript_text LIKE ? OR n.content LIKE ?)
+        ORDER BY v.processed_date DESC
+        LIMIT ?
+    ''', (user_id, pattern, pattern, pattern, pattern, limit))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def time_query(func, repeats):
+    """Run func `repeats` times and return (p50, p95) latency in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-text search benchmark')
+    parser.add_argument('--videos', type=int, default=50000, help='Videos in the library')
+    parser.add_argument('--words', type=int, default=400, help='Words per transcript')
+    parser.add_argument('--users', type=int, default=20, help='Users the library is spread across')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed runs per query')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db = DatabaseManager(os.path.join(work_dir, 'search.db'))
+        db.init_database()
+
+        start = time.perf_counter()
+        user_ids = build_library(db, args.videos, args.words, args.users)
+        build_seconds = time.perf_counter() - start
+        user_id = user_ids[0]
+
+        results = {}
+        for name, query in QUERIES.items():
+            hits = len(db.search_videos(user_id, query, limit=20)[0])
+            before = time_query(lambda: like_search(db, user_id, query), max(3, args.repeats // 5))
+            after = time_query(lambda: db.search_videos(user_id, query, limit=20), args.repeats)
+            results[name] = {'query': query, 'hits': hits,
+                             'before_p50_ms': before[0], 'before_p95_ms': before[1],
+                             'after_p50_ms': after[0], 'after_p95_ms': after[1]}
+
+    if args.json:
+        print(json.dumps({'videos': args.videos, 'words': args.words, 'build_seconds': build_seconds,
+                          'results': results}))
+        return
+
+    print(f"\nLibrary: {args.videos} videos x {args.words} words, built and indexed in {build_seconds:.1f}s")
+    print(f"\n{'Query':<14}{'hits':>6}{'LIKE p50':>12}{'FTS p50':>12}{'FTS p95':>12}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['hits']:>6}{r['before_p50_ms']:>10.1f}ms{r['after_p50_ms']:>10.1f}ms{r['after_p95_ms']:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
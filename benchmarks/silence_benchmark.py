@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: transcription with and without silence trimming
+
+Transcribes a synthetic lecture-like WAV (speech bursts separated by long
+pauses) with VAD_TRIM_SILENCE off and on, and reports how much audio was
+skipped, the wall-clock time of both runs, and how far the restored
+timestamps land from the speech they belong to on the original timeline.
+
+By default the stub whisper-cli in benchmarks/stubs is used; pass --real to
+use the configured whisper.cpp build and model instead.
+
+Usage:
+    python benchmarks/silence_benchmark.py [--minutes 20] [--speech-seconds 20] [--pause-seconds 8]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fixtures import STUBS_DIR, write_speech_like_wav
+from config import Config
+from processors.transcriber import Transcriber
+
+
+def timed_transcribe(transcriber, audio_path, trim):
+    Config.VAD_TRIM_SILENCE = trim
+    start = time.perf_counter()
+    result = transcriber.transcribe(audio_path)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Silence trimming benchmark')
+    parser.add_argument('--minutes', type=float, default=20, help='Length of the synthetic audio')
+    parser.add_argument('--speech-seconds', type=float, default=20, help='Length of each speech burst')
+    parser.add_argument('--pause-seconds', type=float, default=8, help='Length of each pause')
+    parser.add_argument('--real', action='store_true', help='Use the real whisper-cli and model')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    transcriber = Transcriber()
+    transcriber.server = None
+    with tempfile.TemporaryDirectory() as work_dir:
+        if not args.real:
+            transcriber.whisper_path = os.path.join(STUBS_DIR, 'whisper-cli')
+            transcriber.model_path = os.path.join(work_dir, 'ggml-stub.bin')
+            open(transcriber.model_path, 'w').close()
+
+        audio_path = write_speech_like_wav(os.path.join(work_dir, 'lecture.wav'), args.minutes * 60,
+                                           speech_seconds=args.speech_seconds, pause_seconds=args.pause_seconds)
+
+        full, full_time = timed_transcribe(transcriber, audio_path, trim=False)
+        trimmed, trimmed_time = timed_transcribe(transcriber, audio_path, trim=True)
+
+    # Every restored segment should start in (or within the kept padding of) a speech burst
+    period = args.speech_seconds + args.pause_seconds
+    padding = Config.VAD_PADDING_SECONDS
+    misplaced = 0
+    for entry in trimmed['timestamps'] or []:
+        position = (entry['offsets']['from'] / 1000) % period
+        if args.speech_seconds + padding + 0.05 < position < period - padding - 0.05:
+            misplaced += 1
+
+    trim = trimmed.get('silence_trim') or {}
+    results = {
+        'audio_minutes': args.minutes,
+        'speech_fraction': round(args.speech_seconds / period, 3),
+        'skipped_percent': round(trim.get('skipped_percent', 0), 1),
+        'untrimmed_seconds': round(full_time, 2),
+        'trimmed_seconds': round(trimmed_time, 2),
+        'estimated_saving_seconds': round(trim.get('time_saved_seconds', 0), 2),
+        'speedup': round(full_time / trimmed_time, 2),
+        'timestamps': len(trimmed['timestamps'] or []),
+        'timestamps_in_silence': misplaced,
+        'last_timestamp_seconds': round((trimmed['timestamps'] or [{}])[-1].get('offsets', {}).get('to', 0) / 1000, 1),
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"\nAudio: {args.minutes:g} min, {args.speech_seconds:g}s speech / {args.pause_seconds:g}s pause")
+    print(f"Skipped:          {results['skipped_percent']:.1f}% of the audio")
+    print(f"Untrimmed:        {results['untrimmed_seconds']:.2f}s")
+    print(f"Trimmed:          {results['trimmed_seconds']:.2f}s "
+          f"(estimated saving {results['estimated_saving_seconds']:.2f}s, {results['speedup']:.2f}x)")
+    print(f"Timestamps:       {results['timestamps']} restored, {misplaced} in silence, "
+          f"last ends at {results['last_timestamp_seconds']:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
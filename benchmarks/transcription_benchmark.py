@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-process vs segmented parallel transcription
+
+Transcribes a synthetic speech-like WAV once with a single whisper-cli run
+(as before) and once with Transcriber.transcribe_segmented, and reports the
+wall-clock speedup.
+
+By default the stub whisper-cli in benchmarks/stubs is used, which models
+linear scaling with --threads; pass --real to use the configured whisper.cpp
+build and model instead.
+
+Usage:
+    python benchmarks/transcription_benchmark.py --minutes 60 --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fixtures import STUBS_DIR, write_speech_like_wav
+from processors.transcriber import Transcriber
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Segmented transcription benchmark')
+    parser.add_argument('--minutes', type=float, default=60, help='Length of the synthetic audio')
+    parser.add_argument('--workers', type=int, default=4, help='Parallel whisper-cli processes')
+    parser.add_argument('--real', action='store_true', help='Use the real whisper-cli and model')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    transcriber = Transcriber()
+    with tempfile.TemporaryDirectory() as work_dir:
+        if not args.real:
+            transcriber.whisper_path = os.path.join(STUBS_DIR, 'whisper-cli')
+            transcriber.model_path = os.path.join(work_dir, 'ggml-stub.bin')
+            open(transcriber.model_path, 'w').close()
+
+        audio_path = write_speech_like_wav(os.path.join(work_dir, 'lecture.wav'), args.minutes * 60)
+
+        start = time.perf_counter()
+        single_text, _ = transcriber._run_whisper(audio_path)
+        single_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        segmented = transcriber.transcribe_segmented(audio_path, workers=args.workers)
+        segmented_time = time.perf_counter() - start
+
+    results = {
+        'audio_minutes': args.minutes,
+        'workers': args.workers,
+        'cpu_count': os.cpu_count(),
+        'single_seconds': round(single_time, 2),
+        'segmented_seconds': round(segmented_time, 2),
+        'speedup': round(single_time / segmented_time, 2),
+        'timestamps': len(segmented['timestamps'] or []),
+    }
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"\nAudio: {args.minutes:g} min, {args.workers} workers, {os.cpu_count()} cores")
+        print(f"Single process: {results['single_seconds']:.2f}s")
+        print(f"Segmented:      {results['segmented_seconds']:.2f}s")
+        print(f"Speedup:        {results['speedup']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
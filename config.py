@@ -11,20 +11,109 @@ class Config:
     NOTES_DIR = os.path.join(BASE_DIR, 'notes')
     MODELS_DIR = os.path.join(BASE_DIR, 'models')
     DATABASE_PATH = os.path.join(BASE_DIR, 'voice2note.db')
+    DB_BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', 5))  # Seconds to wait for a lock before "database is locked"
 
     # Whisper configuration
     WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'medium')  # Changed from large-v3 for 2-3x faster transcription
     WHISPER_PATH = os.path.join(BASE_DIR, 'Whisper', 'build', 'bin', 'whisper-cli')
     WHISPER_MODEL_PATH = os.path.join(BASE_DIR, 'Whisper', 'models', f'ggml-{WHISPER_MODEL}.bin')
 
+    # Parallel transcription of long audio: split at silences and run this many whisper-cli
+    # processes at once (1 = disabled). Cores are divided between them.
+    WHISPER_SEGMENT_WORKERS = int(os.getenv('WHISPER_SEGMENT_WORKERS', 1))
+    WHISPER_SEGMENT_MIN_SECONDS = int(os.getenv('WHISPER_SEGMENT_MIN_SECONDS', 300))  # Shortest segment
+
+    # Cores for whisper-cli runs (see processors/cpu_budget.py): each run gets a share of them
+    # sized by how many runs are active, instead of a fixed thread count
+    WHISPER_CPU_CORES = int(os.getenv('WHISPER_CPU_CORES', 0))  # 0 = every core this process may use
+    WHISPER_MAX_THREADS = int(os.getenv('WHISPER_MAX_THREADS', 8))  # whisper.cpp gains little past ~8 threads per run
+    WHISPER_PIN_CPUS = os.getenv('WHISPER_PIN_CPUS', 'False').lower() in ('true', '1', 'yes')  # Bind runs to their cores
+
+    # Silence trimming before transcription (see processors/silence_trimmer.py); timestamps
+    # still refer to the original audio
+    VAD_TRIM_SILENCE = os.getenv('VAD_TRIM_SILENCE', 'True').lower() in ('true', '1', 'yes')
+    VAD_THRESHOLD_DB = float(os.getenv('VAD_THRESHOLD_DB', 15))  # Speech is this much louder than the noise floor
+    VAD_MIN_SILENCE_SECONDS = float(os.getenv('VAD_MIN_SILENCE_SECONDS', 1.0))  # Shorter pauses are kept
+    VAD_PADDING_SECONDS = float(os.getenv('VAD_PADDING_SECONDS', 0.25))  # Silence kept either side of a cut
+    VAD_MIN_SKIP_PERCENT = float(os.getenv('VAD_MIN_SKIP_PERCENT', 5))  # Don't bother trimming less than this
+
+    # Resident whisper models (see whisper_server.py); Transcriber uses them while they are reachable.
+    # Off by default: they save the model load per job, but whisper-server only answers once the whole
+    # file is done, so jobs get no live progress, no early segments for notes during transcription,
+    # and fixed WHISPER_SERVER_THREADS instead of a share of the CPU budget.
+    WHISPER_SERVER_PATH = os.path.join(BASE_DIR, 'Whisper', 'build', 'bin', 'whisper-server')
+    WHISPER_SERVER_HOST = os.getenv('WHISPER_SERVER_HOST', '127.0.0.1')
+    WHISPER_SERVER_PORT = int(os.getenv('WHISPER_SERVER_PORT', 8178))  # First instance; others use the next ports
+    WHISPER_SERVER_INSTANCES = int(os.getenv('WHISPER_SERVER_INSTANCES', 0))  # Resident models (0 = always use whisper-cli)
+    WHISPER_SERVER_THREADS = int(os.getenv('WHISPER_SERVER_THREADS', 4))  # Threads per instance
+    WHISPER_SERVER_HEALTH_INTERVAL = float(os.getenv('WHISPER_SERVER_HEALTH_INTERVAL', 5))  # Seconds between health checks
+
     # yt-dlp configuration (use global installation)
     YT_DLP_PATH = '/usr/local/bin/yt-dlp'
+    YT_DLP_STREAM_AUDIO = os.getenv('YT_DLP_STREAM_AUDIO', 'True').lower() in ('true', '1', 'yes')  # Pipe audio straight into ffmpeg
+    YT_DLP_AUDIO_FORMAT = os.getenv('YT_DLP_AUDIO_FORMAT', 'bestaudio/best')  # Audio-only stream, else the best muxed one
+    METADATA_CACHE_TTL = int(os.getenv('METADATA_CACHE_TTL', 7 * 24 * 3600))  # Seconds a video's title/uploader/chapters are reused
 
     # Ollama configuration
     OLLAMA_API_KEY = os.getenv('OLLAMA_API_KEY', '1728cbe73f944db7afa1a3c8f52d2f41.GzEVZ8ADdcDHwIxdbvKnqbXy')
     OLLAMA_HOST = 'https://ollama.com'
     OLLAMA_MODEL = 'gpt-oss:120b'
 
+    LLM_CHARS_PER_TOKEN = float(os.getenv('LLM_CHARS_PER_TOKEN', 4.0))  # For token estimates (English text)
+
+    # Model backends in order of preference, comma-separated 'host|model' (see processors/llm_router.py)
+    LLM_BACKENDS = os.getenv('LLM_BACKENDS', f'{OLLAMA_HOST}|{OLLAMA_MODEL}')  # e.g. add ',http://localhost:11434|llama3.1:8b'
+    LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', 95))  # Also ask the next backend once time to first token passes this percentile
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20))  # Requests per backend before its percentile is used
+    LLM_HEDGE_DEFAULT_SECONDS = float(os.getenv('LLM_HEDGE_DEFAULT_SECONDS', 30))  # Hedge threshold until then
+    LLM_HEDGE_MIN_SECONDS = float(os.getenv('LLM_HEDGE_MIN_SECONDS', 1))  # Never hedge sooner than this
+
+    # All model requests of a process share one client per host (see processors/llm_client.py)
+    LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', 8))  # Requests in flight per worker process, across jobs
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', 0))  # Request starts per minute (0 = unlimited)
+    LLM_RETRY_ATTEMPTS = int(os.getenv('LLM_RETRY_ATTEMPTS', 4))  # Attempts per request on connection errors, timeouts, 429/5xx
+    LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 1.0))  # Backoff doubles from this, with full jitter
+    LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 30.0))
+    LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', 5))  # Failures in a row that pause all requests
+    LLM_BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', 30.0))  # Seconds before a paused client tries again
+    LLM_WAIT_MAX_SECONDS = int(os.getenv('LLM_WAIT_MAX_SECONDS', 3600))  # Jobs wait this long for the model before failing
+
+    # Long transcripts are split and their notes generated concurrently, then merged (map-reduce)
+    NOTES_MAP_REDUCE_TOKENS = int(os.getenv('NOTES_MAP_REDUCE_TOKENS', 15000))  # Longer transcripts are split (~1 hour of speech)
+    NOTES_CHUNK_TOKENS = int(os.getenv('NOTES_CHUNK_TOKENS', 5000))  # Transcript tokens per chunk (see processors/chunker.py)
+    NOTES_CHUNK_OVERLAP_TOKENS = int(os.getenv('NOTES_CHUNK_OVERLAP_TOKENS', 200))  # Repeated from the previous chunk for context
+    NOTES_MAP_CONCURRENCY = int(os.getenv('NOTES_MAP_CONCURRENCY', 4))  # Chunk requests in flight per job
+    NOTES_DURING_TRANSCRIPTION = os.getenv('NOTES_DURING_TRANSCRIPTION', 'True').lower() in ('true', '1', 'yes')  # Start chunk notes before transcription ends
+    NOTES_PARTIAL_FLUSH_SECONDS = float(os.getenv('NOTES_PARTIAL_FLUSH_SECONDS', 2))  # Streamed notes are saved at most this often
+
+    # Model responses are cached by model + prompt hash (see processors/llm_cache.py)
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    LLM_CACHE_MAX_MB = int(os.getenv('LLM_CACHE_MAX_MB', 256))  # Least recently used responses are evicted past this
+
+    # Job queue configuration (see worker.py)
+    # Per-stage limits: whisper-cli runs share the cores (see WHISPER_CPU_CORES), so transcription is capped by them
+    DOWNLOAD_CONCURRENCY = int(os.getenv('DOWNLOAD_CONCURRENCY', 4))  # I/O bound (yt-dlp, ffmpeg)
+    TRANSCRIBE_CONCURRENCY = int(os.getenv('TRANSCRIBE_CONCURRENCY', max(1, (os.cpu_count() or 4) // 4)))  # CPU bound
+    GENERATE_CONCURRENCY = int(os.getenv('GENERATE_CONCURRENCY', 4))  # Network bound (Ollama)
+    WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY',
+                                       DOWNLOAD_CONCURRENCY + TRANSCRIBE_CONCURRENCY + GENERATE_CONCURRENCY))  # Jobs in flight per worker
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 60))  # Jobs of unresponsive workers are re-queued after this
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))  # Seconds between queue polls when idle
+    PROGRESS_UPDATE_INTERVAL = float(os.getenv('PROGRESS_UPDATE_INTERVAL', 1))  # Non-final status writes per job are coalesced to one per interval
+    JOB_CANCEL_POLL_INTERVAL = float(os.getenv('JOB_CANCEL_POLL_INTERVAL', 0.5))  # Seconds between cancellation checks
+    EMBEDDED_WORKER = os.getenv('EMBEDDED_WORKER', 'True').lower() in ('true', '1', 'yes')  # Only used by `python app.py`
+
+    # Status streaming (see database/status_notifier.py)
+    STATUS_POLL_INTERVAL = float(os.getenv('STATUS_POLL_INTERVAL', 1))  # Seconds between change checks per web process
+    STATUS_STREAM_MAX_SECONDS = int(os.getenv('STATUS_STREAM_MAX_SECONDS', 300))  # Streams reconnect after this
+
+    # Prometheus-style metrics at /metrics (see metrics.py)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(BASE_DIR, 'metrics'))  # Each process writes its metrics here; shared by web and worker processes
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))  # A process's metrics are written at most this often
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # If set, scrapes must send 'Authorization: Bearer <token>'
+
     # Flask configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-change-in-production')
     DEBUG = os.getenv('DEBUG', 'True').lower() in ('true', '1', 'yes')
@@ -44,3 +133,5 @@ class Config:
         os.makedirs(Config.TEMP_DIR, exist_ok=True)
         os.makedirs(Config.NOTES_DIR, exist_ok=True)
         os.makedirs(Config.MODELS_DIR, exist_ok=True)
+        if Config.METRICS_ENABLED:
+            os.makedirs(Config.METRICS_DIR, exist_ok=True)
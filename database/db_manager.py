@@ -1,20 +1,161 @@
+import os
+import re
 import sqlite3
+import sys
 import json
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta
 from config import Config
 import hashlib
+import metrics
+
+
+# Applied once to every new connection
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',  # Readers don't block the writer (and vice versa)
+    'PRAGMA synchronous = NORMAL',  # Safe with WAL, far fewer fsyncs than FULL
+    'PRAGMA foreign_keys = ON',
+    'PRAGMA cache_size = -16000',  # 16 MB page cache
+    'PRAGMA mmap_size = 268435456',  # 256 MB memory-mapped reads
+    'PRAGMA temp_store = MEMORY',
+)
+
+# snippet() markers around matched terms; the web layer escapes the text and swaps them for <mark>
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+# Relative weight of a match in each source when ranking search results
+SEARCH_WEIGHTS = {'title': 4.0, 'notes': 2.0, 'transcript': 1.0}
+
+# Where each source is indexed: (FTS table, searchable columns)
+SEARCH_SOURCES = {
+    'title': ('videos_fts', ('title', 'creator')),
+    'transcript': ('transcripts_fts', ('transcript_text',)),
+    'notes': ('notes_fts', ('content',)),
+}
+
+
+def build_fts_query(text):
+    """Turn free text into an FTS5 expression: every word must match; a trailing * makes it a prefix.
+
+    Prefix terms are opt-in because FTS5 expands them into a full doclist on every lookup.
+    """
+    terms = re.findall(r'(\w+)(\*?)', text or '')
+    if not terms:
+        return None
+    return ' '.join('"{}"{}'.format(word, star) for word, star in terms)
+
+
+def scoped_fts_query(user_id, columns, expression):
+    """Restrict an FTS5 expression to one user's rows and to the given columns"""
+    return 'owner:u{} AND {{{}}}: ({})'.format(int(user_id), ' '.join(columns), expression)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose close() hands it back to its pool
+
+    With metrics on, the time from get_connection() to close() is recorded
+    under the DatabaseManager method that asked for it (one observation
+    per call rather than per statement, to keep hot reads cheap).
+    """
+
+    pool = None
+    checked_out_at = None
+    method = None
+
+    def close(self):
+        if self.checked_out_at is not None:
+            metrics.DB_QUERY_SECONDS.observe(time.perf_counter() - self.checked_out_at, method=self.method)
+            self.checked_out_at = None
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of SQLite connections
+
+    Closed connections go back to a shared idle list and the most recently
+    returned one is handed out next, so the common get_connection() ...
+    close() pattern reuses connections without reconnecting, including on
+    short-lived threads (status and partial-notes timers, per-job threads).
+    Only nested use needs more than one connection per thread.
+    """
+
+    def __init__(self, db_path, max_idle=16, busy_timeout=5.0):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self.busy_timeout = busy_timeout
+        self._reset()
+
+    def _reset(self):
+        # Connections must not be shared with a forked child (e.g. gunicorn workers)
+        self.pid = os.getpid()
+        self.idle = []  # Most recently returned last
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,  # Busy timeout: wait for locks instead of failing
+            check_same_thread=False,  # Connections move between threads via the idle list
+            factory=PooledConnection
+        )
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        """Get an idle connection, or open a new one if there is none"""
+        if os.getpid() != self.pid:
+            self._reset()
+
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return self._connect()
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any uncommitted work"""
+        if conn.in_transaction:
+            conn.rollback()
+        conn.isolation_level = ''  # Undo per-call changes (e.g. manual transactions)
+
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+        sqlite3.Connection.close(conn)
 
 
 class DatabaseManager:
     """Manages database operations for Voice2Note"""
 
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, pooled=True):
         self.db_path = db_path or Config.DATABASE_PATH
+        self.pool = ConnectionPool(self.db_path, busy_timeout=Config.DB_BUSY_TIMEOUT) if pooled else None
 
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable column access by name
+        """
+        Get database connection
+
+        Pooled connections go back to the pool when closed.
+        """
+        if self.pool:
+            conn = self.pool.acquire()
+        else:
+            conn = sqlite3.connect(self.db_path, factory=PooledConnection)  # Not pooled: close() really closes
+            conn.row_factory = sqlite3.Row  # Enable column access by name
+
+        if Config.METRICS_ENABLED:
+            conn.method = sys._getframe(1).f_code.co_name
+            conn.checked_out_at = time.perf_counter()
         return conn
 
     def init_database(self):
@@ -23,7 +164,7 @@ class DatabaseManager:
         cursor = conn.cursor()
 
         # Read and execute schema
-        with open('database/schema.sql', 'r') as f:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql'), 'r') as f:
             schema = f.read()
             cursor.executescript(schema)
 
@@ -82,27 +223,19 @@ class DatabaseManager:
         return notes_id
 
     def update_processing_status(self, video_id, status, progress=None, error_message=None):
-        """Update or create processing status"""
+        """Update or create processing status (single upsert on the unique video_id)"""
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        # Check if status exists
-        cursor.execute('SELECT id FROM processing_status WHERE video_id = ?', (video_id,))
-        existing = cursor.fetchone()
-
-        if existing:
-            # Update existing
-            cursor.execute('''
-                UPDATE processing_status
-                SET status = ?, progress = ?, error_message = ?, updated_at = ?
-                WHERE video_id = ?
-            ''', (status, progress, error_message, datetime.now(), video_id))
-        else:
-            # Create new
-            cursor.execute('''
-                INSERT INTO processing_status (video_id, status, progress, error_message)
-                VALUES (?, ?, ?, ?)
-            ''', (video_id, status, progress, error_message))
+        cursor.execute('''
+            INSERT INTO processing_status (video_id, status, progress, error_message, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(video_id) DO UPDATE SET
+                status = excluded.status,
+                progress = excluded.progress,
+                error_message = excluded.error_message,
+                updated_at = excluded.updated_at
+        ''', (video_id, status, progress, error_message, datetime.now()))
 
         conn.commit()
         conn.close()
@@ -151,6 +284,38 @@ class DatabaseManager:
         conn.close()
         return dict(status) if status else None
 
+    def get_active_processing_statuses(self, user_ids, video_ids=()):
+        """
+        Get processing status of users' in-progress videos in one query
+
+        Args:
+            user_ids: Users whose in-progress (ACTIVE_STATUSES) videos to include
+            video_ids: Additional videos of those users to include whatever their status
+
+        Returns:
+            list of dicts with video_id, user_id, title, status, progress and error_message
+        """
+        if not user_ids:
+            return []
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        user_placeholders = ', '.join('?' * len(user_ids))
+        video_placeholders = ', '.join('?' * len(video_ids)) or 'NULL'
+        cursor.execute(f'''
+            SELECT ps.video_id, v.user_id, v.title, ps.status, ps.progress, ps.error_message
+            FROM videos v
+            JOIN processing_status ps ON v.id = ps.video_id
+            WHERE v.user_id IN ({user_placeholders})
+              AND (ps.status IN ('pending', 'extracting', 'transcribing', 'generating', 'waiting_llm')
+                   OR ps.video_id IN ({video_placeholders}))
+        ''', list(user_ids) + list(video_ids))
+        statuses = cursor.fetchall()
+
+        conn.close()
+        return [dict(status) for status in statuses]
+
     def get_all_videos(self, limit=50, offset=0):
         """Get all videos with pagination"""
         conn = self.get_connection()
@@ -170,23 +335,112 @@ class DatabaseManager:
 
         return [dict(video) for video in videos]
 
-    def search_videos(self, query):
-        """Search videos by title or creator"""
+    def search_videos(self, user_id, query, limit=20, offset=0):
+        """Full-text search over a user's titles, transcripts and notes, best matches first.
+
+        Returns (results, has_more); each result carries the source it matched best in
+        and a snippet with matched terms wrapped in SNIPPET_START/SNIPPET_END.
+        """
+        expression = build_fts_query(query)
+        if expression is None:
+            return [], False
+        match = {source: scoped_fts_query(user_id, columns, expression)
+                 for source, (table, columns) in SEARCH_SOURCES.items()}
+
         conn = self.get_connection()
         cursor = conn.cursor()
 
+        # Rank first, without snippets, so only the returned page pays for them.
+        # bm25() is negative (lower is better) and the owner column is weighted 0.
+        # SUM ranks a video matching in several places higher; the bare columns take
+        # their values from the row that produced MIN(rank), i.e. the best single match.
         cursor.execute('''
-            SELECT v.*, n.id as notes_id
+            WITH matches AS (
+                SELECT rowid AS video_id, 'title' AS matched_in, rowid AS doc_id,
+                       bm25(videos_fts, 10.0, 2.0, 0.0) * :title_weight AS rank
+                FROM videos_fts
+                WHERE videos_fts MATCH :title_match
+                UNION ALL
+                SELECT t.video_id, 'transcript', t.id,
+                       bm25(transcripts_fts, 1.0, 0.0) * :transcript_weight
+                FROM transcripts_fts
+                JOIN transcripts t ON t.id = transcripts_fts.rowid
+                WHERE transcripts_fts MATCH :transcript_match
+                UNION ALL
+                SELECT n.video_id, 'notes', n.id,
+                       bm25(notes_fts, 1.0, 0.0) * :notes_weight
+                FROM notes_fts
+                JOIN notes n ON n.id = notes_fts.rowid
+                WHERE notes_fts MATCH :notes_match
+            )
+            SELECT video_id, SUM(rank) AS score, MIN(rank), matched_in, doc_id
+            FROM matches
+            GROUP BY video_id
+            ORDER BY score
+            LIMIT :limit OFFSET :offset
+        ''', {
+            'title_match': match['title'],
+            'transcript_match': match['transcript'],
+            'notes_match': match['notes'],
+            'title_weight': SEARCH_WEIGHTS['title'],
+            'transcript_weight': SEARCH_WEIGHTS['transcript'],
+            'notes_weight': SEARCH_WEIGHTS['notes'],
+            'limit': limit + 1,
+            'offset': offset,
+        })
+        ranked = cursor.fetchall()
+        has_more = len(ranked) > limit
+        ranked = ranked[:limit]
+        if not ranked:
+            conn.close()
+            return [], has_more
+
+        # Snippets for the page, per source
+        snippets = {}
+        for source, (table, columns) in SEARCH_SOURCES.items():
+            doc_ids = [row['doc_id'] for row in ranked if row['matched_in'] == source]
+            if not doc_ids:
+                continue
+            placeholders = ', '.join('?' * len(doc_ids))
+            snippet_columns = ', '.join(
+                f"snippet({table}, {index}, ?, ?, '…', 24)" for index in range(len(columns)))
+            # One scan over the rowid range; "+rowid IN" filters without splitting it into a lookup per id
+            cursor.execute(f'''
+                SELECT rowid, {snippet_columns}
+                FROM {table}
+                WHERE {table} MATCH ? AND rowid BETWEEN ? AND ? AND +rowid IN ({placeholders})
+            ''', [SNIPPET_START, SNIPPET_END] * len(columns) + [match[source], min(doc_ids), max(doc_ids)] + doc_ids)
+            for row in cursor.fetchall():
+                # Prefer the column the match was actually in (title vs creator)
+                highlighted = [text for text in row[1:] if text and SNIPPET_START in text]
+                snippets[(source, row[0])] = highlighted[0] if highlighted else row[1]
+
+        video_ids = [row['video_id'] for row in ranked]
+        placeholders = ', '.join('?' * len(video_ids))
+        cursor.execute(f'''
+            SELECT v.*, n.id as notes_id, ps.status as processing_status
             FROM videos v
             LEFT JOIN notes n ON v.id = n.video_id
-            WHERE v.title LIKE ? OR v.creator LIKE ?
-            ORDER BY v.processed_date DESC
-        ''', (f'%{query}%', f'%{query}%'))
-
-        videos = cursor.fetchall()
+            LEFT JOIN processing_status ps ON v.id = ps.video_id
+            WHERE v.id IN ({placeholders})
+            GROUP BY v.id
+        ''', video_ids)
+        videos = {video['id']: dict(video) for video in cursor.fetchall()}
         conn.close()
 
-        return [dict(video) for video in videos]
+        results = []
+        for row in ranked:
+            video = videos.get(row['video_id'])
+            if video is None:
+                continue
+            video.update({
+                'score': row['score'],
+                'matched_in': row['matched_in'],
+                'snippet': snippets.get((row['matched_in'], row['doc_id']), ''),
+            })
+            results.append(video)
+
+        return results, has_more
 
     def delete_video(self, video_id):
         """Delete a video and all related data"""
@@ -419,3 +673,634 @@ class DatabaseManager:
 
         conn.commit()
         conn.close()
+
+    # ===== Job Queue Methods =====
+
+    def enqueue_job(self, video_id, source, is_file=False, file_path=None, content_key=None, regenerate=False):
+        """
+        Queue a video for processing by a worker
+
+        If an identical job (same content_key) is already queued or running,
+        the new job is 'attached' to it instead of being queued, and is
+        completed from the leader's results when it finishes. A regenerate
+        job is always queued: its worker skips the stored results and the
+        LLM response cache.
+
+        Returns:
+            dict with the job's id, state and leader_job_id
+        """
+        conn = self.get_connection()
+        conn.isolation_level = None  # Manage the transaction explicitly
+        cursor = conn.cursor()
+
+        try:
+            # Lock before looking for a leader so concurrent duplicates can't both lead
+            cursor.execute('BEGIN IMMEDIATE')
+
+            leader = None
+            if content_key and not regenerate:
+                cursor.execute('''
+                    SELECT id FROM jobs
+                    WHERE content_key = ? AND state IN ('queued', 'running')
+                    ORDER BY id
+                    LIMIT 1
+                ''', (content_key,))
+                leader = cursor.fetchone()
+
+            state = 'attached' if leader else 'queued'
+            leader_job_id = leader['id'] if leader else None
+
+            cursor.execute('''
+                INSERT INTO jobs (video_id, source, is_file, file_path, state, content_key,
+                                  leader_job_id, regenerate, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (video_id, source, 1 if is_file else 0, file_path, state, content_key,
+                  leader_job_id, 1 if regenerate else 0, datetime.now()))
+            job_id = cursor.lastrowid
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        return {'id': job_id, 'state': state, 'leader_job_id': leader_job_id}
+
+    def claim_job(self, worker_id, lease_seconds=60, max_attempts=3):
+        """
+        Atomically claim the next runnable job and lease it to a worker
+
+        A job is runnable when it is queued, or when it is running but its
+        lease has expired (the worker that held it died or was recycled).
+
+        Returns:
+            dict with the claimed job, or None if the queue is empty
+        """
+        conn = self.get_connection()
+        conn.isolation_level = None  # Manage the transaction explicitly
+        cursor = conn.cursor()
+        now = datetime.now()
+        lease_expires_at = now + timedelta(seconds=lease_seconds)
+
+        try:
+            # IMMEDIATE takes the write lock up front so two workers can't
+            # select the same job before either of them updates it
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT * FROM jobs
+                WHERE cancel_requested = 0 AND attempts < ?
+                  AND (state = 'queued' OR (state = 'running' AND lease_expires_at < ?))
+                ORDER BY id
+                LIMIT 1
+            ''', (max_attempts, now))
+            job = cursor.fetchone()
+
+            if not job:
+                cursor.execute('COMMIT')
+                return None
+
+            cursor.execute('''
+                UPDATE jobs
+                SET state = 'running', worker_id = ?, attempts = attempts + 1,
+                    lease_expires_at = ?, updated_at = ?
+                WHERE id = ?
+            ''', (worker_id, lease_expires_at, now, job['id']))
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        job = dict(job)
+        job.update(state='running', worker_id=worker_id, attempts=job['attempts'] + 1,
+                   lease_expires_at=lease_expires_at)
+        return job
+
+    def renew_job_lease(self, job_id, worker_id, lease_seconds=60):
+        """
+        Extend a running job's lease (worker heartbeat)
+
+        Returns:
+            dict with cancel_requested, or None if the worker no longer owns the job
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            UPDATE jobs
+            SET lease_expires_at = ?, updated_at = ?
+            WHERE id = ? AND worker_id = ? AND state = 'running'
+        ''', (datetime.now() + timedelta(seconds=lease_seconds), datetime.now(), job_id, worker_id))
+        owned = cursor.rowcount > 0
+
+        cursor.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,))
+        row = cursor.fetchone()
+
+        conn.commit()
+        conn.close()
+
+        if not owned or not row:
+            return None
+        return {'cancel_requested': bool(row['cancel_requested'])}
+
+    def finish_job(self, job_id, state):
+        """
+        Mark a job as finished ('done', 'failed' or 'cancelled') and release its lease
+
+        Jobs attached to a job that didn't succeed are handed a new leader.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            UPDATE jobs
+            SET state = ?, lease_expires_at = NULL, updated_at = ?
+            WHERE id = ?
+        ''', (state, datetime.now(), job_id))
+
+        conn.commit()
+        conn.close()
+
+        if state != 'done':
+            self.promote_attached_jobs(job_id)
+
+    def get_attached_jobs(self, leader_job_id):
+        """Get jobs waiting on an identical in-flight job"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT * FROM jobs
+            WHERE leader_job_id = ? AND state = 'attached'
+            ORDER BY id
+        ''', (leader_job_id,))
+        jobs = cursor.fetchall()
+
+        conn.close()
+        return [dict(job) for job in jobs]
+
+    def promote_attached_jobs(self, leader_job_id):
+        """
+        Re-queue jobs attached to a leader that failed or was cancelled
+
+        The oldest attached job becomes the new leader and the rest are
+        re-attached to it, so the content is still only processed once.
+        """
+        attached = self.get_attached_jobs(leader_job_id)
+        if not attached:
+            return
+
+        new_leader, followers = attached[0], attached[1:]
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        now = datetime.now()
+
+        cursor.execute('''
+            UPDATE jobs
+            SET state = 'queued', leader_job_id = NULL, updated_at = ?
+            WHERE id = ?
+        ''', (now, new_leader['id']))
+
+        for job in followers:
+            cursor.execute('''
+                UPDATE jobs
+                SET leader_job_id = ?, updated_at = ?
+                WHERE id = ?
+            ''', (new_leader['id'], now, job['id']))
+
+        conn.commit()
+        conn.close()
+
+    def request_job_cancel(self, video_id):
+        """
+        Request cancellation of a video's active job
+
+        Queued and attached jobs are cancelled immediately; running jobs are
+        flagged and the owning worker picks the flag up on its next heartbeat.
+
+        Returns:
+            int: number of jobs affected
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        now = datetime.now()
+
+        cursor.execute('''
+            UPDATE jobs
+            SET state = 'cancelled', cancel_requested = 1, updated_at = ?
+            WHERE video_id = ? AND state IN ('queued', 'attached')
+        ''', (now, video_id))
+        affected = cursor.rowcount
+
+        cursor.execute('''
+            UPDATE jobs
+            SET cancel_requested = 1, updated_at = ?
+            WHERE video_id = ? AND state = 'running'
+        ''', (now, video_id))
+        affected += cursor.rowcount
+
+        conn.commit()
+        conn.close()
+
+        return affected
+
+    def get_cancel_requested_jobs(self, job_ids):
+        """
+        Return the subset of job IDs that have a pending cancellation request
+
+        Jobs that no longer exist are included: deleting a video removes its
+        jobs (ON DELETE CASCADE), flag and all, and that is a cancellation too.
+        """
+        if not job_ids:
+            return []
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        placeholders = ', '.join('?' * len(job_ids))
+        cursor.execute(f'''
+            SELECT id, cancel_requested FROM jobs
+            WHERE id IN ({placeholders})
+        ''', list(job_ids))
+        rows = {row['id']: row['cancel_requested'] for row in cursor.fetchall()}
+
+        conn.close()
+        return [job_id for job_id in job_ids if rows.get(job_id, 1)]
+
+    def reap_expired_jobs(self, max_attempts=3):
+        """
+        Fail running jobs whose lease expired after their last allowed attempt
+
+        Returns:
+            list of video IDs whose jobs were failed
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        now = datetime.now()
+
+        cursor.execute('''
+            SELECT id, video_id, cancel_requested FROM jobs
+            WHERE state = 'running' AND lease_expires_at < ?
+              AND (attempts >= ? OR cancel_requested = 1)
+        ''', (now, max_attempts))
+        expired = cursor.fetchall()
+
+        failed_video_ids = []
+        for job in expired:
+            # A cancelled job whose worker died never reports back, so close it here
+            state = 'cancelled' if job['cancel_requested'] else 'failed'
+            cursor.execute('''
+                UPDATE jobs
+                SET state = ?, lease_expires_at = NULL, updated_at = ?
+                WHERE id = ?
+            ''', (state, now, job['id']))
+            if state == 'failed':
+                failed_video_ids.append(job['video_id'])
+
+        conn.commit()
+        conn.close()
+
+        for job in expired:
+            self.promote_attached_jobs(job['id'])
+
+        return failed_video_ids
+
+    def count_jobs(self, state='queued'):
+        """Count jobs in a given state"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT COUNT(*) FROM jobs WHERE state = ?', (state,))
+        count = cursor.fetchone()[0]
+
+        conn.close()
+        return count
+
+    def count_jobs_by_state(self, states=('queued', 'attached', 'running')):
+        """Count jobs in each of the given states (0 for states with none)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+            SELECT state, COUNT(*) AS count FROM jobs
+            WHERE state IN ({', '.join('?' * len(states))})
+            GROUP BY state
+        ''', tuple(states))
+        counts = {row['state']: row['count'] for row in cursor.fetchall()}
+
+        conn.close()
+        return {state: counts.get(state, 0) for state in states}
+
+    # ===== Artifact Cache Methods =====
+
+    def get_artifact(self, content_key):
+        """Get stored transcript and notes for a content key"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT * FROM artifacts WHERE content_key = ?', (content_key,))
+        artifact = cursor.fetchone()
+
+        conn.close()
+        metrics.CACHE_REQUESTS.inc(cache='artifact', result='hit' if artifact else 'miss')
+        return dict(artifact) if artifact else None
+
+    def save_artifact(self, content_key, metadata, transcript_text, timestamps, notes_content):
+        """Store a processed video's transcript and notes under its content key"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        timestamps_json = json.dumps(timestamps) if timestamps else None
+
+        cursor.execute('''
+            INSERT OR REPLACE INTO artifacts
+                (content_key, title, creator, duration, source_url, transcript_text, timestamps, notes_content)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (content_key, metadata.get('title'), metadata.get('channel'), metadata.get('duration'),
+              metadata.get('url'), transcript_text, timestamps_json, notes_content))
+
+        conn.commit()
+        conn.close()
+
+    def apply_artifact(self, video_id, artifact, title=None):
+        """
+        Fill in a video from a stored artifact and mark it completed
+
+        Args:
+            video_id: Video to complete
+            artifact: Row from get_artifact()
+            title: Optional title override (uploads keep the uploader's filename)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            UPDATE videos
+            SET title = ?, creator = ?, duration = ?, source_url = COALESCE(source_url, ?)
+            WHERE id = ?
+        ''', (title or artifact['title'], artifact['creator'], artifact['duration'],
+              artifact['source_url'], video_id))
+
+        cursor.execute('''
+            INSERT INTO transcripts (video_id, transcript_text, timestamps)
+            VALUES (?, ?, ?)
+        ''', (video_id, artifact['transcript_text'], artifact['timestamps']))
+
+        cursor.execute('''
+            INSERT INTO notes (video_id, content, format)
+            VALUES (?, ?, 'markdown')
+        ''', (video_id, artifact['notes_content']))
+
+        conn.commit()
+        conn.close()
+
+        self.update_processing_status(video_id, 'completed', progress=100)
+
+    # ===== Metadata Cache Methods =====
+
+    def get_video_metadata(self, content_key, max_age):
+        """Get cached metadata for a content key if it is less than max_age seconds old"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT * FROM video_metadata
+            WHERE content_key = ? AND fetched_at >= ?
+        ''', (content_key, datetime.now() - timedelta(seconds=max_age)))
+        row = cursor.fetchone()
+
+        conn.close()
+        metrics.CACHE_REQUESTS.inc(cache='metadata', result='hit' if row else 'miss')
+        if not row:
+            return None
+
+        return {
+            'title': row['title'],
+            'channel': row['creator'],
+            'duration': row['duration'],
+            'description': row['description'] or '',
+            'chapters': json.loads(row['chapters']) if row['chapters'] else [],
+        }
+
+    def save_video_metadata(self, content_key, metadata, max_age):
+        """Cache a video's metadata and drop entries older than max_age seconds"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        now = datetime.now()
+        chapters_json = json.dumps(metadata.get('chapters')) if metadata.get('chapters') else None
+
+        cursor.execute('''
+            INSERT OR REPLACE INTO video_metadata
+                (content_key, title, creator, duration, description, chapters, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (content_key, metadata.get('title'), metadata.get('channel'), metadata.get('duration'),
+              metadata.get('description'), chapters_json, now))
+        cursor.execute('DELETE FROM video_metadata WHERE fetched_at < ?', (now - timedelta(seconds=max_age),))
+
+        conn.commit()
+        conn.close()
+
+    # ===== LLM Response Cache Methods =====
+
+    def get_llm_response(self, cache_key):
+        """Get a cached model response and mark it as recently used"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT response FROM llm_responses WHERE cache_key = ?', (cache_key,))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute('''
+                UPDATE llm_responses
+                SET hits = hits + 1, last_used_at = ?
+                WHERE cache_key = ?
+            ''', (datetime.now(), cache_key))
+            conn.commit()
+
+        conn.close()
+        metrics.CACHE_REQUESTS.inc(cache='llm', result='hit' if row else 'miss')
+        return row['response'] if row else None
+
+    def save_llm_response(self, cache_key, model, response, max_bytes):
+        """
+        Cache a model response, then evict least recently used responses
+        until the cache holds at most max_bytes
+
+        Returns:
+            int: number of responses evicted
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        now = datetime.now()
+        cursor.execute('''
+            INSERT OR REPLACE INTO llm_responses (cache_key, model, response, size, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (cache_key, model, response, len(response.encode('utf-8')), now, now))
+
+        # Keep the most recently used responses whose running total fits
+        cursor.execute('''
+            DELETE FROM llm_responses
+            WHERE cache_key IN (
+                SELECT cache_key FROM (
+                    SELECT cache_key,
+                           SUM(size) OVER (ORDER BY last_used_at DESC, cache_key) AS running_size
+                    FROM llm_responses
+                )
+                WHERE running_size > ?
+            )
+        ''', (max_bytes,))
+        evicted = cursor.rowcount
+
+        conn.commit()
+        conn.close()
+        return evicted
+
+    def get_llm_cache_stats(self):
+        """Entries, total bytes and lifetime hits (entries still cached) of the LLM response cache"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes, COALESCE(SUM(hits), 0) AS lifetime_hits
+            FROM llm_responses
+        ''')
+        stats = dict(cursor.fetchone())
+
+        conn.close()
+        return stats
+
+    # ===== Partial Notes Methods =====
+
+    def save_partial_notes(self, video_id, content, prompt_key=None):
+        """Store the notes streamed so far for a video (replacing the previous snapshot)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            INSERT OR REPLACE INTO partial_notes (video_id, content, prompt_key, updated_at)
+            VALUES (?, ?, ?, ?)
+        ''', (video_id, content, prompt_key, datetime.now()))
+
+        conn.commit()
+        conn.close()
+
+    def get_partial_notes(self, video_id):
+        """Get the partial notes of a video, or None"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT * FROM partial_notes WHERE video_id = ?', (video_id,))
+        partial = cursor.fetchone()
+
+        conn.close()
+        return dict(partial) if partial else None
+
+    def get_notes_progress(self, video_id, since=None):
+        """
+        Processing status of a video plus its partial notes if they changed
+        after `since` (an updated_at value), in one query
+
+        Returns:
+            dict with status, progress, error_message, content and
+            updated_at (the last two None when unchanged), or None
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT ps.status, ps.progress, ps.error_message, pn.content, pn.updated_at
+            FROM processing_status ps
+            LEFT JOIN partial_notes pn ON pn.video_id = ps.video_id AND (? IS NULL OR pn.updated_at > ?)
+            WHERE ps.video_id = ?
+        ''', (since, since, video_id))
+        progress = cursor.fetchone()
+
+        conn.close()
+        return dict(progress) if progress else None
+
+    def delete_partial_notes(self, video_id):
+        """Drop a video's partial notes (once the finished notes are saved)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('DELETE FROM partial_notes WHERE video_id = ?', (video_id,))
+
+        conn.commit()
+        conn.close()
+
+    # ===== Processing Event Methods =====
+
+    def add_processing_event(self, video_id, stage, outcome, started_at, ended_at, duration_seconds,
+                             num_bytes=None, audio_seconds=None, detail=None, worker_id=None):
+        """
+        Append one run of a pipeline stage to a video's timeline
+
+        The video's owner is stored on the event, which is kept when the
+        video is deleted, so per-user reports still count the work.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            INSERT INTO processing_events
+                (video_id, user_id, stage, outcome, started_at, ended_at, duration_seconds, bytes,
+                 audio_seconds, detail, worker_id)
+            VALUES (?, (SELECT user_id FROM videos WHERE id = ?), ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (video_id, video_id, stage, outcome, started_at, ended_at, duration_seconds, num_bytes,
+              audio_seconds, detail, worker_id))
+
+        conn.commit()
+        conn.close()
+
+    def get_processing_events(self, video_id):
+        """All stage runs of a video, oldest first (earlier attempts included)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT * FROM processing_events
+            WHERE video_id = ?
+            ORDER BY started_at, id
+        ''', (video_id,))
+        events = cursor.fetchall()
+
+        conn.close()
+        return [dict(event) for event in events]
+
+    def get_time_report(self, days=14, user_id=None):
+        """
+        Where processing time went per day: totals per stage over the last
+        `days` days, optionally for one user's videos only (deleted videos
+        included)
+
+        Returns:
+            list of dicts (day, stage, runs, failed, jobs, total_seconds,
+            avg_seconds, max_seconds, audio_seconds, bytes), newest day first
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        since = (datetime.now() - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        cursor.execute('''
+            SELECT date(e.started_at) AS day, e.stage,
+                   COUNT(*) AS runs,
+                   SUM(e.outcome != 'completed') AS failed,
+                   COUNT(DISTINCT e.video_id) AS jobs,
+                   SUM(e.duration_seconds) AS total_seconds,
+                   AVG(e.duration_seconds) AS avg_seconds,
+                   MAX(e.duration_seconds) AS max_seconds,
+                   SUM(e.audio_seconds) AS audio_seconds,
+                   SUM(e.bytes) AS bytes
+            FROM processing_events e
+            LEFT JOIN videos v ON v.id = e.video_id
+            WHERE e.started_at >= ? AND (? IS NULL OR COALESCE(e.user_id, v.user_id) = ?)
+            GROUP BY day, e.stage
+            ORDER BY day DESC, total_seconds DESC
+        ''', (since, user_id, user_id))
+        rows = cursor.fetchall()
+
+        conn.close()
+        return [dict(row) for row in rows]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Migration: Add jobs table
+Date: 2026-10-18
+Description: Adds the jobs table used as a durable processing queue by worker.py
+"""
+
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+
+def upgrade():
+    """Apply the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Create jobs table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                is_file INTEGER DEFAULT 0,
+                file_path TEXT,
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER DEFAULT 0,
+                worker_id TEXT,
+                lease_expires_at TIMESTAMP,
+                cancel_requested INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
+            )
+        ''')
+
+        # Create indexes
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_video ON jobs(video_id)')
+
+        conn.commit()
+        print("✓ Migration 002_add_jobs_table: SUCCESS")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration 002_add_jobs_table: FAILED - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def downgrade():
+    """Revert the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('DROP TABLE IF EXISTS jobs')
+        conn.commit()
+        print("✓ Migration 002_add_jobs_table: ROLLED BACK")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration rollback failed - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Jobs table migration')
+    parser.add_argument('--downgrade', action='store_true', help='Rollback this migration')
+    args = parser.parse_args()
+
+    if args.downgrade:
+        downgrade()
+    else:
+        upgrade()
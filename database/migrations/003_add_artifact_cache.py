@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Migration: Add artifact cache
+Date: 2026-10-18
+Description: Adds the artifacts table and content_key/leader_job_id columns on jobs
+             so repeat submissions reuse stored transcripts and notes
+"""
+
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+
+def upgrade():
+    """Apply the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Create artifacts table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS artifacts (
+                content_key TEXT PRIMARY KEY,
+                title TEXT,
+                creator TEXT,
+                duration INTEGER,
+                source_url TEXT,
+                transcript_text TEXT NOT NULL,
+                timestamps TEXT,
+                notes_content TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Add coalescing columns to jobs
+        cursor.execute('PRAGMA table_info(jobs)')
+        columns = {row[1] for row in cursor.fetchall()}
+        if 'content_key' not in columns:
+            cursor.execute('ALTER TABLE jobs ADD COLUMN content_key TEXT')
+        if 'leader_job_id' not in columns:
+            cursor.execute('ALTER TABLE jobs ADD COLUMN leader_job_id INTEGER')
+
+        # Create indexes
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_content_key ON jobs(content_key, state)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_leader ON jobs(leader_job_id)')
+
+        conn.commit()
+        print("✓ Migration 003_add_artifact_cache: SUCCESS")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration 003_add_artifact_cache: FAILED - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def downgrade():
+    """Revert the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('DROP TABLE IF EXISTS artifacts')
+        cursor.execute('DROP INDEX IF EXISTS idx_jobs_content_key')
+        cursor.execute('DROP INDEX IF EXISTS idx_jobs_leader')
+        cursor.execute('ALTER TABLE jobs DROP COLUMN content_key')
+        cursor.execute('ALTER TABLE jobs DROP COLUMN leader_job_id')
+        conn.commit()
+        print("✓ Migration 003_add_artifact_cache: ROLLED BACK")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration rollback failed - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Artifact cache migration')
+    parser.add_argument('--downgrade', action='store_true', help='Rollback this migration')
+    args = parser.parse_args()
+
+    if args.downgrade:
+        downgrade()
+    else:
+        upgrade()
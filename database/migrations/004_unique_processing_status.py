@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Migration: Unique processing status per video
+Date: 2026-10-18
+Description: Removes duplicate processing_status rows (keeping the newest per video)
+             and adds a UNIQUE index on video_id so status writes can be upserts
+"""
+
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+
+def upgrade():
+    """Apply the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Keep only the newest row per video
+        cursor.execute('''
+            DELETE FROM processing_status
+            WHERE id NOT IN (SELECT MAX(id) FROM processing_status GROUP BY video_id)
+        ''')
+        removed = cursor.rowcount
+
+        # Replace the plain index with a unique one
+        cursor.execute('DROP INDEX IF EXISTS idx_processing_status_video')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_processing_status_video_unique
+            ON processing_status(video_id)
+        ''')
+
+        conn.commit()
+        print(f"✓ Migration 004_unique_processing_status: SUCCESS ({removed} duplicate rows removed)")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration 004_unique_processing_status: FAILED - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def downgrade():
+    """Revert the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('DROP INDEX IF EXISTS idx_processing_status_video_unique')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_processing_status_video ON processing_status(video_id)')
+        conn.commit()
+        print("✓ Migration 004_unique_processing_status: ROLLED BACK")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration rollback failed - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Unique processing status migration')
+    parser.add_argument('--downgrade', action='store_true', help='Rollback this migration')
+    args = parser.parse_args()
+
+    if args.downgrade:
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Migration: Add full-text search
+Date: 2026-10-18
+Description: Adds FTS5 indexes over video titles/creators, transcripts and notes,
+             the triggers that keep them in sync, and indexes existing rows
+"""
+
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+FTS_TABLES = ('videos_fts', 'transcripts_fts', 'notes_fts')
+
+VIEWS = ('videos_search', 'transcripts_search', 'notes_search')
+
+TRIGGERS = (
+    'videos_fts_insert', 'videos_fts_delete_children', 'videos_fts_delete', 'videos_fts_update',
+    'transcripts_fts_insert', 'transcripts_fts_delete', 'transcripts_fts_update',
+    'notes_fts_insert', 'notes_fts_delete', 'notes_fts_update',
+)
+
+
+def fts_statements():
+    """The FTS section of schema.sql, so the migration and fresh installs stay identical"""
+    schema_path = os.path.join(os.path.dirname(__file__), '..', 'schema.sql')
+    with open(schema_path, 'r') as f:
+        schema = f.read()
+    section = schema[schema.index('-- Full-text search'):schema.index('-- Indexes for better query performance')]
+
+    # Split into statements (trigger bodies contain semicolons of their own)
+    statements, current = [], ''
+    for line in section.splitlines(keepends=True):
+        if line.lstrip().startswith('--'):
+            continue
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ''
+    return statements
+
+
+def upgrade():
+    """Apply the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Create FTS tables and sync triggers
+        cursor.execute('BEGIN')
+        for statement in fts_statements():
+            cursor.execute(statement)
+
+        # Index rows that existed before the triggers did
+        for table in FTS_TABLES:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+
+        conn.commit()
+        print("✓ Migration 005_add_fts_search: SUCCESS")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration 005_add_fts_search: FAILED - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def downgrade():
+    """Revert the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        for trigger in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        for table in FTS_TABLES:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        for view in VIEWS:
+            cursor.execute(f'DROP VIEW IF EXISTS {view}')
+        conn.commit()
+        print("✓ Migration 005_add_fts_search: ROLLED BACK")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration rollback failed - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Full-text search migration')
+    parser.add_argument('--downgrade', action='store_true', help='Rollback this migration')
+    args = parser.parse_args()
+
+    if args.downgrade:
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Migration: Add video metadata cache
+Date: 2026-10-18
+Description: Adds the video_metadata table, which keeps the title, uploader,
+             duration and chapters yt-dlp reported for a video
+"""
+
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+
+def upgrade():
+    """Apply the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Create video_metadata table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS video_metadata (
+                content_key TEXT PRIMARY KEY,
+                title TEXT,
+                creator TEXT,
+                duration INTEGER,
+                description TEXT,
+                chapters TEXT,
+                fetched_at TIMESTAMP NOT NULL
+            )
+        ''')
+
+        # Create index
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_metadata_fetched ON video_metadata(fetched_at)')
+
+        conn.commit()
+        print("✓ Migration 006_add_metadata_cache: SUCCESS")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration 006_add_metadata_cache: FAILED - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def downgrade():
+    """Revert the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('DROP INDEX IF EXISTS idx_video_metadata_fetched')
+        cursor.execute('DROP TABLE IF EXISTS video_metadata')
+        conn.commit()
+        print("✓ Migration 006_add_metadata_cache: ROLLED BACK")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration rollback failed - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Video metadata cache migration')
+    parser.add_argument('--downgrade', action='store_true', help='Rollback this migration')
+    args = parser.parse_args()
+
+    if args.downgrade:
+        downgrade()
+    else:
+        upgrade()
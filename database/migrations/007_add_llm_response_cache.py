@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Migration: Add LLM response cache
+Date: 2026-10-18
+Description: Adds the llm_responses table, which keeps note generation
+             responses keyed by model and prompt hash
+"""
+
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+
+def upgrade():
+    """Apply the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Create llm_responses table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                hits INTEGER DEFAULT 0,
+                created_at TIMESTAMP NOT NULL,
+                last_used_at TIMESTAMP NOT NULL
+            )
+        ''')
+
+        # Create index
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses(last_used_at)')
+
+        conn.commit()
+        print("✓ Migration 007_add_llm_response_cache: SUCCESS")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration 007_add_llm_response_cache: FAILED - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def downgrade():
+    """Revert the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('DROP INDEX IF EXISTS idx_llm_responses_last_used')
+        cursor.execute('DROP TABLE IF EXISTS llm_responses')
+        conn.commit()
+        print("✓ Migration 007_add_llm_response_cache: ROLLED BACK")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration rollback failed - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='LLM response cache migration')
+    parser.add_argument('--downgrade', action='store_true', help='Rollback this migration')
+    args = parser.parse_args()
+
+    if args.downgrade:
+        downgrade()
+    else:
+        upgrade()
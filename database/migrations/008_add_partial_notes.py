@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Migration: Add partial notes
+Date: 2026-10-18
+Description: Adds the partial_notes table, which keeps the notes streamed
+             so far for videos whose generation is running or was interrupted
+"""
+
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+
+def upgrade():
+    """Apply the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Create partial_notes table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS partial_notes (
+                video_id INTEGER PRIMARY KEY,
+                content TEXT NOT NULL,
+                prompt_key TEXT,
+                updated_at TIMESTAMP NOT NULL,
+                FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
+            )
+        ''')
+
+        conn.commit()
+        print("✓ Migration 008_add_partial_notes: SUCCESS")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration 008_add_partial_notes: FAILED - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def downgrade():
+    """Revert the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('DROP TABLE IF EXISTS partial_notes')
+        conn.commit()
+        print("✓ Migration 008_add_partial_notes: ROLLED BACK")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration rollback failed - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Partial notes migration')
+    parser.add_argument('--downgrade', action='store_true', help='Rollback this migration')
+    args = parser.parse_args()
+
+    if args.downgrade:
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Migration: Add processing events
+Date: 2026-10-18
+Description: Adds the append-only processing_events table, one row per run
+             of a pipeline stage (download, ffmpeg, whisper, notes and the
+             waits between them), for job timelines and time reports. Events
+             keep no foreign key to videos, so deleting a video leaves its
+             past work in the reports
+"""
+
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+
+def upgrade():
+    """Apply the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # An earlier version of this table cascaded video deletes into it; rebuild that one without
+        cursor.execute('PRAGMA foreign_key_list(processing_events)')
+        if cursor.fetchall():
+            cursor.execute('ALTER TABLE processing_events RENAME TO processing_events_old')
+            cursor.execute('DROP INDEX IF EXISTS idx_processing_events_video')
+            cursor.execute('DROP INDEX IF EXISTS idx_processing_events_started')
+
+        # Create processing_events table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS processing_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id INTEGER NOT NULL,
+                user_id INTEGER,
+                stage TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                started_at TIMESTAMP NOT NULL,
+                ended_at TIMESTAMP NOT NULL,
+                duration_seconds REAL NOT NULL,
+                bytes INTEGER,
+                audio_seconds REAL,
+                detail TEXT,
+                worker_id TEXT
+            )
+        ''')
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='processing_events_old'")
+        if cursor.fetchone():
+            cursor.execute('''
+                INSERT INTO processing_events
+                    (id, video_id, user_id, stage, outcome, started_at, ended_at, duration_seconds, bytes,
+                     audio_seconds, detail, worker_id)
+                SELECT e.id, e.video_id, v.user_id, e.stage, e.outcome, e.started_at, e.ended_at,
+                       e.duration_seconds, e.bytes, e.audio_seconds, e.detail, e.worker_id
+                FROM processing_events_old e
+                LEFT JOIN videos v ON v.id = e.video_id
+            ''')
+            cursor.execute('DROP TABLE processing_events_old')
+
+        # Timelines read one video's events; reports scan a date range
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_processing_events_video
+            ON processing_events(video_id, started_at)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_processing_events_started
+            ON processing_events(started_at)
+        ''')
+
+        conn.commit()
+        print("✓ Migration 009_add_processing_events: SUCCESS")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration 009_add_processing_events: FAILED - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def downgrade():
+    """Revert the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('DROP INDEX IF EXISTS idx_processing_events_started')
+        cursor.execute('DROP INDEX IF EXISTS idx_processing_events_video')
+        cursor.execute('DROP TABLE IF EXISTS processing_events')
+        conn.commit()
+        print("✓ Migration 009_add_processing_events: ROLLED BACK")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration rollback failed - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Processing events migration')
+    parser.add_argument('--downgrade', action='store_true', help='Rollback this migration')
+    args = parser.parse_args()
+
+    if args.downgrade:
+        downgrade()
+    else:
+        upgrade()
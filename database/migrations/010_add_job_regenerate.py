@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Migration: Add job regenerate flag
+Date: 2026-10-18
+Description: Adds the regenerate column on jobs, set when a video is restarted
+             to regenerate its notes instead of reusing stored results
+"""
+
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+
+def upgrade():
+    """Apply the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Add regenerate column to jobs
+        cursor.execute('PRAGMA table_info(jobs)')
+        columns = {row[1] for row in cursor.fetchall()}
+        if 'regenerate' not in columns:
+            cursor.execute('ALTER TABLE jobs ADD COLUMN regenerate INTEGER DEFAULT 0')
+
+        conn.commit()
+        print("✓ Migration 010_add_job_regenerate: SUCCESS")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration 010_add_job_regenerate: FAILED - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def downgrade():
+    """Revert the migration"""
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('ALTER TABLE jobs DROP COLUMN regenerate')
+        conn.commit()
+        print("✓ Migration 010_add_job_regenerate: ROLLED BACK")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Migration rollback failed - {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Job regenerate flag migration')
+    parser.add_argument('--downgrade', action='store_true', help='Rollback this migration')
+    args = parser.parse_args()
+
+    if args.downgrade:
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,86 @@
+import threading
+import time
+
+
+class PartialNotesRecorder:
+    """
+    Persists one job's notes while they are being generated
+
+    The model streams a few tokens at a time; writing each would cost a
+    commit per token. Snapshots are written at most once per window, like
+    StatusReporter: the first goes out immediately, later ones inside the
+    window replace each other and only the newest is written when the window
+    ends. The notes page streams the snapshots to the browser, and they stay
+    behind if the job dies, so an interrupted generation can be viewed and,
+    for a single-prompt generation, continued (see resumable).
+    """
+
+    def __init__(self, db, video_id, window=2.0):
+        self.db = db
+        self.video_id = video_id
+        self.window = window
+
+        self.lock = threading.Lock()
+        self.pending = None  # (content, prompt_key)
+        self.timer = None
+        self.last_write = 0.0
+        self.writes = 0
+        self.first_write_at = None  # time.monotonic() of the first snapshot, for time-to-first-content
+        # What an earlier attempt left behind, read before this one overwrites it
+        self.previous = db.get_partial_notes(video_id)
+
+    def update(self, content, prompt_key=None):
+        """
+        Record the notes so far; written now or within `window` seconds
+
+        prompt_key identifies the prompt whose response content is the
+        beginning of (LLMResponseCache.key), or None when it can't be resumed.
+        """
+        if not content:
+            return
+        with self.lock:
+            self.pending = (content, prompt_key)
+            wait = self.last_write + self.window - time.monotonic()
+            if wait <= 0:
+                self._flush_locked()
+            elif self.timer is None:
+                self.timer = threading.Timer(wait, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Write any pending snapshot now"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self._flush_locked()
+
+    def resumable(self, prompt_key):
+        """
+        Notes an earlier, interrupted attempt streamed for the same prompt
+        (as they were when this recorder was created)
+
+        Returns:
+            str: the snapshot cut back to its last complete line, or '' when
+            there is nothing to continue from
+        """
+        if not self.previous or not prompt_key or self.previous['prompt_key'] != prompt_key:
+            return ''
+        content = self.previous['content']
+        return content[:content.rfind('\n') + 1]
+
+    def _flush_locked(self):
+        if self.pending is None:
+            return
+        (content, prompt_key), self.pending = self.pending, None
+        try:
+            self.db.save_partial_notes(self.video_id, content, prompt_key)
+        except Exception as e:
+            # Snapshots are best effort; generation carries on without them
+            print(f"Warning: Could not save partial notes: {e}")
+            return
+        self.last_write = time.monotonic()
+        if self.first_write_at is None:
+            self.first_write_at = self.last_write
+        self.writes += 1
@@ -54,17 +54,180 @@ CREATE TABLE IF NOT EXISTS transcripts (
     FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
 );
 
--- Processing status table: tracks processing progress
+-- Processing status table: tracks processing progress (one row per video)
 CREATE TABLE IF NOT EXISTS processing_status (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     video_id INTEGER NOT NULL,
-    status TEXT NOT NULL,  -- 'pending', 'extracting', 'transcribing', 'generating', 'completed', 'failed'
+    status TEXT NOT NULL,  -- 'pending', 'extracting', 'transcribing', 'generating', 'waiting_llm', 'completed', 'failed'
     progress INTEGER DEFAULT 0,  -- 0-100
     error_message TEXT,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
 );
 
+-- Jobs table: durable processing queue consumed by worker.py
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_id INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    is_file INTEGER DEFAULT 0,
+    file_path TEXT,
+    state TEXT NOT NULL DEFAULT 'queued',  -- 'queued', 'attached', 'running', 'done', 'failed', 'cancelled'
+    attempts INTEGER DEFAULT 0,
+    worker_id TEXT,
+    lease_expires_at TIMESTAMP,
+    cancel_requested INTEGER DEFAULT 0,
+    content_key TEXT,  -- 'youtube:<id>' or 'sha256:<hex>' of the upload
+    leader_job_id INTEGER,  -- Set while 'attached' to an identical in-flight job
+    regenerate INTEGER DEFAULT 0,  -- Restarted to regenerate: stored results and cached responses are not reused
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
+);
+
+-- Artifacts table: transcripts and notes keyed by content, reused by repeat submissions
+CREATE TABLE IF NOT EXISTS artifacts (
+    content_key TEXT PRIMARY KEY,
+    title TEXT,
+    creator TEXT,
+    duration INTEGER,
+    source_url TEXT,
+    transcript_text TEXT NOT NULL,
+    timestamps TEXT,  -- JSON array of timestamp data
+    notes_content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Video metadata cache: what yt-dlp reported for a video, reused until METADATA_CACHE_TTL expires
+CREATE TABLE IF NOT EXISTS video_metadata (
+    content_key TEXT PRIMARY KEY,  -- 'youtube:<id>'
+    title TEXT,
+    creator TEXT,
+    duration INTEGER,
+    description TEXT,
+    chapters TEXT,  -- JSON array of chapter data
+    fetched_at TIMESTAMP NOT NULL
+);
+
+-- LLM response cache: model output keyed by model + prompt hash, evicted least recently used first
+CREATE TABLE IF NOT EXISTS llm_responses (
+    cache_key TEXT PRIMARY KEY,  -- sha256 of model and prompt
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,  -- Bytes of response, for the size bound
+    hits INTEGER DEFAULT 0,
+    created_at TIMESTAMP NOT NULL,
+    last_used_at TIMESTAMP NOT NULL
+);
+
+-- Partial notes: the notes streamed so far for a video still being generated (or whose generation was interrupted)
+CREATE TABLE IF NOT EXISTS partial_notes (
+    video_id INTEGER PRIMARY KEY,
+    content TEXT NOT NULL,
+    prompt_key TEXT,  -- LLM cache key of the prompt being answered, when generation can resume from content
+    updated_at TIMESTAMP NOT NULL,
+    FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
+);
+
+-- Processing events: one row per run of a pipeline stage (append-only), for job timelines and time reports.
+-- No foreign key to videos: events outlive their video, so reports keep counting work done for deleted ones.
+CREATE TABLE IF NOT EXISTS processing_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_id INTEGER NOT NULL,
+    user_id INTEGER,  -- Owner of the video when the stage ran
+    stage TEXT NOT NULL,  -- wait_download, download, ffmpeg, wait_transcribe, whisper, wait_generate, notes, wait_llm
+    outcome TEXT NOT NULL,  -- completed, failed, cancelled
+    started_at TIMESTAMP NOT NULL,
+    ended_at TIMESTAMP NOT NULL,
+    duration_seconds REAL NOT NULL,
+    bytes INTEGER,  -- Size of the file the stage wrote (whisper: read)
+    audio_seconds REAL,  -- Audio the stage handled
+    detail TEXT,  -- e.g. 'streamed', the whisper engine
+    worker_id TEXT  -- host:pid of the worker that ran it
+);
+
+-- Full-text search: external-content FTS5 indexes over titles, transcripts and notes.
+-- Each indexes an 'owner' token (u<user_id>) so a search only walks that user's documents;
+-- the *_search views supply it, and the triggers below keep the indexes in sync.
+CREATE VIEW IF NOT EXISTS videos_search AS
+    SELECT id, title, creator, 'u' || user_id AS owner FROM videos;
+
+CREATE VIEW IF NOT EXISTS transcripts_search AS
+    SELECT t.id, t.transcript_text, 'u' || v.user_id AS owner
+    FROM transcripts t JOIN videos v ON v.id = t.video_id;
+
+CREATE VIEW IF NOT EXISTS notes_search AS
+    SELECT n.id, n.content, 'u' || v.user_id AS owner
+    FROM notes n JOIN videos v ON v.id = n.video_id;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+    title, creator, owner,
+    content='videos_search', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(
+    transcript_text, owner,
+    content='transcripts_search', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    content, owner,
+    content='notes_search', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos BEGIN
+    INSERT INTO videos_fts(rowid, title, creator, owner)
+    VALUES (new.id, new.title, new.creator, 'u' || new.user_id);
+END;
+-- Remove a video's transcripts and notes while the video row (and so their owner) still exists
+CREATE TRIGGER IF NOT EXISTS videos_fts_delete_children BEFORE DELETE ON videos BEGIN
+    DELETE FROM transcripts WHERE video_id = old.id;
+    DELETE FROM notes WHERE video_id = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos BEGIN
+    INSERT INTO videos_fts(videos_fts, rowid, title, creator, owner)
+    VALUES ('delete', old.id, old.title, old.creator, 'u' || old.user_id);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_fts_update AFTER UPDATE OF title, creator ON videos BEGIN
+    INSERT INTO videos_fts(videos_fts, rowid, title, creator, owner)
+    VALUES ('delete', old.id, old.title, old.creator, 'u' || old.user_id);
+    INSERT INTO videos_fts(rowid, title, creator, owner)
+    VALUES (new.id, new.title, new.creator, 'u' || new.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS transcripts_fts_insert AFTER INSERT ON transcripts BEGIN
+    INSERT INTO transcripts_fts(rowid, transcript_text, owner)
+    VALUES (new.id, new.transcript_text, 'u' || (SELECT user_id FROM videos WHERE id = new.video_id));
+END;
+CREATE TRIGGER IF NOT EXISTS transcripts_fts_delete AFTER DELETE ON transcripts BEGIN
+    INSERT INTO transcripts_fts(transcripts_fts, rowid, transcript_text, owner)
+    VALUES ('delete', old.id, old.transcript_text, 'u' || (SELECT user_id FROM videos WHERE id = old.video_id));
+END;
+CREATE TRIGGER IF NOT EXISTS transcripts_fts_update AFTER UPDATE OF transcript_text ON transcripts BEGIN
+    INSERT INTO transcripts_fts(transcripts_fts, rowid, transcript_text, owner)
+    VALUES ('delete', old.id, old.transcript_text, 'u' || (SELECT user_id FROM videos WHERE id = old.video_id));
+    INSERT INTO transcripts_fts(rowid, transcript_text, owner)
+    VALUES (new.id, new.transcript_text, 'u' || (SELECT user_id FROM videos WHERE id = new.video_id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts(rowid, content, owner)
+    VALUES (new.id, new.content, 'u' || (SELECT user_id FROM videos WHERE id = new.video_id));
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts(notes_fts, rowid, content, owner)
+    VALUES ('delete', old.id, old.content, 'u' || (SELECT user_id FROM videos WHERE id = old.video_id));
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF content ON notes BEGIN
+    INSERT INTO notes_fts(notes_fts, rowid, content, owner)
+    VALUES ('delete', old.id, old.content, 'u' || (SELECT user_id FROM videos WHERE id = old.video_id));
+    INSERT INTO notes_fts(rowid, content, owner)
+    VALUES (new.id, new.content, 'u' || (SELECT user_id FROM videos WHERE id = new.video_id));
+END;
+
 -- Indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
@@ -75,4 +238,12 @@ CREATE INDEX IF NOT EXISTS idx_videos_title ON videos(title);
 CREATE INDEX IF NOT EXISTS idx_videos_processed_date ON videos(processed_date DESC);
 CREATE INDEX IF NOT EXISTS idx_notes_video ON notes(video_id);
 CREATE INDEX IF NOT EXISTS idx_transcripts_video ON transcripts(video_id);
-CREATE INDEX IF NOT EXISTS idx_processing_status_video ON processing_status(video_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_processing_status_video_unique ON processing_status(video_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_video ON jobs(video_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_content_key ON jobs(content_key, state);
+CREATE INDEX IF NOT EXISTS idx_jobs_leader ON jobs(leader_job_id);
+CREATE INDEX IF NOT EXISTS idx_video_metadata_fetched ON video_metadata(fetched_at);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses(last_used_at);
+CREATE INDEX IF NOT EXISTS idx_processing_events_video ON processing_events(video_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_processing_events_started ON processing_events(started_at);
@@ -0,0 +1,125 @@
+import os
+import socket
+from datetime import datetime
+import metrics
+
+# Stages in pipeline order, for timelines and reports
+STAGES = ('wait_download', 'download', 'ffmpeg', 'wait_transcribe', 'whisper', 'wait_generate', 'notes', 'wait_llm')
+
+
+class StageTimeline:
+    """
+    Appends one job's stage runs to processing_events
+
+    processing_status only keeps a job's latest state; this keeps every
+    stage run (start, end, duration, bytes, audio seconds, outcome) so a slow
+    job can be taken apart afterwards, and time can be added up per stage
+    per day (DatabaseManager.get_time_report). Stages are a few per job, so
+    each is written as soon as it ends.
+    """
+
+    def __init__(self, db, video_id):
+        self.db = db
+        self.video_id = video_id
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"  # Same form as JobWorker's id
+
+    def stage(self, name):
+        """Time the block as one run of a stage; see metrics.stage for the event it yields"""
+        return metrics.stage(name, self.record)
+
+    def record(self, event):
+        """Write a finished stage run (a metrics.stage event); never raises"""
+        error = event.get('error')
+        if error is None:
+            outcome = 'completed'
+        else:
+            outcome = 'cancelled' if 'cancelled' in str(error).lower() else 'failed'
+        try:
+            self.db.add_processing_event(
+                self.video_id, event['stage'], outcome, event['started_at'], event['ended_at'],
+                event['duration'], num_bytes=event.get('bytes'), audio_seconds=event.get('audio_seconds'),
+                detail=event.get('detail'), worker_id=self.worker_id
+            )
+        except Exception as e:
+            # The timeline is for looking back; it must not fail the job
+            print(f"Warning: Could not record {event['stage']} event for video {self.video_id}: {e}")
+
+
+def _parse_time(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def layout_timeline(events):
+    """
+    Place a video's events (get_processing_events) on one time axis
+
+    Returns:
+        dict with events (each with offset_seconds, offset_percent and
+        width_percent added), span_seconds, and totals: per stage in
+        pipeline order, the seconds spent and their share of the total
+    """
+    if not events:
+        return {'events': [], 'span_seconds': 0, 'totals': []}
+
+    start = min(_parse_time(event['started_at']) for event in events)
+    end = max(_parse_time(event['ended_at']) for event in events)
+    span = max((end - start).total_seconds(), 0.001)
+
+    placed = []
+    for event in events:
+        offset = (_parse_time(event['started_at']) - start).total_seconds()
+        placed.append(dict(event, offset_seconds=offset, offset_percent=offset / span * 100,
+                           width_percent=max(event['duration_seconds'] / span * 100, 0.5)))
+
+    return {'events': placed, 'span_seconds': span, 'totals': _stage_totals(events)}
+
+
+def summarize_report(rows):
+    """
+    Shape get_time_report rows for display
+
+    Returns:
+        dict with stages (per stage over the whole period, in pipeline
+        order: runs, failed, total_seconds, share, avg_seconds, max_seconds,
+        seconds_per_audio_hour) and days (newest first: day, total_seconds,
+        and stages as {stage: total_seconds})
+    """
+    overall = {}
+    days = {}
+    for row in rows:
+        stage = overall.setdefault(row['stage'], {'stage': row['stage'], 'runs': 0, 'failed': 0,
+                                                  'total_seconds': 0.0, 'max_seconds': 0.0, 'audio_seconds': 0.0})
+        stage['runs'] += row['runs']
+        stage['failed'] += row['failed'] or 0
+        stage['total_seconds'] += row['total_seconds'] or 0.0
+        stage['max_seconds'] = max(stage['max_seconds'], row['max_seconds'] or 0.0)
+        stage['audio_seconds'] += row['audio_seconds'] or 0.0
+
+        day = days.setdefault(row['day'], {'day': row['day'], 'total_seconds': 0.0, 'stages': {}})
+        day['total_seconds'] += row['total_seconds'] or 0.0
+        day['stages'][row['stage']] = row['total_seconds'] or 0.0
+
+    total = sum(stage['total_seconds'] for stage in overall.values()) or 1.0
+    stages = []
+    for stage in sorted(overall.values(), key=_stage_order):
+        stage['share'] = stage['total_seconds'] / total * 100
+        stage['avg_seconds'] = stage['total_seconds'] / stage['runs']
+        # Processing time per hour of audio: the capacity number for whisper and notes
+        stage['seconds_per_audio_hour'] = (stage['total_seconds'] / stage['audio_seconds'] * 3600
+                                           if stage['audio_seconds'] else None)
+        stages.append(stage)
+
+    return {'stages': stages, 'days': sorted(days.values(), key=lambda day: day['day'], reverse=True)}
+
+
+def _stage_totals(events):
+    totals = {}
+    for event in events:
+        totals[event['stage']] = totals.get(event['stage'], 0.0) + event['duration_seconds']
+    overall = sum(totals.values()) or 1.0
+    return [{'stage': stage, 'total_seconds': seconds, 'share': seconds / overall * 100}
+            for stage, seconds in sorted(totals.items(), key=lambda item: _stage_order({'stage': item[0]}))]
+
+
+def _stage_order(row):
+    return STAGES.index(row['stage']) if row['stage'] in STAGES else len(STAGES)
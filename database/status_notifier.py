@@ -0,0 +1,109 @@
+import queue
+import threading
+
+# Statuses that mean a video is still being processed
+ACTIVE_STATUSES = ('pending', 'extracting', 'transcribing', 'generating', 'waiting_llm')
+
+
+class StatusSubscription:
+    """A single listener's queue of status changes for one user"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.changes = queue.Queue()
+
+    def get(self, timeout=None):
+        """
+        Wait for the next batch of changes
+
+        Returns:
+            list of status dicts, or an empty list on timeout
+        """
+        try:
+            return self.changes.get(timeout=timeout)
+        except queue.Empty:
+            return []
+
+
+class StatusNotifier:
+    """
+    In-process change notifier for processing status
+
+    Status is written by worker.py in another process, so a single thread
+    per web process polls the database once per interval for every user
+    that has a listener. Changes are fanned out to each listener's queue.
+    However many browsers are watching, the cost stays at one query per
+    interval per process.
+    """
+
+    def __init__(self, db, interval=1.0):
+        self.db = db
+        self.interval = interval
+        self.subscriptions = {}  # {user_id: set of StatusSubscription}
+        self.snapshot = {}  # {video_id: status dict}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def subscribe(self, user_id):
+        """Start listening for a user's status changes"""
+        subscription = StatusSubscription(user_id)
+        with self.lock:
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='status-notifier', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop listening"""
+        with self.lock:
+            listeners = self.subscriptions.get(subscription.user_id)
+            if listeners:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self.subscriptions[subscription.user_id]
+
+    def _run(self):
+        """Poll for changes while anyone is listening"""
+        while True:
+            with self.lock:
+                user_ids = list(self.subscriptions)
+
+            if not user_ids:
+                self.snapshot.clear()
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+
+            try:
+                self._poll(user_ids)
+            except Exception as e:
+                print(f"Warning: Status notifier poll failed: {e}")
+
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def _poll(self, user_ids):
+        """Compare current status against the last snapshot and publish differences"""
+        # Re-read videos that were active last time so their final state is seen
+        statuses = self.db.get_active_processing_statuses(user_ids, video_ids=list(self.snapshot))
+
+        changes = {}
+        current = {}
+        for status in statuses:
+            video_id = status['video_id']
+            if status['status'] in ACTIVE_STATUSES:
+                current[video_id] = status
+            if self.snapshot.get(video_id) != status:
+                changes.setdefault(status['user_id'], []).append(status)
+        self.snapshot = current
+
+        if not changes:
+            return
+
+        with self.lock:
+            for user_id, user_changes in changes.items():
+                for subscription in self.subscriptions.get(user_id, ()):
+                    subscription.changes.put(user_changes)
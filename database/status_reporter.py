@@ -0,0 +1,80 @@
+import threading
+import time
+
+# Statuses that end processing; these are always written immediately
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class StatusReporter:
+    """
+    Coalesces one job's processing status writes
+
+    Progress steps that follow each other quickly (25 -> 28 -> 30) mostly
+    matter to nobody by the time they are written, but each one costs a
+    commit. Non-terminal updates are written at most once per window: the
+    first goes out immediately, later ones inside the window replace each
+    other and only the newest is written when the window ends. Terminal
+    states are written synchronously and are never dropped.
+    """
+
+    def __init__(self, db, video_id, window=1.0, cancel_event=None):
+        self.db = db
+        self.video_id = video_id
+        self.window = window
+        # Once set, pending progress is dropped so it can't overwrite 'cancelled'
+        self.cancel_event = cancel_event
+
+        self.lock = threading.Lock()
+        self.pending = None  # (status, progress, error_message)
+        self.timer = None
+        self.last_write = 0.0
+        self.writes = 0
+        self.dropped = 0
+
+    def update(self, status, progress=None, error_message=None):
+        """Report a new status; written now or within `window` seconds"""
+        with self.lock:
+            if self.pending is not None:
+                self.dropped += 1
+
+            if status in TERMINAL_STATUSES:
+                self._cancel_timer()
+                self.pending = None
+                self._write((status, progress, error_message))
+                return
+
+            self.pending = (status, progress, error_message)
+            wait = self.last_write + self.window - time.monotonic()
+            if wait <= 0:
+                self._flush_locked()
+            elif self.timer is None:
+                self.timer = threading.Timer(wait, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Write any pending update now"""
+        with self.lock:
+            self._cancel_timer()
+            self._flush_locked()
+
+    def _cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def _flush_locked(self):
+        if self.pending is None:
+            return
+        update, self.pending = self.pending, None
+
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self.dropped += 1
+            return
+        self._write(update)
+
+    def _write(self, update):
+        status, progress, error_message = update
+        self.db.update_processing_status(self.video_id, status, progress=progress, error_message=error_message)
+        self.last_write = time.monotonic()
+        self.writes += 1
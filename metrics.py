@@ -0,0 +1,435 @@
+"""
+Prometheus-style metrics for the processing pipeline
+
+Every process (gunicorn workers, worker.py) keeps its metrics in memory
+and a background thread writes them to METRICS_DIR/<pid>.json at most
+every METRICS_FLUSH_SECONDS, only when something changed. The /metrics
+endpoint of any web worker reads all those files and adds them up
+(render), so a scrape sees every process whichever worker answers it.
+Recording a value is a dict update under a lock; nothing touches the disk
+on the hot path.
+
+Counters and histograms of processes that exited are folded into
+archive.json, so totals never go backwards when a worker restarts. Gauges
+only count for processes that are still running.
+
+The metrics themselves are defined at the bottom of this module.
+"""
+
+import atexit
+import bisect
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from config import Config
+
+ARCHIVE_FILE = 'archive.json'
+
+
+class Metric:
+    """Base for a metric with named labels; values are kept per label combination"""
+
+    type = None
+
+    def __init__(self, registry, name, help, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.single_label = self.labelnames[0] if len(self.labelnames) == 1 else None
+        self.values = {}  # label values tuple -> value
+        registry.register(self)
+
+    def _key(self, labels):
+        if self.single_label is not None:  # The common case, kept cheap (it runs on every database call)
+            return (labels[self.single_label],)
+        return tuple([labels[name] for name in self.labelnames])
+
+    def dump(self):
+        """Values as JSON-friendly [[label values], value] pairs"""
+        with self.registry.lock:
+            return [[list(key), self._copy(value)] for key, value in self.values.items()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def reset(self):
+        self.values = {}
+
+
+class Counter(Metric):
+    """A total that only goes up"""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not Config.METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+            self.registry.dirty = True
+
+
+class Gauge(Metric):
+    """A value that goes up and down (summed over running processes)"""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        if not Config.METRICS_ENABLED:
+            return
+        with self.registry.lock:
+            self.values[self._key(labels)] = value
+            self.registry.dirty = True
+
+    def inc(self, amount=1, **labels):
+        if not Config.METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+            self.registry.dirty = True
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """Observations counted in cumulative buckets, with their count and sum"""
+
+    type = 'histogram'
+
+    def __init__(self, registry, name, help, labels=(), buckets=()):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(registry, name, help, labels)
+
+    def observe(self, value, **labels):
+        if not Config.METRICS_ENABLED:
+            return
+        key = (labels[self.single_label],) if self.single_label is not None else self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        registry = self.registry
+        with registry.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            entry['counts'][index] += 1
+            entry['sum'] += value
+            registry.dirty = True
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def _copy(value):
+        return {'counts': list(value['counts']), 'sum': value['sum']}
+
+
+class Registry:
+    """This process's metrics and the thread that writes them to METRICS_DIR"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.pid = os.getpid()
+        self.flusher = None
+        self.flusher_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        atexit.register(self.flush)
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def counter(self, name, help, labels=()):
+        return Counter(self, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return Gauge(self, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=()):
+        return Histogram(self, name, help, labels, buckets)
+
+    def start(self):
+        """Start writing this process's metrics in the background (idempotent)"""
+        if not Config.METRICS_ENABLED or (self.flusher is not None and self.pid == os.getpid()):
+            return
+        with self.flusher_lock:
+            if self.flusher is not None and self.flusher.is_alive():
+                return
+            os.makedirs(Config.METRICS_DIR, exist_ok=True)
+            self._archive_stale_file()
+            self.flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self.flusher.start()
+
+    def flush(self):
+        """Write this process's metrics now if anything changed"""
+        if not Config.METRICS_ENABLED or not self.dirty:
+            return
+        with self.lock:
+            self.dirty = False
+        snapshot = {
+            'pid': self.pid,
+            'written_at': time.time(),
+            'metrics': {name: metric.dump() for name, metric in self.metrics.items()},
+        }
+        path = os.path.join(Config.METRICS_DIR, f'{self.pid}.json')
+        try:
+            os.makedirs(Config.METRICS_DIR, exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"Warning: Could not write metrics: {e}")
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(Config.METRICS_FLUSH_SECONDS)
+            self.flush()
+
+    def _after_fork(self):
+        # A forked child (gunicorn worker) starts from zero under its own pid
+        self.lock = threading.Lock()
+        self.flusher_lock = threading.Lock()
+        self.pid = os.getpid()
+        self.flusher = None
+        self.dirty = False
+        for metric in self.metrics.values():
+            metric.reset()
+
+    def _archive_stale_file(self):
+        """A file under our pid was left by an earlier process that had it"""
+        path = os.path.join(Config.METRICS_DIR, f'{self.pid}.json')
+        if os.path.exists(path):
+            with _directory_lock():
+                _archive([path])
+
+
+@contextmanager
+def _directory_lock():
+    """Exclusive lock on METRICS_DIR while the archive is rewritten"""
+    with open(os.path.join(Config.METRICS_DIR, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(totals, snapshot, include_gauges):
+    """Add one process's (or the archive's) values into totals {name: {label values: value}}"""
+    for name, values in snapshot.get('metrics', {}).items():
+        metric = registry.metrics.get(name)
+        if metric is None or (metric.type == 'gauge' and not include_gauges):
+            continue
+        merged = totals.setdefault(name, {})
+        for labels, value in values:
+            key = tuple(labels)
+            if metric.type == 'histogram':
+                if len(value['counts']) != len(metric.buckets) + 1:
+                    continue  # Written with other buckets (older version)
+                entry = merged.setdefault(key, {'counts': [0] * len(value['counts']), 'sum': 0.0})
+                entry['counts'] = [a + b for a, b in zip(entry['counts'], value['counts'])]
+                entry['sum'] += value['sum']
+            else:
+                merged[key] = merged.get(key, 0) + value
+
+
+def _archive(paths):
+    """Fold the counters and histograms of exited processes into archive.json (call under the lock)"""
+    archive_path = os.path.join(Config.METRICS_DIR, ARCHIVE_FILE)
+    totals = {}
+    archive = _read(archive_path)
+    if archive:
+        _merge(totals, archive, include_gauges=False)
+    for path in paths:
+        snapshot = _read(path)
+        if snapshot:
+            _merge(totals, snapshot, include_gauges=False)
+    data = {'metrics': {name: [[list(key), value] for key, value in values.items()]
+                        for name, values in totals.items()}}
+    with open(archive_path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(archive_path + '.tmp', archive_path)
+    for path in paths:
+        os.remove(path)
+
+
+def collect():
+    """
+    Add up the metrics of every process
+
+    Returns:
+        dict of {metric name: {label values tuple: value}}
+    """
+    registry.flush()  # Include this process's latest values
+    os.makedirs(Config.METRICS_DIR, exist_ok=True)
+    totals = {}
+    # Held while reading too, so a file archived by another scrape is never counted twice or missed
+    with _directory_lock():
+        paths = glob.glob(os.path.join(Config.METRICS_DIR, '[0-9]*.json'))
+        live = [path for path in paths if _pid_alive(int(os.path.basename(path).split('.')[0]))]
+        if len(live) < len(paths):
+            _archive([path for path in paths if path not in live])
+
+        archive = _read(os.path.join(Config.METRICS_DIR, ARCHIVE_FILE))
+        if archive:
+            _merge(totals, archive, include_gauges=False)
+        for path in live:
+            snapshot = _read(path)
+            if snapshot:
+                _merge(totals, snapshot, include_gauges=True)
+    return totals
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(extra_gauges=()):
+    """
+    The Prometheus text exposition of every process's metrics
+
+    Args:
+        extra_gauges: (name, help, {label values dict tuple: value}) computed at
+            scrape time by the caller, e.g. queue depth from the database
+    """
+    totals = collect()
+    lines = []
+    for name, metric in registry.metrics.items():
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        for key, value in sorted(totals.get(name, {}).items()):
+            if metric.type != 'histogram':
+                lines.append(f'{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float('inf'),), value['counts']):
+                cumulative += count
+                le = (('le', _format_value(float(bound))),)
+                lines.append(f'{name}_bucket{_format_labels(metric.labelnames, key, le)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(value["sum"])}')
+            lines.append(f'{name}_count{_format_labels(metric.labelnames, key)} {cumulative}')
+    for name, help, samples in extra_gauges:
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} gauge')
+        for labels, value in samples:
+            lines.append(f'{name}{_format_labels([k for k, _ in labels], [v for _, v in labels])} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# Buckets (seconds) for stages that take from seconds to hours
+STAGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400)
+
+JOBS = registry.counter(
+    'voice2note_jobs_total', 'Jobs finished by process_video_background, by final status', ['status'])
+JOB_SECONDS = registry.histogram(
+    'voice2note_job_seconds', 'Wall-clock time of a job from start to its final status', ['status'],
+    STAGE_BUCKETS)
+STAGE_ACTIVE = registry.gauge(
+    'voice2note_stage_active', 'Jobs inside each pipeline stage (holding a stage slot)', ['stage'])
+STAGE_WAITING = registry.gauge(
+    'voice2note_stage_waiting', 'Jobs waiting for a free slot in each pipeline stage', ['stage'])
+STAGE_SECONDS = registry.histogram(
+    'voice2note_stage_seconds',
+    'Time spent per run of a stage: download (yt-dlp, including the piped ffmpeg conversion), ffmpeg, '
+    'whisper, notes (a job\'s note generation), llm (one model request) and wait_* (waiting for a stage slot '
+    'or for the model)', ['stage'], STAGE_BUCKETS)
+WHISPER_RTF = registry.histogram(
+    'voice2note_whisper_rtf', 'Whisper processing seconds per audio second', ['engine'],
+    (0.02, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5))
+LLM_TTFT = registry.histogram(
+    'voice2note_llm_time_to_first_token_seconds', 'Seconds from sending a model request to its first token',
+    ['model'], (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300))
+LLM_TOKENS_PER_SECOND = registry.histogram(
+    'voice2note_llm_tokens_per_second', 'Estimated output tokens per second after the first token', ['model'],
+    (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500))
+LLM_ERRORS = registry.counter(
+    'voice2note_llm_errors_total', 'Failed model requests by error kind', ['kind'])
+DB_QUERY_SECONDS = registry.histogram(
+    'voice2note_db_query_seconds', 'Time a DatabaseManager method holds its database connection (its queries)',
+    ['method'],
+    (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+CACHE_REQUESTS = registry.counter(
+    'voice2note_cache_requests_total', 'Cache lookups by cache and result (hit or miss)', ['cache', 'result'])
+
+
+@contextmanager
+def stage(name, on_stage=None):
+    """
+    Time one run of a pipeline stage
+
+    The time is observed in STAGE_SECONDS and, with on_stage, the run is
+    passed to it as an event dict when the block ends, also when it raises:
+    stage, started_at, ended_at, duration, error (the exception or None),
+    plus whatever the block put in the dict it was given (bytes,
+    audio_seconds, detail). A block that turns out to have had nothing to do
+    can set event['stage'] to None; the run is then not recorded at all.
+    """
+    event = {'stage': name, 'started_at': datetime.now(), 'error': None}
+    start = time.perf_counter()
+    try:
+        yield event
+    except BaseException as e:
+        event['error'] = e
+        raise
+    finally:
+        event['duration'] = time.perf_counter() - start
+        event['ended_at'] = datetime.now()
+        if event['stage'] is not None:
+            STAGE_SECONDS.observe(event['duration'], stage=name)
+            if on_stage is not None:
+                on_stage(event)
@@ -0,0 +1,206 @@
+import math
+import re
+from config import Config
+
+# A sentence ends at . ! or ? followed by whitespace; whisper also puts each segment on its own line
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+SENTENCE_END_CHARS = ('.', '!', '?', '…')
+
+# How good a place between two units is to end a chunk
+BOUNDARY_ANY = 0  # Between two segments or words
+BOUNDARY_SENTENCE = 1  # After a unit that ends a sentence
+BOUNDARY_CHAPTER = 2  # Where a chapter starts
+
+# A chunk is cut early at a chapter start once it is at least this full
+CHAPTER_MIN_FILL = 0.5
+# On overflow, a better boundary is used if it keeps the chunk at least this full
+BOUNDARY_MIN_FILL = 0.6
+
+
+def split_sentences(text):
+    """Split text into sentences (and transcript lines), dropping empty pieces"""
+    return [piece.strip() for piece in SENTENCE_END_RE.split(text) if piece.strip()]
+
+
+def estimate_tokens(text, chars_per_token=None):
+    """Token count estimate for the notes model (characters / LLM_CHARS_PER_TOKEN)"""
+    return math.ceil(len(text) / (chars_per_token or Config.LLM_CHARS_PER_TOKEN))
+
+
+def _units(text, timestamps):
+    """
+    The pieces chunks are built from: whisper segments (with their times in
+    ms) when timestamps are available, else sentences (without times)
+    """
+    units = []
+    for entry in timestamps or []:
+        piece = (entry.get('text') or '').strip()
+        if piece:
+            offsets = entry.get('offsets') or {}
+            units.append((piece, offsets.get('from'), offsets.get('to')))
+    if units:
+        return units
+    return [(sentence, None, None) for sentence in split_sentences(text)]
+
+
+def _split_unit(piece, start_ms, end_ms, max_chars):
+    """Cut a unit longer than max_chars at spaces, sharing its time range out by length"""
+    parts = []
+    while len(piece) > max_chars:
+        cut = piece.rfind(' ', 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars  # No space to cut at: split mid-word
+        parts.append(piece[:cut].strip())
+        piece = piece[cut:].strip()
+    if piece:
+        parts.append(piece)
+
+    if start_ms is None or end_ms is None:
+        return [(part, None, None) for part in parts]
+    total = sum(len(part) for part in parts) or 1
+    pieces = []
+    position = start_ms
+    for part in parts:
+        part_end = position + (end_ms - start_ms) * len(part) // total
+        pieces.append((part, position, part_end))
+        position = part_end
+    return pieces
+
+
+def chunk_transcript(text, timestamps=None, chapters=None, max_tokens=None, overlap_tokens=None,
+                     chars_per_token=None):
+    """
+    Split a transcript into chunks of at most max_tokens estimated tokens
+
+    Chunks are built from whisper segments when timestamps are given (so
+    each chunk knows the time range it covers), otherwise from sentences.
+    When a chunk is full it is ended at the best nearby boundary: a chapter
+    start, else the end of a sentence, else any segment boundary. A chunk
+    that is at least half full also ends where a chapter starts. Each chunk
+    after the first repeats up to overlap_tokens of the end of the previous
+    one, so ideas cut at a boundary keep their context; the repeated text
+    never reaches back across a chapter start. Runs in linear time.
+
+    Args:
+        text: Transcript text (used when there are no timestamps)
+        timestamps: Optional whisper JSON segments (offsets in milliseconds)
+        chapters: Optional yt-dlp chapters (dicts with start_time in seconds and title)
+        max_tokens: Token budget per chunk (default NOTES_CHUNK_TOKENS)
+        overlap_tokens: Tokens repeated from the previous chunk (default NOTES_CHUNK_OVERLAP_TOKENS)
+        chars_per_token: Characters per token (default LLM_CHARS_PER_TOKEN)
+
+    Returns:
+        list of dicts with text, tokens, start_ms and end_ms (None without
+        timestamps), chapter (title of the chapter the chunk starts in, or
+        None) and overlap_tokens
+    """
+    max_tokens = max_tokens or Config.NOTES_CHUNK_TOKENS
+    overlap_tokens = Config.NOTES_CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)  # Every chunk must still move forward
+    chars_per_token = chars_per_token or Config.LLM_CHARS_PER_TOKEN
+    max_chars = int(max_tokens * chars_per_token)  # Longest chunk text
+
+    units = []
+    for piece, start_ms, end_ms in _units(text, timestamps):
+        if len(piece) > max_chars:
+            units.extend(_split_unit(piece, start_ms, end_ms, max_chars))
+        else:
+            units.append((piece, start_ms, end_ms))
+    if not units:
+        return []
+
+    # Chapter starts in ms, with the chapter each unit falls in
+    chapter_starts = sorted((int(float(chapter.get('start_time') or 0) * 1000), chapter.get('title'))
+                            for chapter in chapters or [])
+    chapter_titles = [None] * len(units)
+    boundaries = [BOUNDARY_ANY] * len(units)  # boundaries[i]: quality of a cut just before unit i
+    next_chapter = 0
+    current_title = None
+    for i, (piece, start_ms, _) in enumerate(units):
+        if start_ms is not None:
+            while next_chapter < len(chapter_starts) and chapter_starts[next_chapter][0] <= start_ms:
+                current_title = chapter_starts[next_chapter][1]
+                next_chapter += 1
+                if i:
+                    boundaries[i] = BOUNDARY_CHAPTER
+        chapter_titles[i] = current_title
+        if i and boundaries[i] == BOUNDARY_ANY and units[i - 1][0].endswith(SENTENCE_END_CHARS):
+            boundaries[i] = BOUNDARY_SENTENCE
+
+    # Unit i adds its length plus a joining space; prefix sums give any range's size in O(1)
+    prefix = [0]
+    for piece, _, _ in units:
+        prefix.append(prefix[-1] + len(piece) + 1)
+
+    def size(start, end):
+        return prefix[end] - prefix[start]
+
+    chunks = []
+    start = 0  # First unit of the current chunk
+    overlap_start = 0  # Units before this one in the chunk are repeated from the previous chunk
+    best = {}  # Boundary quality -> latest cut position in the current chunk at least that good
+    end = start
+    while end < len(units):
+        if end > overlap_start:
+            # Consider ending the chunk just before unit `end`
+            quality = boundaries[end]
+            for level in range(quality + 1):
+                best[level] = end
+
+            cut = None
+            if quality == BOUNDARY_CHAPTER and size(start, end) >= CHAPTER_MIN_FILL * max_chars:
+                cut = end
+            elif size(start, end + 1) > max_chars + 1:
+                # Full: end at the best boundary that still leaves the chunk reasonably full
+                cut = end
+                for wanted in (BOUNDARY_CHAPTER, BOUNDARY_SENTENCE):
+                    candidate = best.get(wanted)
+                    if candidate is not None and size(start, candidate) >= BOUNDARY_MIN_FILL * max_chars:
+                        cut = candidate
+                        break
+
+            if cut is not None:
+                chunks.append(_make_chunk(units, start, cut, overlap_start, chapter_titles, chars_per_token))
+
+                # The next chunk repeats the end of this one, but never back across a chapter start
+                next_start = cut
+                while (next_start - 1 > start and boundaries[next_start] != BOUNDARY_CHAPTER
+                       and size(next_start - 1, cut) <= overlap_tokens * chars_per_token):
+                    next_start -= 1
+                # ...and the overlap must leave room for the first new unit
+                while next_start < cut and size(next_start, cut + 1) > max_chars + 1:
+                    next_start += 1
+                start, overlap_start, end = next_start, cut, cut
+                best = {}
+                continue
+        end += 1
+
+    chunks.append(_make_chunk(units, start, len(units), overlap_start, chapter_titles, chars_per_token))
+    return chunks
+
+
+def _make_chunk(units, start, end, overlap_start, chapter_titles, chars_per_token):
+    pieces = [piece for piece, _, _ in units[start:end]]
+    text = ' '.join(pieces)
+    overlap_text = ' '.join(pieces[:overlap_start - start]) if overlap_start > start else ''
+    return {
+        'text': text,
+        'tokens': estimate_tokens(text, chars_per_token),
+        'start_ms': units[start][1],
+        'end_ms': units[end - 1][2],
+        'chapter': chapter_titles[overlap_start if overlap_start < end else start],
+        'overlap_tokens': estimate_tokens(overlap_text, chars_per_token) if overlap_text else 0,
+    }
+
+
+def chunk_text(text, chunk_size=5000):
+    """
+    Split text into chunks of at most chunk_size characters at sentence boundaries
+
+    Returns:
+        list of text chunks
+    """
+    if len(text) <= chunk_size:
+        return [text]
+    return [chunk['text'] for chunk in chunk_transcript(text, max_tokens=chunk_size, overlap_tokens=0,
+                                                        chars_per_token=1)]
@@ -0,0 +1,147 @@
+import os
+import threading
+from contextlib import contextmanager
+from config import Config
+
+
+def available_cpus():
+    """CPU ids this process may run on (respects taskset and container cpusets)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 4))
+
+
+def set_process_affinity(pid, cpus):
+    """
+    Pin every thread of a running process to cpus
+
+    Linux affinity is per thread, so threads a program has already started
+    (whisper.cpp's compute threads) are moved one by one. Returns False if
+    the process is gone or affinity isn't supported here.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return False
+    try:
+        tids = [int(tid) for tid in os.listdir(f'/proc/{pid}/task')]
+    except OSError:
+        tids = [pid]
+    moved = False
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cpus)
+            moved = True
+        except OSError:
+            pass  # Thread (or process) exited in the meantime
+    return moved
+
+
+class CpuLease:
+    """Threads and cores handed to one whisper-cli run"""
+
+    def __init__(self, threads, cpus):
+        self.threads = threads
+        self.cpus = cpus
+        self.pid = None  # Set once the run's process has started
+
+
+class CpuBudget:
+    """
+    Divides the machine's cores between concurrent whisper-cli runs
+
+    Each run takes a lease for as long as it runs. A new run gets an equal
+    share of the cores between itself and the runs already going (capped at
+    max_threads, past which whisper.cpp barely speeds up), placed on the
+    least busy cores. A lone job therefore uses most of the machine instead
+    of a fixed 4 threads, and a busy machine isn't oversubscribed.
+
+    whisper-cli can't change its thread count once started, so shares
+    rebalance as runs start and finish: later runs (and the next segment of
+    a segmented transcription) size themselves to what is free. With pin
+    enabled, runs are also bound to their cores, and when a run finishes
+    the others are spread back out over the cores it freed.
+
+    The budget is per process; with several workers on one machine, give
+    each a share of the cores with WHISPER_CPU_CORES.
+    """
+
+    def __init__(self, cores=None, max_threads=None, pin=None):
+        cpus = available_cpus()
+        cores = cores if cores is not None else Config.WHISPER_CPU_CORES
+        if cores:
+            cpus = cpus[:cores]
+        self.cpus = cpus
+        self.max_threads = max_threads or Config.WHISPER_MAX_THREADS
+        self.pin = (pin if pin is not None else Config.WHISPER_PIN_CPUS) and hasattr(os, 'sched_setaffinity')
+        self.leases = []  # In start order
+        self.lock = threading.Lock()
+
+    def _usage(self, leases):
+        usage = {cpu: 0 for cpu in self.cpus}
+        for lease in leases:
+            for cpu in lease.cpus:
+                usage[cpu] += 1
+        return usage
+
+    def _least_busy(self, usage, count, preferred=()):
+        # Stable ordering keeps a run on its current cores when nothing is gained by moving it
+        ranked = sorted(self.cpus, key=lambda cpu: (usage[cpu], cpu not in preferred, cpu))
+        return sorted(ranked[:count])
+
+    def acquire(self):
+        """Take a lease sized to the cores that are free now"""
+        with self.lock:
+            runs = len(self.leases) + 1
+            usage = self._usage(self.leases)
+            free = sum(1 for count in usage.values() if count == 0)
+            # Equal share, or everything that is idle if that's more (other runs can't grow into it)
+            threads = max(1, min(self.max_threads, len(self.cpus), max(len(self.cpus) // runs, free)))
+            lease = CpuLease(threads, self._least_busy(usage, threads))
+            self.leases.append(lease)
+            return lease
+
+    def release(self, lease):
+        """Return a lease's cores and spread the remaining pinned runs over them"""
+        with self.lock:
+            self.leases.remove(lease)
+            if self.pin:
+                for pid, cpus in self._rebalance():
+                    set_process_affinity(pid, cpus)
+
+    def _rebalance(self):
+        """Re-place every run on the least busy cores; returns (pid, cpus) for runs that moved"""
+        usage = {cpu: 0 for cpu in self.cpus}
+        moves = []
+        for lease in self.leases:
+            cpus = self._least_busy(usage, len(lease.cpus), preferred=lease.cpus)
+            for cpu in cpus:
+                usage[cpu] += 1
+            if cpus != lease.cpus:
+                lease.cpus = cpus
+                if lease.pid is not None:
+                    moves.append((lease.pid, cpus))
+        return moves
+
+    @contextmanager
+    def lease(self):
+        """
+        Context manager around acquire/release
+
+        Usage:
+            with budget.lease() as lease:
+                stream_command([..., '--threads', str(lease.threads)], on_line,
+                               on_start=budget.on_start(lease))
+        """
+        lease = self.acquire()
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def on_start(self, lease):
+        """Callback for stream_command(on_start=...) that records the process and pins it"""
+        def started(proc):
+            with self.lock:
+                lease.pid = proc.pid
+                if self.pin:
+                    set_process_affinity(proc.pid, lease.cpus)
+        return started
@@ -0,0 +1,64 @@
+import hashlib
+import threading
+from config import Config
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of model responses, keyed by model and prompt hash
+
+    Responses live in the llm_responses table, so they survive restarts and
+    are shared by every worker. The cache is bounded by the total size of
+    the responses (LLM_CACHE_MAX_MB); the least recently used ones are
+    evicted first. Hit/miss counters cover this process.
+    """
+
+    def __init__(self, db, max_bytes=None):
+        self.db = db
+        self.max_bytes = max_bytes or Config.LLM_CACHE_MAX_MB * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0  # Lookups skipped to force a fresh response
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(model, prompt):
+        """Cache key for a prompt sent to a model"""
+        return hashlib.sha256(f"{model}\0{prompt}".encode('utf-8')).hexdigest()
+
+    def get(self, model, prompt):
+        """Cached response for this model and prompt, or None"""
+        response = self.db.get_llm_response(self.key(model, prompt))
+        with self.lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def bypass(self):
+        """Count a lookup skipped for forced regeneration"""
+        with self.lock:
+            self.bypassed += 1
+
+    def put(self, model, prompt, response):
+        """Store a response (replacing any older one for the same prompt)"""
+        evicted = self.db.save_llm_response(self.key(model, prompt), model, response, self.max_bytes)
+        if evicted:
+            with self.lock:
+                self.evictions += evicted
+
+    def stats(self):
+        """Counters for this process plus the cache's current size"""
+        with self.lock:
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'evictions': self.evictions,
+            }
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats.update(self.db.get_llm_cache_stats())
+        return stats
@@ -0,0 +1,275 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+import httpx
+from ollama import Client, ResponseError
+from config import Config
+from processors.subprocess_utils import ProcessCancelled
+
+# HTTP statuses worth retrying: timeouts, rate limiting and server-side trouble
+TRANSIENT_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+class LLMUnavailable(Exception):
+    """Raised when the model can't be reached right now; the job can wait for it instead of failing"""
+
+
+def is_transient(error):
+    """True for errors a later attempt of the same request may not hit"""
+    if isinstance(error, ResponseError):
+        # -1: an error reported inside an already started stream (overload, dropped backend)
+        return error.status_code in TRANSIENT_STATUS_CODES or error.status_code == -1
+    # Connection refused/reset, timeouts, streams cut short
+    return isinstance(error, httpx.TransportError)
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a model that keeps failing
+
+    After failure_threshold transient failures in a row the breaker opens:
+    requests are refused with LLMUnavailable for cooldown seconds instead of
+    adding load to a service that is down. Then one request is let through
+    as a probe; its success closes the breaker, its failure opens it for
+    another cooldown.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0  # Transient failures in a row
+        self.opened_at = None  # time.monotonic() the breaker last opened, None while closed
+        self.probing = False  # A probe request is in flight
+        self.opened = 0  # Times the breaker opened, for logs and benchmarks
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None
+
+    def before_request(self):
+        """
+        Let a request through or refuse it
+
+        Returns:
+            bool: True if the request is the half-open probe (report its
+            outcome with record_success/record_failure/release_probe)
+
+        Raises:
+            LLMUnavailable while the breaker is open
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self.probing:
+                raise LLMUnavailable(f"model unavailable after {self.failures} failed requests "
+                                     f"(next attempt in {max(remaining, 0):.0f}s)")
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                print("✓ Model reachable again; resuming requests")
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    self.opened += 1
+                    print(f"❌ {self.failures} model requests failed in a row; "
+                          f"pausing requests for {self.cooldown:g}s")
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """The probe ended without telling whether the model is up (cancelled)"""
+        with self.lock:
+            self.probing = False
+
+    def wait_until_available(self, cancel_event=None, timeout=None, poll_interval=0.5):
+        """
+        Block until a request would be let through
+
+        Returns:
+            bool: True once the breaker is closed or ready to probe, False if
+            timeout seconds passed or cancel_event was set first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                if self.opened_at is None or (not self.probing and
+                                              time.monotonic() >= self.opened_at + self.cooldown):
+                    return True
+            delay = poll_interval if deadline is None else min(poll_interval, deadline - time.monotonic())
+            if delay <= 0:
+                return False
+            if cancel_event is not None:
+                if cancel_event.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+
+
+class LLMClient:
+    """
+    Shared, rate-limited and retrying access to an Ollama server
+
+    One instance per host (see llm_router.shared_router) serves every job in the process, so
+    its HTTP connections are kept alive and reused instead of every job
+    opening its own. On top of that it:
+
+    - caps requests in flight across all jobs (max_in_flight) and spaces
+      request starts to stay under requests_per_minute,
+    - retries transient errors (connection failures, timeouts, 429/5xx)
+      with exponential backoff and full jitter, restarting the stream,
+    - trips a CircuitBreaker when the model keeps failing, so callers get
+      LLMUnavailable straight away and can park the job until
+      breaker.wait_until_available() instead of failing it.
+
+    Other errors (bad request, unknown model, auth) are raised at once.
+    """
+
+    def __init__(self, host, headers=None, max_in_flight=8, requests_per_minute=0, retry_attempts=4,
+                 retry_base_delay=1.0, retry_max_delay=30.0, failure_threshold=5, cooldown=30.0,
+                 timeout=None, breaker=None):
+        """
+        Args:
+            host: Ollama server URL
+            headers: Optional extra HTTP headers (API key)
+            max_in_flight: Requests in flight at once from this process
+            requests_per_minute: Request starts per minute (0 = unlimited)
+            retry_attempts: Attempts per request before giving up
+            retry_base_delay / retry_max_delay: Backoff bounds in seconds
+            failure_threshold / cooldown: CircuitBreaker settings
+            timeout: Optional httpx timeout (seconds between bytes)
+            breaker: Optional CircuitBreaker to share with other clients
+        """
+        self.host = host
+        self.client = Client(host=host, headers=headers, timeout=timeout,
+                             limits=httpx.Limits(max_connections=max_in_flight,
+                                                 max_keepalive_connections=max_in_flight))
+        self.max_in_flight = max_in_flight
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.min_interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.next_start = 0.0  # Earliest time.monotonic() the next request may start
+        self.start_lock = threading.Lock()
+        self.retry_attempts = max(1, retry_attempts)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = breaker or CircuitBreaker(failure_threshold, cooldown)
+        self.retries = 0  # Requests repeated after a transient error
+
+    @classmethod
+    def from_config(cls, host, headers=None):
+        """A client for host with the LLM_* limits, retry and circuit breaker settings"""
+        return cls(
+            host,
+            headers=headers,
+            max_in_flight=Config.LLM_MAX_IN_FLIGHT,
+            requests_per_minute=Config.LLM_REQUESTS_PER_MINUTE,
+            retry_attempts=Config.LLM_RETRY_ATTEMPTS,
+            retry_base_delay=Config.LLM_RETRY_BASE_DELAY,
+            retry_max_delay=Config.LLM_RETRY_MAX_DELAY,
+            failure_threshold=Config.LLM_BREAKER_FAILURES,
+            cooldown=Config.LLM_BREAKER_COOLDOWN,
+        )
+
+    def chat(self, model, messages, cancel_event=None, on_text=None):
+        """
+        Stream one chat completion and return its text
+
+        on_text, if given, is called with the text so far as it grows. A
+        stream that fails part way is requested again from the start, so
+        the text passed to on_text can start over.
+
+        Raises:
+            ProcessCancelled if cancel_event is set; LLMUnavailable while
+            the circuit breaker is open or once every attempt failed with a
+            transient error; the model's error for anything else
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = self.breaker.before_request()
+            try:
+                with self._slot(cancel_event):
+                    text = self._stream(model, messages, cancel_event, on_text)
+            except ProcessCancelled:
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    # The model answered, so it is up; the request itself is at fault
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.retry_attempts:
+                    raise LLMUnavailable(f"{self.host} failed {attempt} attempts: {e}") from e
+                if self.breaker.is_open:
+                    raise LLMUnavailable(f"{self.host}: {e}") from e
+
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1)))
+                print(f"Model request failed ({type(e).__name__}: {e}); "
+                      f"retrying in {delay:.1f}s ({attempt}/{self.retry_attempts})")
+                self.retries += 1
+                if cancel_event is not None:
+                    if cancel_event.wait(delay):
+                        raise ProcessCancelled()
+                else:
+                    time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return text
+
+    @contextmanager
+    def _slot(self, cancel_event):
+        """Hold one of the process-wide request slots for the duration of the block"""
+        while not self.slots.acquire(timeout=0.5):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ProcessCancelled()
+        try:
+            self._wait_for_start(cancel_event)
+            yield
+        finally:
+            self.slots.release()
+
+    def _wait_for_start(self, cancel_event):
+        """Space request starts min_interval apart"""
+        if not self.min_interval:
+            return
+        with self.start_lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.min_interval
+        delay = start - now
+        if delay > 0:
+            if cancel_event is not None:
+                if cancel_event.wait(delay):
+                    raise ProcessCancelled()
+            else:
+                time.sleep(delay)
+
+    def _stream(self, model, messages, cancel_event, on_text):
+        text = ""
+        stream = self.client.chat(model, messages=messages, stream=True)
+        try:
+            for part in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ProcessCancelled()
+                content = part.get('message', {}).get('content', '')
+                text += content
+                if on_text is not None and content:
+                    on_text(text)
+        finally:
+            stream.close()  # Drops the connection if the stream was abandoned
+        return text
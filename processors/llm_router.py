@@ -0,0 +1,364 @@
+import bisect
+import queue
+import threading
+import time
+from config import Config
+from processors.llm_client import LLMClient, LLMUnavailable
+from processors.subprocess_utils import ProcessCancelled, AnyEvent
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600)
+
+
+class LatencyHistogram:
+    """
+    Bucketed latencies of one backend (time to first token or total time)
+
+    Fixed buckets keep memory and recording cost constant however many
+    requests are seen. Percentiles are interpolated within the bucket they
+    fall in.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def percentile(self, p):
+        """Latency below which p percent of the recorded requests fell, or None before any were recorded"""
+        with self.lock:
+            if not self.count:
+                return None
+            rank = self.count * p / 100
+            seen = 0
+            for index, count in enumerate(self.counts):
+                if count and seen + count >= rank:
+                    low = self.buckets[index - 1] if index else 0.0
+                    high = self.buckets[index] if index < len(self.buckets) else self.buckets[-1] * 2
+                    return low + (high - low) * (rank - seen) / count
+                seen += count
+            return self.buckets[-1] * 2
+
+    def snapshot(self):
+        """Cumulative bucket counts ({upper bound: count}, 'inf' for all), count and sum"""
+        with self.lock:
+            cumulative = {}
+            total = 0
+            for bound, count in zip(self.buckets + ('inf',), self.counts):
+                total += count
+                cumulative[bound] = total
+            return {'buckets': cumulative, 'count': self.count, 'sum': self.sum}
+
+
+class Backend:
+    """One model on one Ollama server, with its latency history"""
+
+    def __init__(self, name, client, model):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.ttft = LatencyHistogram()  # Seconds from sending a request to its first token
+        self.duration = LatencyHistogram()  # Seconds for whole successful requests
+        self.requests = 0
+        self.wins = 0  # Requests whose answer came from this backend
+        self.lock = threading.Lock()
+
+    def hedge_after(self, percentile, min_samples, default_seconds, min_seconds):
+        """
+        Seconds to wait for this backend's first token before hedging
+
+        The given percentile of its recent time to first token, once
+        min_samples requests are known; default_seconds until then.
+        """
+        if self.ttft.count < min_samples:
+            return default_seconds
+        return max(min_seconds, self.ttft.percentile(percentile))
+
+
+class _Attempt:
+    """One request to one backend, run on its own thread"""
+
+    def __init__(self, backend, stop_event, hedge=False):
+        self.backend = backend
+        self.hedge = hedge  # Sent because an earlier attempt was slow to start
+        self.stopped = threading.Event()  # Set when another attempt won or the race is over
+        self.stop_event = AnyEvent(self.stopped, stop_event)
+        self.started = time.monotonic()
+
+
+class LLMRouter:
+    """
+    Sends chat requests to an ordered list of backends (remote model, local Ollama, ...)
+
+    Each request goes to the first backend. If its first token hasn't come
+    after the backend's hedge threshold (LLM_HEDGE_PERCENTILE of its time
+    to first token so far), the same request is also sent to the next
+    backend; whichever stream produces a token first is kept and the other
+    is cancelled. A backend that fails (including LLMUnavailable from its
+    circuit breaker) hands the request to the next one straight away.
+    With a single backend this is a plain LLMClient call.
+    """
+
+    def __init__(self, backends, hedge_percentile=95, hedge_min_samples=20, hedge_default_seconds=30.0,
+                 hedge_min_seconds=1.0):
+        """
+        Args:
+            backends: Backend instances in order of preference
+            hedge_percentile: Time-to-first-token percentile that triggers a hedge
+            hedge_min_samples: Requests a backend needs before its histogram is trusted
+            hedge_default_seconds: Hedge threshold until then
+            hedge_min_seconds: Never hedge sooner than this
+        """
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = list(backends)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_seconds = hedge_default_seconds
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedges = 0  # Second requests sent because the first was slow to start
+        self.hedge_wins = 0  # ... that answered first
+        self.fallbacks = 0  # Requests passed on because a backend failed
+        self.lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The preferred backend's model (what responses are cached under)"""
+        return self.backends[0].model
+
+    def hedge_after(self, backend):
+        return backend.hedge_after(self.hedge_percentile, self.hedge_min_samples, self.hedge_default_seconds,
+                                   self.hedge_min_seconds)
+
+    def chat(self, messages, cancel_event=None, on_text=None):
+        """
+        Stream one chat completion from the fastest backend to respond
+
+        on_text, if given, is called with the text so far (from the winning
+        stream only; it can start over if that stream is retried).
+
+        Returns:
+            tuple of (text, backend that wrote it)
+
+        Raises:
+            ProcessCancelled if cancel_event is set; LLMUnavailable if every
+            backend is unavailable; otherwise the first backend's error when
+            all of them failed
+        """
+        if len(self.backends) == 1:
+            backend = self.backends[0]
+            return self._run(_Attempt(backend, cancel_event), messages, on_text), backend
+
+        events = queue.Queue()
+        pending = list(self.backends)
+        running = []
+        errors = []
+        race = {'winner': None}
+        race_lock = threading.Lock()
+
+        def on_attempt_text(attempt, text):
+            with race_lock:
+                if race['winner'] is None:
+                    race['winner'] = attempt
+                    events.put(('first', attempt, None))
+                elif race['winner'] is not attempt:
+                    raise ProcessCancelled()  # Another stream got there first
+            if on_text is not None:
+                on_text(text)
+
+        def run(attempt):
+            try:
+                text = self._run(attempt, messages, lambda text: on_attempt_text(attempt, text))
+                events.put(('done', attempt, text))
+            except BaseException as e:
+                events.put(('error', attempt, e))
+
+        def launch(hedge=False):
+            attempt = _Attempt(pending.pop(0), cancel_event, hedge)
+            running.append(attempt)
+            threading.Thread(target=run, args=(attempt,), name=f'llm-{attempt.backend.name}', daemon=True).start()
+            return time.monotonic() + self.hedge_after(attempt.backend)
+
+        def stop_all(keep=None):
+            for attempt in running:
+                if attempt is not keep:
+                    attempt.stopped.set()
+
+        hedge_at = launch()
+        try:
+            while True:
+                wait = 0.5
+                if race['winner'] is None and pending:
+                    wait = min(wait, max(0.0, hedge_at - time.monotonic()))
+                try:
+                    kind, attempt, value = events.get(timeout=wait)
+                except queue.Empty:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ProcessCancelled()
+                    if race['winner'] is None and pending and time.monotonic() >= hedge_at:
+                        print(f"No first token from {running[-1].backend.name} after "
+                              f"{time.monotonic() - running[-1].started:.1f}s; also asking {pending[0].name}")
+                        with self.lock:
+                            self.hedges += 1
+                        hedge_at = launch(hedge=True)
+                    continue
+
+                if kind == 'first':
+                    stop_all(keep=attempt)
+                    if attempt.hedge:
+                        with self.lock:
+                            self.hedge_wins += 1
+                    continue
+
+                if kind == 'done':
+                    if race['winner'] not in (None, attempt):
+                        running.remove(attempt)  # An empty reply; the stream already writing wins
+                        continue
+                    stop_all()
+                    return value, attempt.backend
+
+                # An attempt ended without an answer
+                running.remove(attempt)
+                if not (attempt.stopped.is_set() and isinstance(value, ProcessCancelled)):  # Else it lost the race
+                    if isinstance(value, ProcessCancelled) or (cancel_event is not None and cancel_event.is_set()):
+                        raise ProcessCancelled()
+                    print(f"{attempt.backend.name} failed: {value}")
+                    errors.append(value)
+                    with race_lock:
+                        if race['winner'] is attempt:
+                            race['winner'] = None  # Its text is abandoned; whoever answers next starts over
+                if running:
+                    continue
+                if not pending:
+                    if all(isinstance(error, LLMUnavailable) for error in errors):
+                        raise LLMUnavailable('; '.join(str(error) for error in errors))
+                    raise next(error for error in errors if not isinstance(error, LLMUnavailable))
+                print(f"Trying {pending[0].name} instead")
+                with self.lock:
+                    self.fallbacks += 1
+                hedge_at = launch()
+        finally:
+            stop_all()
+
+    def _run(self, attempt, messages, on_text=None):
+        """One attempt's request, timing its first token and its whole duration"""
+        backend = attempt.backend
+        first = []
+
+        def on_attempt_text(text):
+            if not first:
+                first.append(time.monotonic())
+            if on_text is not None:
+                on_text(text)
+
+        with backend.lock:
+            backend.requests += 1
+        try:
+            text = backend.client.chat(backend.model, messages, cancel_event=attempt.stop_event,
+                                       on_text=on_attempt_text)
+        except ProcessCancelled:
+            if first:
+                backend.ttft.record(first[0] - attempt.started)
+            elif attempt.stopped.is_set():
+                # Lost a race before its first token: record the wait so far, or slow starts that
+                # always get hedged would never reach the histogram and the threshold would creep down
+                backend.ttft.record(time.monotonic() - attempt.started)
+            raise
+        finished = time.monotonic()
+        backend.ttft.record((first[0] if first else finished) - attempt.started)
+        backend.duration.record(finished - attempt.started)
+        with backend.lock:
+            backend.wins += 1
+        return text
+
+    def wait_until_available(self, cancel_event=None, timeout=None, poll_interval=0.5):
+        """
+        Block until some backend's circuit breaker lets requests through
+
+        Returns:
+            bool: False if timeout seconds passed or cancel_event was set first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if any(backend.client.breaker.wait_until_available(timeout=0) for backend in self.backends):
+                return True
+            delay = poll_interval if deadline is None else min(poll_interval, deadline - time.monotonic())
+            if delay <= 0:
+                return False
+            if cancel_event is not None:
+                if cancel_event.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+
+    def stats(self):
+        """Per-backend request counts and latency percentiles, plus hedging counters"""
+        with self.lock:
+            stats = {'hedges': self.hedges, 'hedge_wins': self.hedge_wins, 'fallbacks': self.fallbacks}
+        stats['backends'] = {
+            backend.name: {
+                'model': backend.model,
+                'requests': backend.requests,
+                'wins': backend.wins,
+                'ttft_p50': backend.ttft.percentile(50),
+                'ttft_p95': backend.ttft.percentile(95),
+                'hedge_after': self.hedge_after(backend),
+            }
+            for backend in self.backends
+        }
+        return stats
+
+
+def parse_backends(spec):
+    """
+    Parse LLM_BACKENDS: comma-separated 'host|model' entries, in order of preference
+
+    Returns:
+        list of (host, model) tuples
+    """
+    backends = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, model = entry.partition('|')
+        if not model:
+            raise ValueError(f"LLM_BACKENDS entry {entry!r} is not 'host|model'")
+        backends.append((host.strip(), model.strip()))
+    return backends
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_router():
+    """The process-wide LLMRouter for Config.LLM_BACKENDS (one pooled LLMClient per host)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            clients = {}
+            backends = []
+            for host, model in parse_backends(Config.LLM_BACKENDS):
+                if host not in clients:
+                    headers = None
+                    if host == Config.OLLAMA_HOST:
+                        headers = {'Authorization': f'Bearer {Config.OLLAMA_API_KEY}'}  # Only the cloud host gets the key
+                    clients[host] = LLMClient.from_config(host, headers)
+                backends.append(Backend(f'{host} {model}', clients[host], model))
+            _shared = LLMRouter(
+                backends,
+                hedge_percentile=Config.LLM_HEDGE_PERCENTILE,
+                hedge_min_samples=Config.LLM_HEDGE_MIN_SAMPLES,
+                hedge_default_seconds=Config.LLM_HEDGE_DEFAULT_SECONDS,
+                hedge_min_seconds=Config.LLM_HEDGE_MIN_SECONDS,
+            )
+        return _shared
@@ -1,29 +1,64 @@
-from ollama import Client
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
 from config import Config
+from processors.chunker import chunk_transcript, estimate_tokens
+from processors.llm_cache import LLMResponseCache
+from processors.llm_client import LLMUnavailable
+from processors.llm_router import shared_router
+from processors.subprocess_utils import ProcessCancelled, AnyEvent
 
 
 class NoteGenerator:
     """Generates structured notes from transcripts using Ollama"""
 
-    def __init__(self):
-        self.client = Client(
-            host=Config.OLLAMA_HOST,
-            headers={'Authorization': f'Bearer {Config.OLLAMA_API_KEY}'}
-        )
-        self.model = Config.OLLAMA_MODEL
+    def __init__(self, cache=None, llm=None):
+        # Requests go through the process-wide LLMRouter (hedging/fallback over pooled, retrying clients)
+        self.llm = llm or shared_router()
+        self.model = self.llm.model
+        # Optional LLMResponseCache; identical prompts are then answered without calling the model
+        self.cache = cache
 
-    def generate_notes(self, transcript_text, metadata=None):
+    def generate_notes(self, transcript_text, metadata=None, cancel_event=None, use_cache=True, timestamps=None,
+                       partial=None):
         """
         Generate structured markdown notes from transcript
 
+        Transcripts longer than NOTES_MAP_REDUCE_TOKENS are split into chunks
+        (at whisper segment and chapter boundaries when timestamps and
+        chapters are known) and handled by generate_notes_chunked; shorter
+        ones go in one prompt.
+
         Args:
             transcript_text: The transcript text
-            metadata: Optional dict with video metadata (title, channel, etc.)
+            metadata: Optional dict with video metadata (title, channel, chapters, etc.)
+            cancel_event: Optional threading.Event; the stream is abandoned
+                (ProcessCancelled raised) as soon as it is set
+            use_cache: False to force fresh responses from the model (they
+                still replace the cached ones)
+            timestamps: Optional whisper JSON segments of the transcript
+            partial: Optional PartialNotesRecorder that receives the notes
+                as they stream in (and lets an interrupted attempt resume)
 
         Returns:
             str: Generated markdown notes
+
+        Raises:
+            LLMUnavailable if the model can't be reached right now (the
+            caller may wait with self.llm.wait_until_available and
+            try again; requests the preferred model finished are then answered
+            from the cache)
         """
+        if estimate_tokens(transcript_text) > Config.NOTES_MAP_REDUCE_TOKENS:
+            chunks = chunk_transcript(transcript_text, timestamps, (metadata or {}).get('chapters'))
+            return self.generate_notes_chunked(chunks, metadata, cancel_event=cancel_event, use_cache=use_cache,
+                                               partial=partial)
+        return self._generate_single(transcript_text, metadata, cancel_event, use_cache, partial)
+
+    def _generate_single(self, transcript_text, metadata=None, cancel_event=None, use_cache=True, partial=None):
+        """Generate the notes for a whole transcript in one prompt, whatever its length"""
         # Build prompt with metadata if available
         prompt = self._build_prompt(transcript_text, metadata)
 
@@ -32,27 +67,134 @@ class NoteGenerator:
         print(f"Transcript length: {len(transcript_text)} characters")
 
         try:
-            # Call Ollama API
-            notes = ""
-            messages = [
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ]
-
-            # Stream response
-            for part in self.client.chat(self.model, messages=messages, stream=True):
-                content = part.get('message', {}).get('content', '')
-                notes += content
-                print('.', end='', flush=True)
-
+            notes = self._chat_recorded(prompt, cancel_event, use_cache, partial)
             print("\n✓ Notes generated successfully!")
             return notes
 
+        except (ProcessCancelled, LLMUnavailable):
+            raise
         except Exception as e:
             raise Exception(f"Failed to generate notes: {str(e)}")
 
+    def _chat(self, prompt, cancel_event=None, show_progress=True, use_cache=True, on_text=None):
+        """
+        Stream one completion for prompt and return its text
+
+        With a cache, a response stored for the prompt is returned instead;
+        use_cache=False skips the lookup but still stores the new response
+        (see _store). on_text, if given, is called with the text so far as
+        it grows.
+        """
+        if self.cache is not None:
+            if use_cache:
+                cached = self.cache.get(self.model, prompt)
+                if cached is not None:
+                    print(f"✓ Reused cached response ({len(cached)} characters)")
+                    if on_text is not None:
+                        on_text(cached)
+                    return cached
+            else:
+                self.cache.bypass()
+
+        notes, model = self._stream(prompt, cancel_event, show_progress, on_text)
+        self._store(prompt, notes, model)
+        return notes
+
+    def _store(self, prompt, notes, model):
+        """
+        Cache the response to prompt, if the preferred model wrote it
+
+        Lookups and stores both use self.model's key. Answers from a
+        fallback or hedge backend aren't stored, so they never stand in for
+        the preferred model's and don't take LRU space under a key that is
+        never read. Cancelled or failed streams never get here.
+        """
+        if self.cache is not None and notes and model == self.model:
+            self.cache.put(self.model, prompt, notes)
+
+    def _stream(self, prompt, cancel_event=None, show_progress=True, on_text=None):
+        """
+        Stream one completion for prompt from the model, bypassing the cache
+
+        Returns:
+            tuple: (text, model of the backend that wrote it)
+        """
+        messages = [
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+
+        started = time.perf_counter()
+        first_token_at = []
+
+        def on_stream(text):
+            if not first_token_at:
+                first_token_at.append(time.perf_counter())
+            if on_text is not None:
+                on_text(text)
+            if show_progress:
+                print('.', end='', flush=True)
+
+        try:
+            notes, backend = self.llm.chat(messages, cancel_event=cancel_event, on_text=on_stream)
+        except ProcessCancelled:
+            raise
+        except LLMUnavailable:
+            metrics.LLM_ERRORS.inc(kind='unavailable')
+            raise
+        except Exception:
+            metrics.LLM_ERRORS.inc(kind='error')
+            raise
+        self._record_timing(backend.model, notes, started, first_token_at[0] if first_token_at else None)
+        return notes, backend.model
+
+    def _record_timing(self, model, notes, started, first_token_at):
+        """Request time, time to first token and output speed of one completion, for /metrics"""
+        finished = time.perf_counter()
+        metrics.STAGE_SECONDS.observe(finished - started, stage='llm')
+        if first_token_at is None:
+            return
+        metrics.LLM_TTFT.observe(first_token_at - started, model=model)
+        if finished > first_token_at:
+            metrics.LLM_TOKENS_PER_SECOND.observe(estimate_tokens(notes) / (finished - first_token_at), model=model)
+
+    def _chat_recorded(self, prompt, cancel_event=None, use_cache=True, partial=None):
+        """
+        _chat that streams its text into a PartialNotesRecorder
+
+        If an interrupted attempt left notes for this same prompt, the model
+        is asked to continue them instead of starting over (unless use_cache
+        is False, which always regenerates).
+        """
+        if partial is None:
+            return self._chat(prompt, cancel_event, use_cache=use_cache)
+
+        prompt_key = LLMResponseCache.key(self.model, prompt)
+        resumed = partial.resumable(prompt_key) if use_cache else ''
+        if not resumed:
+            return self._chat(prompt, cancel_event, use_cache=use_cache,
+                              on_text=lambda text: partial.update(text, prompt_key))
+
+        print(f"Continuing interrupted notes ({len(resumed)} characters kept)...")
+        rest, model = self._stream(self._build_continue_prompt(prompt, resumed), cancel_event,
+                                   on_text=lambda text: partial.update(resumed + text, prompt_key))
+        notes = resumed + rest
+        if rest:
+            self._store(prompt, notes, model)
+        return notes
+
+    def _build_continue_prompt(self, prompt, resumed):
+        """Ask for the rest of a response that was cut off after `resumed`"""
+        return f"""{prompt}
+
+---
+
+You already wrote the beginning of these notes (below) but were interrupted. Continue exactly where they stop: do not repeat anything that is already written and do not add an introduction. Reply with the continuation only.
+
+{resumed}"""
+
     def _build_prompt(self, transcript_text, metadata):
         """Build the prompt for note generation"""
 
@@ -93,18 +235,7 @@ Remember: Your goal is to create notes so comprehensive that someone could under
 """
 
         # Add metadata if available
-        if metadata:
-            prompt += "## Video Information:\n"
-            if metadata.get('title'):
-                prompt += f"- **Title**: {metadata['title']}\n"
-            if metadata.get('channel'):
-                prompt += f"- **Creator**: {metadata['channel']}\n"
-            if metadata.get('duration'):
-                minutes = metadata['duration'] // 60
-                prompt += f"- **Duration**: {minutes} minutes\n"
-            if metadata.get('url'):
-                prompt += f"- **Source**: {metadata['url']}\n"
-            prompt += "\n"
+        prompt += self._metadata_section(metadata)
 
         # Add transcript
         prompt += f"""## Transcript:
@@ -118,51 +249,257 @@ Now, create well-structured markdown notes from this transcript. Start with a cl
 
         return prompt
 
-    def generate_notes_chunked(self, transcript_chunks, metadata=None):
+    def _metadata_section(self, metadata):
+        """Video information block for prompts (empty without metadata)"""
+        if not metadata:
+            return ""
+
+        section = "## Video Information:\n"
+        if metadata.get('title'):
+            section += f"- **Title**: {metadata['title']}\n"
+        if metadata.get('channel'):
+            section += f"- **Creator**: {metadata['channel']}\n"
+        if metadata.get('duration'):
+            minutes = metadata['duration'] // 60
+            section += f"- **Duration**: {minutes} minutes\n"
+        if metadata.get('url'):
+            section += f"- **Source**: {metadata['url']}\n"
+        return section + "\n"
+
+    def _build_chunk_prompt(self, chunk, metadata, number):
         """
-        Generate notes from multiple transcript chunks
+        Build the prompt for the notes on one part of a long transcript (map step)
+
+        Leaves out the number of parts, which isn't known while the audio is
+        still being transcribed, so a part sent early (StreamingNotes) gets
+        the same prompt, and cache entry, as in generate_notes_chunked.
+        """
+        # Where the part sits in the video, when the chunker knew its times and chapter
+        position = ""
+        if chunk.get('start_ms') is not None and chunk.get('end_ms') is not None:
+            position += f" It covers {self._format_time(chunk['start_ms'])}-{self._format_time(chunk['end_ms'])} of the video."
+        if chunk.get('chapter'):
+            position += f" It starts in the chapter \"{chunk['chapter']}\"."
+        if chunk.get('overlap_tokens'):
+            position += (" Its first few sentences repeat the end of the previous part for context;"
+                         " don't write notes on them unless the idea continues into this part.")
+
+        prompt = f"""You are an expert note-taker creating comprehensive, detailed, and well-structured notes from video transcripts.
+
+The transcript below is part {number} of a long video.{position} Write markdown notes for THIS PART ONLY; the notes for all parts will be merged into one document afterwards.
+
+IMPORTANT GUIDELINES:
+- DO NOT summarize or skip content - capture ALL details, explanations, and information
+- DO NOT remove examples, stories, or contextual information
+- Include ALL technical details, specifications, and explanations
+- Preserve the flow and progression of ideas from the original content
+- Use ## for main topics and ### for subtopics, with detailed bullet points
+- Put important terms, names, definitions, or concepts in **bold**
+- Use numbered lists for step-by-step processes, code blocks for code and blockquotes for important quotes
+- DO NOT write a title, an overview or a "Key Takeaways" section - those are added when the parts are merged
+- The part may start or end mid-topic; just write notes for what it contains
+
+"""
+        prompt += self._metadata_section(metadata)
+        prompt += f"""## Transcript (part {number}):
+
+{chunk['text']}
+
+---
+
+Now, write detailed markdown notes for this part:
+"""
+        return prompt
+
+    def _build_merge_prompt(self, part_notes, metadata, final=True):
+        """Build the prompt that combines notes on consecutive parts into one document (reduce step)"""
+        prompt = """You are an expert editor combining notes that were written separately for consecutive parts of one video into a single coherent document.
+
+IMPORTANT GUIDELINES:
+- Keep ALL details, examples, explanations, code, and quotes from every part - do not summarize or shorten
+- Keep the order in which ideas were presented
+- Where a topic continues across parts, combine it into one section instead of repeating the heading
+- Remove repetition caused by the split between parts
+- Keep consistent markdown: ## for main sections, ### for subsections, **bold** key terms
+"""
+        if final:
+            prompt += """
+The document should have:
+1. A clear title (# heading) based on the content
+2. A brief overview at the top (2-3 sentences) covering the whole video
+3. The combined sections
+4. A "Key Takeaways" section at the end with 5-10 comprehensive points
+5. A "Additional Details" section if there's extra context worth preserving
+
+"""
+        else:
+            prompt += """- These parts are only a stretch of the video: DO NOT add a title, an overview or a "Key Takeaways" section
+
+"""
+        prompt += self._metadata_section(metadata)
+        for i, notes in enumerate(part_notes, 1):
+            prompt += f"## Notes for part {i} of {len(part_notes)}:\n\n{notes.strip()}\n\n---\n\n"
+        prompt += "Now, write the combined markdown notes:\n"
+        return prompt
+
+    def generate_notes_chunked(self, transcript_chunks, metadata=None, cancel_event=None, max_in_flight=None,
+                               use_cache=True, partial=None):
+        """
+        Generate notes from multiple transcript chunks (map-reduce)
+
+        Notes for the chunks are generated concurrently, at most max_in_flight
+        requests at a time, then merged into one document by a final request.
+        If the chunk notes together are too long for one merge prompt, they
+        are first merged in groups of neighbouring parts.
 
         Args:
-            transcript_chunks: List of transcript text chunks
+            transcript_chunks: Chunks in order, as strings or dicts from
+                processors.chunker.chunk_transcript
             metadata: Optional video metadata
+            cancel_event: Optional threading.Event that stops all requests
+            max_in_flight: Concurrent requests (default NOTES_MAP_CONCURRENCY)
+            use_cache: False to force fresh responses (see generate_notes)
+            partial: Optional PartialNotesRecorder; it shows the part notes
+                as they finish, then the final document as it streams
 
         Returns:
             str: Combined markdown notes
         """
+        transcript_chunks = [chunk if isinstance(chunk, dict) else {'text': chunk} for chunk in transcript_chunks]
         if len(transcript_chunks) == 1:
-            return self.generate_notes(transcript_chunks[0], metadata)
+            # Not generate_notes: a long transcript in one chunk (NOTES_CHUNK_TOKENS >= NOTES_MAP_REDUCE_TOKENS)
+            # would be chunked again, forever
+            return self._generate_single(transcript_chunks[0]['text'], metadata, cancel_event, use_cache, partial)
 
-        print(f"Generating notes from {len(transcript_chunks)} chunks...")
+        max_in_flight = max_in_flight or Config.NOTES_MAP_CONCURRENCY
+        total = len(transcript_chunks)
+        print(f"Generating notes from {total} chunks ({max_in_flight} at a time)...")
+        print(f"Model: {self.model}")
+        started = time.monotonic()
 
-        all_notes = []
+        try:
+            prompts = [self._build_chunk_prompt(chunk, metadata, i)
+                       for i, chunk in enumerate(transcript_chunks, 1)]
+            on_done = None
+            if partial is not None:
+                finished = {}
+
+                def record_part(index, notes):
+                    finished[index] = notes
+                    partial.update('\n\n'.join(finished[i] for i in sorted(finished)))
 
-        for i, chunk in enumerate(transcript_chunks, 1):
-            print(f"\nProcessing chunk {i}/{len(transcript_chunks)}...")
+                on_done = record_part
 
-            chunk_metadata = metadata.copy() if metadata else {}
-            chunk_metadata['chunk_info'] = f"Part {i} of {len(transcript_chunks)}"
+            part_notes = self._chat_concurrently(prompts, max_in_flight, cancel_event, 'Part', use_cache, on_done)
+            notes = self.merge_part_notes(part_notes, metadata, cancel_event, max_in_flight, use_cache, partial)
+            print(f"\n✓ Notes generated from {total} chunks in {time.monotonic() - started:.0f}s")
+            return notes
 
-            notes = self.generate_notes(chunk, chunk_metadata)
-            all_notes.append(notes)
+        except (ProcessCancelled, LLMUnavailable):
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to generate notes: {str(e)}")
+
+    def merge_part_notes(self, part_notes, metadata=None, cancel_event=None, max_in_flight=None, use_cache=True,
+                         partial=None):
+        """
+        Merge the notes of a long transcript's parts into one document (reduce step)
+
+        Neighbouring parts are merged in rounds until everything fits in one
+        prompt, then a final request writes the document.
+        """
+        max_in_flight = max_in_flight or Config.NOTES_MAP_CONCURRENCY
+        while (len(part_notes) > 1
+               and sum(estimate_tokens(notes) for notes in part_notes) > Config.NOTES_MAP_REDUCE_TOKENS):
+            groups = self._group_parts(part_notes, Config.NOTES_MAP_REDUCE_TOKENS)
+            if len(groups) == len(part_notes):
+                break  # Every part is too long to pair up; the final merge takes them as they are
+            print(f"Merging {len(part_notes)} part notes into {len(groups)}...")
+            merged = self._chat_concurrently(
+                [self._build_merge_prompt(group, metadata, final=False) for group in groups if len(group) > 1],
+                max_in_flight, cancel_event, 'Merge', use_cache)
+            merged = iter(merged)
+            part_notes = [next(merged) if len(group) > 1 else group[0] for group in groups]
+
+        print("Merging part notes into the final document...")
+        return self._chat_recorded(self._build_merge_prompt(part_notes, metadata), cancel_event, use_cache, partial)
+
+    def generate_part_notes(self, chunk, metadata=None, number=1, cancel_event=None, use_cache=True):
+        """
+        Generate the notes for one chunk of a long transcript (map step)
 
-        # Combine notes with separators
-        combined_notes = "\n\n---\n\n".join(all_notes)
+        Args:
+            chunk: Chunk dict from processors.chunker.chunk_transcript
+            number: The chunk's position (from 1)
+        """
+        return self._chat(self._build_chunk_prompt(chunk, metadata, number), cancel_event,
+                          show_progress=False, use_cache=use_cache)
 
-        # Add a summary note at the top
-        if metadata and metadata.get('title'):
-            title = metadata['title']
-            header = f"# {title}\n\n*These notes were generated from a long video and are split into {len(transcript_chunks)} parts.*\n\n"
-            combined_notes = header + combined_notes
+    def _chat_concurrently(self, prompts, max_in_flight, cancel_event, label, use_cache=True, on_done=None):
+        """
+        Run one completion per prompt with at most max_in_flight at once
 
-        return combined_notes
+        Returns the texts in prompt order. The first failure stops the other
+        requests and is raised. on_done, if given, is called with the index
+        and text of each completion as it finishes (from several threads).
+        """
+        done_lock = threading.Lock()
+        # Set when any request fails, so the others stop instead of running to the end
+        abort_event = threading.Event()
+        stop_event = AnyEvent(abort_event, cancel_event)
+
+        def run(index, prompt):
+            if stop_event.is_set():
+                raise ProcessCancelled()
+            try:
+                notes = self._chat(prompt, stop_event, show_progress=False, use_cache=use_cache)
+            except Exception:
+                abort_event.set()
+                raise
+            print(f"✓ {label} {index + 1}/{len(prompts)} done ({len(notes)} characters)")
+            if on_done is not None:
+                with done_lock:
+                    on_done(index, notes)
+            return notes
 
-    def improve_notes(self, existing_notes, feedback):
+        # Leaving the pool waits for every request
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            futures = [pool.submit(run, index, prompt) for index, prompt in enumerate(prompts)]
+
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ProcessCancelled()
+            # Requests stopped because a sibling failed aren't the interesting error
+            raise next((e for e in errors if not isinstance(e, ProcessCancelled)), errors[0])
+        return [future.result() for future in futures]
+
+    def _group_parts(self, part_notes, max_tokens):
+        """Pack consecutive part notes into groups of at most max_tokens estimated tokens"""
+        groups = [[]]
+        length = 0
+        for notes in part_notes:
+            tokens = estimate_tokens(notes)
+            if groups[-1] and length + tokens > max_tokens:
+                groups.append([])
+                length = 0
+            groups[-1].append(notes)
+            length += tokens
+        return groups
+
+    def _format_time(self, ms):
+        """Format milliseconds as H:MM:SS"""
+        seconds = int(ms) // 1000
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+    def improve_notes(self, existing_notes, feedback, use_cache=True):
         """
         Improve existing notes based on user feedback
 
         Args:
             existing_notes: Current markdown notes
             feedback: User feedback for improvement
+            use_cache: False to force a fresh response (see generate_notes)
 
         Returns:
             str: Improved markdown notes
@@ -179,14 +516,7 @@ Please update the notes according to the feedback while maintaining the markdown
 """
 
         try:
-            notes = ""
-            messages = [{'role': 'user', 'content': prompt}]
-
-            for part in self.client.chat(self.model, messages=messages, stream=True):
-                content = part.get('message', {}).get('content', '')
-                notes += content
-
-            return notes
+            return self._chat(prompt, show_progress=False, use_cache=use_cache)
 
         except Exception as e:
             raise Exception(f"Failed to improve notes: {str(e)}")
@@ -0,0 +1,180 @@
+import os
+import wave
+from bisect import bisect_left, bisect_right
+import numpy as np
+from config import Config
+
+FRAME_MS = 30  # Energy is measured per 30 ms frame
+MIN_SPEECH_MS = 60  # Louder blips shorter than this (clicks, bumps) don't count as speech
+FULL_SCALE = 32768.0 ** 2
+
+
+class OffsetMap:
+    """
+    Maps times in trimmed audio back onto the original recording
+
+    spans is a list of (trimmed_start_ms, original_start_ms, length_ms), one
+    per kept stretch of audio, in order. Kept stretches are back to back in
+    the trimmed file.
+    """
+
+    def __init__(self, spans):
+        self.spans = spans
+        self.starts = [span[0] for span in spans]
+
+    def to_original(self, ms, end=False):
+        """
+        Original time of a trimmed-audio time (milliseconds)
+
+        A time exactly on the join between two spans is ambiguous; end=True
+        places it at the end of the earlier span (for segment end times),
+        otherwise at the start of the later one.
+        """
+        if end:
+            index = bisect_left(self.starts, ms) - 1
+        else:
+            index = bisect_right(self.starts, ms) - 1
+        trimmed_start, original_start, length = self.spans[max(0, index)]
+        return original_start + min(max(0, ms - trimmed_start), length)
+
+
+def frame_levels(audio_path, frame_ms=FRAME_MS, block_seconds=60):
+    """
+    Loudness of every frame of a 16-bit mono WAV, in dB relative to full scale
+
+    The file is read in blocks of block_seconds so multi-hour audio isn't
+    loaded at once. Returns (levels, samples_per_frame, total_samples), or
+    None for formats other than 16-bit mono.
+    """
+    with wave.open(audio_path, 'rb') as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            return None
+        rate = wav.getframerate()
+        frame = max(1, rate * frame_ms // 1000)
+        block = frame * max(1, rate * block_seconds // frame)
+        total = wav.getnframes()
+
+        energies = []
+        while True:
+            data = wav.readframes(block)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype='<i2')
+            count = len(samples) // frame  # A trailing partial frame is ignored
+            if count:
+                frames = samples[:count * frame].astype(np.float32).reshape(count, frame)
+                energies.append(np.square(frames).mean(axis=1))
+
+    energy = np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+    return 10 * np.log10(energy / FULL_SCALE + 1e-10), frame, total
+
+
+def _runs(mask):
+    """Start and end (exclusive) indexes of the runs of True in a boolean array"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _merge_gaps(starts, ends, min_gap):
+    """Join runs separated by fewer than min_gap frames"""
+    if len(starts) < 2:
+        return starts, ends
+    keep = (starts[1:] - ends[:-1]) >= min_gap
+    return np.concatenate((starts[:1], starts[1:][keep])), np.concatenate((ends[:-1][keep], ends[-1:]))
+
+
+def find_speech(levels, frame_ms=FRAME_MS, threshold_db=None, min_silence_seconds=None, padding_seconds=None):
+    """
+    Find the stretches of speech in per-frame levels (see frame_levels)
+
+    A frame is speech when it is threshold_db louder than the recording's
+    noise floor (its 10th percentile level). Pauses shorter than
+    min_silence_seconds are kept, as is padding_seconds of silence either
+    side of every cut so words aren't clipped. Recordings without a clear
+    gap between loud and quiet frames are left whole.
+
+    Returns:
+        list of (start_frame, end_frame) frame index pairs, end exclusive;
+        one pair covering everything when nothing should be cut, empty when
+        the recording has no frames
+    """
+    threshold_db = threshold_db if threshold_db is not None else Config.VAD_THRESHOLD_DB
+    min_silence_seconds = min_silence_seconds if min_silence_seconds is not None else Config.VAD_MIN_SILENCE_SECONDS
+    padding_seconds = padding_seconds if padding_seconds is not None else Config.VAD_PADDING_SECONDS
+
+    count = len(levels)
+    if count == 0:
+        return []
+    floor, loud = np.percentile(levels, [10, 90])
+    if loud - floor < threshold_db:
+        return [(0, count)]
+
+    starts, ends = _runs(levels > floor + threshold_db)
+    keep = (ends - starts) * frame_ms >= MIN_SPEECH_MS
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return [(0, count)]
+
+    starts, ends = _merge_gaps(starts, ends, int(min_silence_seconds * 1000 / frame_ms))
+    padding = int(padding_seconds * 1000 / frame_ms)
+    starts = np.maximum(0, starts - padding)
+    ends = np.minimum(count, ends + padding)
+    starts, ends = _merge_gaps(starts, ends, 1)  # Padding may make neighbours touch
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def trim_silence(audio_path, output_path, min_skip_percent=None):
+    """
+    Write a copy of a 16 kHz mono WAV with its long silences cut out
+
+    Returns:
+        (OffsetMap, stats) where stats has original_seconds, kept_seconds,
+        skipped_seconds and skipped_percent; or None, with nothing written,
+        when less than min_skip_percent of the audio would be cut
+    """
+    min_skip_percent = min_skip_percent if min_skip_percent is not None else Config.VAD_MIN_SKIP_PERCENT
+
+    measured = frame_levels(audio_path)
+    if measured is None:
+        return None
+    levels, frame, total = measured
+    regions = [(start * frame, min(total, end * frame)) for start, end in find_speech(levels)]
+    if regions:
+        # The last frame also covers the partial frame find_speech never saw
+        last_start, last_end = regions[-1]
+        if last_end >= len(levels) * frame:
+            regions[-1] = (last_start, total)
+
+    kept = sum(end - start for start, end in regions)
+    if not kept or (total - kept) * 100 < min_skip_percent * total:
+        return None
+
+    spans = []
+    try:
+        with wave.open(audio_path, 'rb') as source, wave.open(output_path, 'wb') as target:
+            rate = source.getframerate()
+            target.setparams(source.getparams())
+            written = 0
+            for start, end in regions:
+                spans.append((written * 1000 // rate, start * 1000 // rate, (end - start) * 1000 // rate))
+                source.setpos(start)
+                remaining = end - start
+                while remaining > 0:
+                    frames = source.readframes(min(remaining, rate * 60))
+                    if not frames:
+                        break
+                    target.writeframes(frames)
+                    remaining -= len(frames) // 2
+                written += end - start
+    except BaseException:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+    stats = {
+        'original_seconds': total / rate,
+        'kept_seconds': kept / rate,
+        'skipped_seconds': (total - kept) / rate,
+        'skipped_percent': (total - kept) * 100 / total,
+    }
+    return OffsetMap(spans), stats
@@ -0,0 +1,196 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from config import Config
+from processors.chunker import chunk_transcript
+from processors.llm_client import LLMUnavailable
+from processors.subprocess_utils import ProcessCancelled, AnyEvent
+
+
+class StreamingNotes:
+    """
+    Map-reduce note generation that starts while the audio is still being transcribed
+
+    Transcriber.transcribe passes each finalized whisper segment to add().
+    Once the transcript so far is longer than NOTES_MAP_REDUCE_TOKENS (so it
+    would be split into chunks anyway), every chunk the chunker can no
+    longer change is sent to the model straight away, at most
+    NOTES_MAP_CONCURRENCY at a time. finish() chunks the rest, waits for the
+    chunk notes and merges them, so only the last chunks and the merge are
+    left once transcription ends. Shorter transcripts never start: finish()
+    returns None and the notes are generated in one prompt as before.
+
+    Only the last chunk changes as segments are appended (the chunker looks
+    one segment ahead), so chunks sent early are the ones chunking the whole
+    transcript would give.
+    """
+
+    def __init__(self, generator, metadata=None, cancel_event=None, partial=None, slot=None, max_in_flight=None,
+                 use_cache=True):
+        """
+        Args:
+            generator: NoteGenerator that writes the notes
+            metadata: Optional video metadata (title, channel, chapters, ...)
+            cancel_event: Optional threading.Event that stops all requests
+            partial: Optional PartialNotesRecorder shown the part notes as they finish
+            slot: Optional callable returning a context manager that is held
+                from the first request until finish() (a 'generate' stage slot)
+            max_in_flight: Concurrent requests (default NOTES_MAP_CONCURRENCY)
+            use_cache: False to force fresh responses (see NoteGenerator.generate_notes)
+        """
+        self.generator = generator
+        self.metadata = metadata or {}
+        self.partial = partial
+        self.slot = slot
+        self.max_in_flight = max_in_flight or Config.NOTES_MAP_CONCURRENCY
+        self.use_cache = use_cache
+
+        self.cancel_event = cancel_event
+        # Set when a request fails or the job ends early, so the others stop
+        self.abort_event = threading.Event()
+        self.stop_event = AnyEvent(self.abort_event, cancel_event)
+
+        self.incoming = queue.Queue()  # Lists of segment entries; None once transcription is over
+        self.segments = []
+        self.chars = 0
+        self.chunked_at = 0  # self.chars when chunks were last cut
+        self.futures = []  # Chunk notes requests, in transcript order
+        self.finished = {}  # {index: notes} of finished chunks, for the partial notes
+        self.finished_lock = threading.Lock()
+        self.pool = None
+        self.held = ExitStack()  # The stage slot, once taken
+        self.error = None
+        self.started_at = None
+        self.early_parts = 0  # Chunks sent before transcription ended
+
+        # Chunking and waiting for a slot happen here, never on whisper's output threads
+        self.thread = threading.Thread(target=self._run, name='streaming-notes', daemon=True)
+        self.thread.start()
+
+    @property
+    def started(self):
+        return self.pool is not None
+
+    def add(self, entries):
+        """Queue finalized transcript segments (returns immediately)"""
+        self.incoming.put(list(entries))
+
+    def finish(self):
+        """
+        Send the remaining chunks, wait for all chunk notes and merge them
+
+        Call once transcription is complete.
+
+        Returns:
+            str: the notes, or None if the transcript never got long enough
+            to start (generate them with NoteGenerator.generate_notes)
+
+        Raises:
+            LLMUnavailable if the model can't be reached; this stage is
+            closed, so generate the notes with generate_notes once it is back
+        """
+        self.incoming.put(None)
+        self.thread.join()
+        try:
+            if self.error is not None:
+                raise self.error
+            if not self.started:
+                return None
+
+            self._send(final=True)
+            total = len(self.futures)
+            print(f"Waiting for notes on {total} chunks ({self.early_parts} sent during transcription)...")
+            wait(self.futures)
+
+            errors = [future.exception() for future in self.futures if future.exception()]
+            if errors:
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    raise ProcessCancelled()
+                # Requests stopped because a sibling failed aren't the interesting error
+                error = next((e for e in errors if not isinstance(e, ProcessCancelled)), errors[0])
+                if isinstance(error, LLMUnavailable):
+                    raise error  # The caller can wait for the model and start over
+                raise Exception(f"Failed to generate notes: {str(error)}")
+            part_notes = [future.result() for future in self.futures]
+
+            notes = self.generator.merge_part_notes(part_notes, self.metadata, self.stop_event, self.max_in_flight,
+                                                    self.use_cache, self.partial)
+            print(f"\n✓ Notes generated from {total} chunks, "
+                  f"{time.monotonic() - self.started_at:.0f}s after the first was sent")
+            return notes
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop any requests still running and give the stage slot back (safe to call repeatedly)"""
+        self.abort_event.set()
+        if self.thread.is_alive():
+            self.incoming.put(None)
+            self.thread.join()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        self.held.close()
+
+    def _run(self):
+        """Collect segments and send chunks as soon as they are final"""
+        try:
+            while True:
+                entries = self.incoming.get()
+                if entries is None or self.stop_event.is_set():
+                    return
+                for entry in entries:
+                    text = (entry.get('text') or '').strip()
+                    if text:
+                        self.segments.append(entry)
+                        self.chars += len(text) + 1
+
+                # Re-chunk every half chunk of new text; only the last chunk is still open
+                tokens = self.chars / Config.LLM_CHARS_PER_TOKEN
+                new_tokens = (self.chars - self.chunked_at) / Config.LLM_CHARS_PER_TOKEN
+                if tokens > Config.NOTES_MAP_REDUCE_TOKENS and new_tokens >= Config.NOTES_CHUNK_TOKENS / 2:
+                    self._send(final=False)
+                    self.early_parts = len(self.futures)
+        except Exception as e:
+            self.error = e
+            self.abort_event.set()
+
+    def _send(self, final):
+        """Send the chunks that are final (all of them once transcription is over)"""
+        self.chunked_at = self.chars
+        text = ' '.join(entry['text'].strip() for entry in self.segments)
+        chunks = chunk_transcript(text, self.segments, self.metadata.get('chapters'))
+        ready = chunks if final else chunks[:-1]
+        if len(ready) <= len(self.futures):
+            return
+
+        if self.pool is None:
+            if self.slot is not None:
+                self.held.enter_context(self.slot())
+            self.pool = ThreadPoolExecutor(max_workers=self.max_in_flight)
+            self.started_at = time.monotonic()
+            if not final:
+                print(f"Transcript passed {Config.NOTES_MAP_REDUCE_TOKENS} tokens: "
+                      f"generating chunk notes while transcription continues")
+
+        for chunk in ready[len(self.futures):]:
+            self.futures.append(self.pool.submit(self._generate, len(self.futures), chunk))
+
+    def _generate(self, index, chunk):
+        """Notes for one chunk"""
+        if self.stop_event.is_set():
+            raise ProcessCancelled()
+        try:
+            notes = self.generator.generate_part_notes(chunk, self.metadata, index + 1, self.stop_event,
+                                                       self.use_cache)
+        except Exception:
+            self.abort_event.set()
+            raise
+        print(f"✓ Part {index + 1} done ({len(notes)} characters)")
+
+        if self.partial is not None:
+            with self.finished_lock:
+                self.finished[index] = notes
+                self.partial.update('\n\n'.join(self.finished[i] for i in sorted(self.finished)))
+        return notes
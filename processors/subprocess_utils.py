@@ -0,0 +1,256 @@
+import os
+import queue
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+
+
+class ProcessCancelled(Exception):
+    """Raised when a running command is stopped because processing was cancelled"""
+
+    def __init__(self, message="Processing cancelled by user"):
+        super().__init__(message)
+
+
+class AnyEvent:
+    """Read-only view that is set when any of several events is set"""
+
+    def __init__(self, *events):
+        self.events = [event for event in events if event is not None]
+
+    def is_set(self):
+        return any(event.is_set() for event in self.events)
+
+
+def run_command(cmd, cancel_event=None, timeout=None, check=True, poll_interval=0.2):
+    """
+    Run a command and capture its output, stopping it early on cancellation
+
+    Behaves like subprocess.run(cmd, capture_output=True, text=True), but the
+    command runs in its own process group so that it (and anything it spawned,
+    e.g. the ffmpeg started by yt-dlp) can be killed as soon as cancel_event
+    is set.
+
+    Args:
+        cmd: Command and arguments
+        cancel_event: Optional threading.Event checked every poll_interval seconds
+        timeout: Optional timeout in seconds
+        check: Raise CalledProcessError on a non-zero exit code
+        poll_interval: Seconds between cancellation checks
+
+    Returns:
+        subprocess.CompletedProcess
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True  # New process group for the command and its children
+    )
+    deadline = time.monotonic() + timeout if timeout else None
+
+    while True:
+        try:
+            stdout, stderr = proc.communicate(timeout=poll_interval)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel_event is not None and cancel_event.is_set():
+                terminate_process_group(proc)
+                proc.communicate()  # Close the pipes
+                raise ProcessCancelled()
+            if deadline and time.monotonic() > deadline:
+                terminate_process_group(proc)
+                proc.communicate()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+
+    if check and proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def stream_command(cmd, on_line, cancel_event=None, timeout=None, check=True,
+                   poll_interval=0.2, tail_lines=50, on_start=None):
+    """
+    Run a command, passing each output line to a callback as it is produced
+
+    Like run_command, but output is not buffered in memory: each line of
+    stdout and stderr is handed to on_line(stream, line) as soon as it is
+    printed, where stream is 'stdout' or 'stderr'. Only the last tail_lines
+    lines of stderr are kept, for error messages. on_start(proc), if given,
+    is called with the Popen object as soon as the command has started.
+
+    Returns:
+        subprocess.CompletedProcess (stdout is None, stderr is the kept tail)
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1,  # Line buffered
+        start_new_session=True  # New process group for the command and its children
+    )
+    if on_start is not None:
+        try:
+            on_start(proc)
+        except BaseException:
+            terminate_process_group(proc)
+            raise
+    deadline = time.monotonic() + timeout if timeout else None
+    lines = queue.Queue()
+    stderr_tail = deque(maxlen=tail_lines)
+
+    def read_pipe(pipe, stream):
+        for line in pipe:
+            lines.put((stream, line.rstrip('\n')))
+        pipe.close()
+        lines.put((stream, None))
+
+    readers = [
+        threading.Thread(target=read_pipe, args=(proc.stdout, 'stdout'), daemon=True),
+        threading.Thread(target=read_pipe, args=(proc.stderr, 'stderr'), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    open_streams = len(readers)
+    try:
+        while open_streams:
+            try:
+                stream, line = lines.get(timeout=poll_interval)
+            except queue.Empty:
+                stream, line = None, None
+            else:
+                if line is None:
+                    open_streams -= 1
+                else:
+                    if stream == 'stderr':
+                        stderr_tail.append(line)
+                    on_line(stream, line)
+
+            if cancel_event is not None and cancel_event.is_set():
+                terminate_process_group(proc)
+                raise ProcessCancelled()
+            if deadline and time.monotonic() > deadline:
+                terminate_process_group(proc)
+                raise subprocess.TimeoutExpired(cmd, timeout)
+    except BaseException:
+        # Callback errors must not leave the command running
+        if proc.poll() is None:
+            terminate_process_group(proc)
+        raise
+
+    proc.wait()
+    stderr = '\n'.join(stderr_tail)
+    if check and proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, None, stderr)
+
+    return subprocess.CompletedProcess(cmd, proc.returncode, None, stderr)
+
+
+def run_pipeline(cmds, cancel_event=None, timeout=None, check=True, poll_interval=0.2, tail_chars=4000):
+    """
+    Run commands connected like a shell pipeline (cmds[0] | cmds[1] | ...)
+
+    Data flows between the commands through OS pipes and never passes through
+    Python. Each command runs in its own process group, and all of them are
+    killed when cancel_event is set or the timeout expires. stderr is spooled
+    to temporary files so a chatty command can't block on a full pipe.
+
+    Returns:
+        list of subprocess.CompletedProcess, one per command (stdout is the last
+        command's output, stderr the last tail_chars characters)
+
+    Raises:
+        CalledProcessError for the most upstream command that failed (other
+        than by SIGPIPE), carrying the stderr of every failed command, since
+        one failure usually breaks the commands on either side of it
+    """
+    stderr_files = [tempfile.TemporaryFile() for _ in cmds]
+    stdout_file = tempfile.TemporaryFile()
+    procs = []
+
+    try:
+        stdin = None
+        for i, cmd in enumerate(cmds):
+            last = i == len(cmds) - 1
+            proc = subprocess.Popen(
+                cmd,
+                stdin=stdin,
+                stdout=stdout_file if last else subprocess.PIPE,
+                stderr=stderr_files[i],
+                start_new_session=True  # New process group for the command and its children
+            )
+            if stdin is not None:
+                stdin.close()  # Only the two commands hold the pipe, so EOF/SIGPIPE propagate
+            stdin = proc.stdout
+            procs.append(proc)
+
+        deadline = time.monotonic() + timeout if timeout else None
+        while any(proc.poll() is None for proc in procs):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ProcessCancelled()
+            if deadline and time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(cmds, timeout)
+            waiting = next(proc for proc in reversed(procs) if proc.poll() is None)
+            try:
+                waiting.wait(timeout=poll_interval)
+            except subprocess.TimeoutExpired:
+                pass
+
+    except BaseException:
+        for proc in procs:
+            if proc.poll() is None:
+                terminate_process_group(proc)
+        for f in stderr_files + [stdout_file]:
+            f.close()
+        raise
+
+    def read_tail(f):
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - tail_chars))
+        data = f.read().decode('utf-8', errors='replace')
+        f.close()
+        return data
+
+    stdout_file.seek(0)
+    stdout = stdout_file.read().decode('utf-8', errors='replace')
+    stdout_file.close()
+    results = [
+        subprocess.CompletedProcess(cmd, proc.returncode, stdout if i == len(cmds) - 1 else None,
+                                    read_tail(stderr_files[i]))
+        for i, (cmd, proc) in enumerate(zip(cmds, procs))
+    ]
+
+    failed = [result for result in results if result.returncode != 0]
+    if check and failed:
+        # A producer killed by SIGPIPE only failed because its consumer did
+        broken_pipe = (-signal.SIGPIPE, 128 + signal.SIGPIPE)
+        culprit = next((result for result in failed if result.returncode not in broken_pipe), failed[0])
+        stderr = '\n'.join(f"[{os.path.basename(result.args[0])}] {result.stderr.strip()}"
+                           for result in failed if result.stderr.strip())
+        raise subprocess.CalledProcessError(culprit.returncode, culprit.args, None, stderr)
+
+    return results
+
+
+def terminate_process_group(proc, grace_period=0.5):
+    """Send SIGTERM to a command's process group, then SIGKILL if it doesn't exit"""
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+    try:
+        proc.wait(timeout=grace_period)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
@@ -1,7 +1,61 @@
 import os
+import re
+import shutil
 import subprocess
 import json
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import metrics
 from config import Config
+from processors.chunker import chunk_text
+from processors.cpu_budget import CpuBudget
+from processors.silence_trimmer import trim_silence
+from processors.subprocess_utils import stream_command, ProcessCancelled, AnyEvent
+from processors.whisper_client import WhisperServerClient, WhisperServerUnavailable, server_urls
+
+# whisper.cpp only accepts 16 kHz audio
+WHISPER_SAMPLE_RATE = 16000
+
+# --print-progress output, e.g. "whisper_print_progress_callback: progress =  42%"
+PROGRESS_RE = re.compile(r'progress\s*=\s*(\d+)%')
+# Segment lines, e.g. "[00:01:02.340 --> 00:01:05.120]  text"
+SEGMENT_RE = re.compile(r'^\[(\d+):(\d+):(\d+)\.(\d+) --> (\d+):(\d+):(\d+)\.(\d+)\]')
+
+
+class OrderedSegments:
+    """
+    Passes on segment entries from parts transcribed in parallel in timeline order
+
+    Entries of the earliest unfinished part go straight through; entries of
+    later parts are held until every part before them has finished.
+    """
+
+    def __init__(self, parts, on_segments):
+        self.on_segments = on_segments
+        self.held = [[] for _ in range(parts)]
+        self.finished = [False] * parts
+        self.current = 0  # Earliest part not yet finished
+        self.lock = threading.Lock()
+
+    def add(self, index, entries):
+        with self.lock:
+            if index == self.current:
+                self.on_segments(entries)
+            else:
+                self.held[index].extend(entries)
+
+    def finish(self, index):
+        with self.lock:
+            self.finished[index] = True
+            while self.current < len(self.finished) and self.finished[self.current]:
+                self.current += 1
+                if self.current < len(self.held) and self.held[self.current]:
+                    self.on_segments(self.held[self.current])
+                    self.held[self.current] = []
 
 
 class Transcriber:
@@ -10,6 +64,11 @@ class Transcriber:
     def __init__(self):
         self.whisper_path = Config.WHISPER_PATH
         self.model_path = Config.WHISPER_MODEL_PATH
+        # Resident models from whisper_server.py, used instead of whisper-cli while reachable
+        urls = server_urls()
+        self.server = WhisperServerClient(urls) if urls else None
+        # Shared by every whisper-cli run from this process, including parallel segments
+        self.cpu_budget = CpuBudget()
 
     def check_whisper_installed(self):
         """Check if whisper.cpp is installed and model exists"""
@@ -32,17 +91,37 @@ class Transcriber:
 
         return True
 
-    def transcribe(self, audio_path, language='en', output_format='txt'):
+    def transcribe(self, audio_path, language='en', output_format='txt', cancel_event=None,
+                   progress_callback=None, on_segments=None, on_stage=None):
         """
         Transcribe audio file using whisper.cpp
 
+        Long silences are cut out first when VAD_TRIM_SILENCE is on, and the
+        timestamps mapped back onto the original audio. Long audio is split
+        at silences and transcribed in parallel when WHISPER_SEGMENT_WORKERS
+        > 1 (see transcribe_segmented).
+
         Args:
             audio_path: Path to audio file (WAV format)
             language: Language code (e.g., 'en', 'es')
             output_format: Output format ('txt', 'json', 'srt')
+            cancel_event: Optional threading.Event; when set, whisper-cli is
+                killed, partial outputs are removed and ProcessCancelled is raised
+            progress_callback: Optional callable(percent, rtf) fed from
+                whisper-cli's live output; rtf is the real-time factor
+                (processing seconds per audio second, lower is faster)
+            on_segments: Optional callable(entries) receiving whisper JSON
+                segment entries (original timeline) as they are finalized,
+                in timeline order, so later stages can start before the
+                whole file is done. Called from whisper's output threads;
+                it should return quickly.
+            on_stage: Optional callable receiving the whisper stage event
+                (see metrics.stage) when transcription ends
 
         Returns:
-            dict with transcript_text and timestamps (if available)
+            dict with transcript_text and timestamps (if available), plus
+            silence_trim (skipped_seconds, skipped_percent, time_saved_seconds,
+            ...) when silence was cut
         """
         # Verify whisper is installed
         self.check_whisper_installed()
@@ -50,14 +129,104 @@ class Transcriber:
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
+        # The whole transcription stage, silence trimming and parallel segments included
+        with metrics.stage('whisper', on_stage) as event:
+            event['bytes'] = os.path.getsize(audio_path)
+            try:
+                event['audio_seconds'] = self.get_wav_duration(audio_path)
+            except (wave.Error, EOFError):
+                pass  # Not a WAV header Python can read; whisper reports the real problem
+            trimmed = None
+            if Config.VAD_TRIM_SILENCE:
+                trimmed_path = f"{os.path.splitext(audio_path)[0]}_speech.wav"
+                trimmed = trim_silence(audio_path, trimmed_path)
+            if not trimmed:
+                return self._transcribe_file(audio_path, language, cancel_event, progress_callback, on_segments)
+
+            offset_map, stats = trimmed
+            if on_segments is not None:
+                emit = on_segments
+                on_segments = lambda entries: emit([self._restore_timestamp(entry, offset_map) for entry in entries])
+            print(f"Trimmed {stats['skipped_seconds']:.0f}s of silence "
+                  f"({stats['skipped_percent']:.1f}% of {stats['original_seconds']:.0f}s)")
+            event['detail'] = f"{stats['skipped_percent']:.0f}% silence skipped"
+            started = time.monotonic()
+            try:
+                result = self._transcribe_file(trimmed_path, language, cancel_event, progress_callback, on_segments)
+            finally:
+                if os.path.exists(trimmed_path):
+                    os.remove(trimmed_path)
+
+            # Whisper's time per audio second on this job, applied to the audio it didn't have to hear
+            elapsed = time.monotonic() - started
+            stats['time_saved_seconds'] = elapsed / stats['kept_seconds'] * stats['skipped_seconds']
+            result['silence_trim'] = stats
+            if result.get('timestamps'):
+                result['timestamps'] = [self._restore_timestamp(entry, offset_map) for entry in result['timestamps']]
+            return result
+
+    def _transcribe_file(self, audio_path, language, cancel_event, progress_callback, on_segments=None):
+        """Transcribe a WAV file whole, or in parallel segments when it is long enough"""
+        workers = Config.WHISPER_SEGMENT_WORKERS
+        if workers > 1 and self.get_wav_duration(audio_path) >= 2 * Config.WHISPER_SEGMENT_MIN_SECONDS:
+            return self.transcribe_segmented(audio_path, language, workers, cancel_event=cancel_event,
+                                             progress_callback=progress_callback, on_segments=on_segments)
+
+        print(f"Transcribing: {audio_path}")
+        print(f"Using model: {self.model_path}")
+
+        transcript_text, timestamps = self._run_whisper(audio_path, language, cancel_event=cancel_event,
+                                                        progress_callback=progress_callback,
+                                                        on_segments=on_segments)
+
+        return {
+            'transcript_text': transcript_text,
+            'timestamps': timestamps,
+            'language': language,
+        }
+
+    def _run_whisper(self, audio_path, language='en', cancel_event=None, progress_callback=None,
+                     on_segments=None):
+        """
+        Run whisper-cli on one WAV file, or send it to a resident model when
+        whisper_server.py is running (WHISPER_SERVER_INSTANCES > 0). The
+        server only answers when the whole file is done, so progress and
+        segments then arrive at the end and its threads are fixed rather
+        than taken from the CPU budget.
+
+        whisper-cli's thread count (and with WHISPER_PIN_CPUS, its cores) comes
+        from the CPU budget, based on how many other runs are active.
+
+        whisper-cli's output is streamed line by line rather than buffered;
+        progress_callback(percent, rtf) is called whenever it advances, and
+        on_segments(entries) with each segment whisper-cli prints.
+
+        Returns:
+            tuple of (transcript_text, timestamps) where timestamps is whisper's
+            JSON segment list (offsets in milliseconds) or None
+        """
+        if self.server is not None and self.server.available():
+            try:
+                started = time.monotonic()
+                transcript_text, timestamps = self.server.transcribe(audio_path, language,
+                                                                     cancel_event=cancel_event)
+                duration = self.get_wav_duration(audio_path)
+                rtf = (time.monotonic() - started) / duration if duration else 0.0
+                metrics.WHISPER_RTF.observe(rtf, engine='server')
+                if progress_callback:
+                    progress_callback(100.0, rtf)
+                if on_segments and timestamps:
+                    on_segments(timestamps)
+                return transcript_text, timestamps
+            except WhisperServerUnavailable as e:
+                print(f"Whisper server unavailable ({e}), falling back to whisper-cli")
+
         # Prepare output path
         base_name = os.path.splitext(audio_path)[0]
         output_file = f"{base_name}.txt"
         json_file = f"{base_name}.json"
 
-        print(f"Transcribing: {audio_path}")
-        print(f"Using model: {self.model_path}")
-
+        lease = self.cpu_budget.acquire()
         try:
             # Run whisper.cpp
             # Note: Adjust command based on actual whisper.cpp build
@@ -67,23 +236,31 @@ class Transcriber:
                 '-f', audio_path,
                 '-l', language,
                 '-otxt',  # Output as text
+                '-oj',  # Output as JSON (for timestamps)
                 '-of', base_name,  # Output file base name
-                '--threads', '4',  # Number of threads (matches CPU cores)
-                '--processors', '1',  # Single processor for sequential processing
+                '--threads', str(lease.threads),  # This run's share of the cores
+                '--processors', '1',  # Parallel runs are separate processes (see transcribe_segmented)
                 '--print-progress',
             ]
 
             print(f"Running: {' '.join(cmd)}")
 
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            handlers = []
+            if progress_callback:
+                handlers.append(self._progress_parser(audio_path, progress_callback))
+            if on_segments:
+                handlers.append(self._segment_parser(on_segments))
+
+            def on_line(stream, line):
+                for handler in handlers:
+                    handler(stream, line)
+            started = time.monotonic()
+            stream_command(cmd, on_line, cancel_event=cancel_event, on_start=self.cpu_budget.on_start(lease))
+            duration = self.get_wav_duration(audio_path)
+            if duration:
+                metrics.WHISPER_RTF.observe((time.monotonic() - started) / duration, engine='cli')
 
             print("Transcription completed!")
-            print(f"Output: {result.stdout}")
 
             # Read the transcript
             if os.path.exists(output_file):
@@ -108,12 +285,14 @@ class Transcriber:
             if os.path.exists(json_file):
                 os.remove(json_file)
 
-            return {
-                'transcript_text': transcript_text,
-                'timestamps': timestamps,
-                'language': language,
-            }
+            return transcript_text, timestamps
 
+        except ProcessCancelled:
+            print("✗ Transcription cancelled, removing partial output")
+            for path in (output_file, json_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
         except subprocess.CalledProcessError as e:
             raise Exception(
                 f"Transcription failed:\n"
@@ -122,6 +301,262 @@ class Transcriber:
             )
         except Exception as e:
             raise Exception(f"Transcription error: {str(e)}")
+        finally:
+            self.cpu_budget.release(lease)
+
+    def _progress_parser(self, audio_path, progress_callback):
+        """
+        Build an output-line handler that turns whisper-cli output into
+        progress_callback(percent, rtf) calls
+
+        Uses the --print-progress percentages, and the end time of each
+        printed segment relative to the audio length, whichever is further.
+        """
+        duration = self.get_wav_duration(audio_path)
+        started = time.monotonic()
+        state = {'percent': 0.0}
+
+        def on_line(stream, line):
+            match = PROGRESS_RE.search(line)
+            if match:
+                percent = float(match.group(1))
+            else:
+                match = SEGMENT_RE.match(line)
+                if not match or not duration:
+                    return
+                hours, minutes, seconds, ms = (int(value) for value in match.groups()[4:])
+                end_seconds = hours * 3600 + minutes * 60 + seconds + ms / 1000
+                percent = min(100.0, end_seconds / duration * 100)
+
+            if percent <= state['percent']:
+                return
+            state['percent'] = percent
+
+            audio_done = duration * percent / 100
+            rtf = (time.monotonic() - started) / audio_done if audio_done else 0.0
+            progress_callback(percent, rtf)
+
+        return on_line
+
+    def _segment_parser(self, on_segments):
+        """
+        Build an output-line handler that passes each segment line whisper-cli
+        prints ("[00:01:02.340 --> 00:01:05.120]  text") to on_segments as a
+        JSON-style entry; whisper never revises a segment once printed
+        """
+        def on_line(stream, line):
+            match = SEGMENT_RE.match(line)
+            if not match:
+                return
+            values = [int(value) for value in match.groups()]
+            start_ms, end_ms = (((hours * 60 + minutes) * 60 + seconds) * 1000 + ms
+                                for hours, minutes, seconds, ms in (values[:4], values[4:]))
+            on_segments([{
+                'timestamps': {'from': self._format_timestamp(start_ms), 'to': self._format_timestamp(end_ms)},
+                'offsets': {'from': start_ms, 'to': end_ms},
+                'text': ' ' + line[match.end():].strip(),
+            }])
+
+        return on_line
+
+    def transcribe_segmented(self, audio_path, language='en', workers=2, cancel_event=None,
+                             progress_callback=None, on_segments=None):
+        """
+        Transcribe long audio by splitting it at silences and running
+        whisper-cli on the segments in parallel
+
+        Each segment runs in its own whisper-cli process, sized by the CPU
+        budget when it starts, so segments pick up cores as other runs finish. Text is merged in order and segment
+        timestamps are shifted back onto the original timeline.
+
+        Args:
+            audio_path: Path to 16 kHz mono WAV file
+            language: Language code
+            workers: Number of whisper-cli processes to run at once
+            cancel_event: Optional threading.Event to abort all segments
+            progress_callback: Optional callable(percent, rtf) for the whole file
+            on_segments: Optional callable(entries) for finalized segments
+                (see transcribe); a segment's entries are held back until
+                every earlier segment has been passed on
+
+        Returns:
+            dict with transcript_text and timestamps
+        """
+        duration = self.get_wav_duration(audio_path)
+        # More segments than workers so uneven segments still balance out
+        segment_seconds = max(Config.WHISPER_SEGMENT_MIN_SECONDS, duration / (workers * 2))
+        split_points = self.find_split_points(audio_path, segment_seconds)
+
+        print(f"Transcribing in {len(split_points) - 1} segments ({workers} parallel): {audio_path}")
+        print(f"Using model: {self.model_path}")
+
+        segment_dir = tempfile.mkdtemp(prefix='segments_', dir=os.path.dirname(audio_path))
+        # Set when any segment fails, so the others stop instead of running to the end
+        abort_event = threading.Event()
+        stop_event = AnyEvent(abort_event, cancel_event)
+
+        # Overall progress is the length-weighted progress of all segments
+        segment_progress = [0.0] * (len(split_points) - 1)
+        progress_lock = threading.Lock()
+        started = time.monotonic()
+        ordered = OrderedSegments(len(split_points) - 1, on_segments) if on_segments else None
+
+        def segment_callback(index):
+            def report(percent, rtf):
+                with progress_lock:
+                    segment_progress[index] = percent
+                    done_frames = sum(
+                        p / 100 * (split_points[i + 1] - split_points[i]) for i, p in enumerate(segment_progress)
+                    )
+                    overall = done_frames / split_points[-1] * 100
+                    audio_done = done_frames / WHISPER_SAMPLE_RATE
+                    overall_rtf = (time.monotonic() - started) / audio_done if audio_done else 0.0
+                    progress_callback(overall, overall_rtf)
+            return report if progress_callback else None
+
+        def run_segment(index):
+            if stop_event.is_set():
+                raise ProcessCancelled()
+            start, end = split_points[index], split_points[index + 1]
+            segment_path = os.path.join(segment_dir, f"segment_{index:04d}.wav")
+            self._write_wav_segment(audio_path, segment_path, start, end)
+            emit = None
+            if ordered is not None:
+                offset_ms = int(start * 1000 / WHISPER_SAMPLE_RATE)
+                emit = lambda entries: ordered.add(index, [self._shift_timestamp(entry, offset_ms)
+                                                           for entry in entries])
+            try:
+                result = self._run_whisper(segment_path, language, cancel_event=stop_event,
+                                           progress_callback=segment_callback(index), on_segments=emit)
+                if ordered is not None:
+                    ordered.finish(index)
+                return result
+            except Exception:
+                abort_event.set()
+                raise
+            finally:
+                if os.path.exists(segment_path):
+                    os.remove(segment_path)
+
+        try:
+            # Leaving the pool waits for every segment
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run_segment, index) for index in range(len(split_points) - 1)]
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ProcessCancelled()
+            # Segments stopped because a sibling failed aren't the interesting error
+            raise next((e for e in errors if not isinstance(e, ProcessCancelled)), errors[0])
+        results = [future.result() for future in futures]
+
+        texts = []
+        timestamps = []
+        for (text, segment_timestamps), start_frame in zip(results, split_points):
+            if text:
+                texts.append(text)
+            offset_ms = int(start_frame * 1000 / WHISPER_SAMPLE_RATE)
+            for entry in segment_timestamps or []:
+                timestamps.append(self._shift_timestamp(entry, offset_ms))
+
+        return {
+            'transcript_text': '\n'.join(texts),
+            'timestamps': timestamps or None,
+            'language': language,
+        }
+
+    def get_wav_duration(self, audio_path):
+        """Duration of a WAV file in seconds"""
+        with wave.open(audio_path, 'rb') as wav:
+            return wav.getnframes() / wav.getframerate()
+
+    def find_split_points(self, audio_path, segment_seconds, search_seconds=30, window_ms=100):
+        """
+        Choose segment boundaries at the quietest point near every segment_seconds
+
+        Only a search_seconds window around each target cut is read, so this
+        stays cheap for multi-hour files.
+
+        Returns:
+            list of frame indexes, starting with 0 and ending with the frame count
+        """
+        with wave.open(audio_path, 'rb') as wav:
+            rate = wav.getframerate()
+            total_frames = wav.getnframes()
+            window = max(1, rate * window_ms // 1000)
+            split_points = [0]
+
+            target = segment_seconds * rate
+            while target < total_frames - segment_seconds * rate / 2:
+                search_start = int(max(split_points[-1] + window, target - search_seconds * rate / 2))
+                search_end = int(min(total_frames, target + search_seconds * rate / 2))
+
+                wav.setpos(search_start)
+                samples = np.frombuffer(wav.readframes(search_end - search_start), dtype='<i2')
+                windows = len(samples) // window
+                if windows == 0:
+                    break
+
+                # Mean energy per window; cut in the middle of the quietest one
+                energy = np.square(samples[:windows * window].astype(np.float32)).reshape(windows, window).mean(axis=1)
+                quietest = int(np.argmin(energy))
+                cut = search_start + quietest * window + window // 2
+                split_points.append(cut)
+                target = cut + segment_seconds * rate
+
+        split_points.append(total_frames)
+        return split_points
+
+    def _write_wav_segment(self, audio_path, segment_path, start_frame, end_frame):
+        """Copy frames [start_frame, end_frame) of a WAV file into a new WAV file"""
+        with wave.open(audio_path, 'rb') as source, wave.open(segment_path, 'wb') as target:
+            target.setparams(source.getparams())
+            source.setpos(start_frame)
+            remaining = end_frame - start_frame
+            while remaining > 0:
+                frames = source.readframes(min(remaining, WHISPER_SAMPLE_RATE * 60))
+                if not frames:
+                    break
+                target.writeframes(frames)
+                remaining -= len(frames) // (source.getsampwidth() * source.getnchannels())
+
+    def _restore_timestamp(self, entry, offset_map):
+        """Move a whisper JSON segment entry from trimmed audio onto the original timeline"""
+        entry = dict(entry)
+        offsets = entry.get('offsets')
+        if offsets:
+            start_ms = offset_map.to_original(offsets.get('from', 0))
+            end_ms = max(start_ms, offset_map.to_original(offsets.get('to', 0), end=True))
+            entry['offsets'] = {'from': start_ms, 'to': end_ms}
+            entry['timestamps'] = {
+                'from': self._format_timestamp(start_ms),
+                'to': self._format_timestamp(end_ms),
+            }
+        return entry
+
+    def _shift_timestamp(self, entry, offset_ms):
+        """Move a whisper JSON segment entry by offset_ms on the timeline"""
+        entry = dict(entry)
+        offsets = entry.get('offsets')
+        if offsets:
+            start_ms = offsets.get('from', 0) + offset_ms
+            end_ms = offsets.get('to', 0) + offset_ms
+            entry['offsets'] = {'from': start_ms, 'to': end_ms}
+            entry['timestamps'] = {
+                'from': self._format_timestamp(start_ms),
+                'to': self._format_timestamp(end_ms),
+            }
+        return entry
+
+    def _format_timestamp(self, ms):
+        """Format milliseconds the way whisper.cpp does (HH:MM:SS,mmm)"""
+        seconds, ms = divmod(int(ms), 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
 
     def chunk_transcript(self, transcript_text, chunk_size=5000):
         """
@@ -134,28 +569,4 @@ class Transcriber:
         Returns:
             list of text chunks
         """
-        if len(transcript_text) <= chunk_size:
-            return [transcript_text]
-
-        chunks = []
-        sentences = transcript_text.split('. ')
-        current_chunk = []
-        current_length = 0
-
-        for sentence in sentences:
-            sentence_length = len(sentence) + 2  # +2 for '. '
-
-            if current_length + sentence_length > chunk_size and current_chunk:
-                # Save current chunk
-                chunks.append('. '.join(current_chunk) + '.')
-                current_chunk = [sentence]
-                current_length = sentence_length
-            else:
-                current_chunk.append(sentence)
-                current_length += sentence_length
-
-        # Add last chunk
-        if current_chunk:
-            chunks.append('. '.join(current_chunk) + '.')
-
-        return chunks
+        return chunk_text(transcript_text, chunk_size)
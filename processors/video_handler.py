@@ -1,7 +1,16 @@
 import os
+import re
+import glob
 import subprocess
 import json
+import wave
+import metrics
 from config import Config
+from processors.subprocess_utils import run_command, run_pipeline, ProcessCancelled
+
+
+# yt-dlp output template for the metadata written alongside the download (--print-to-file)
+METADATA_TEMPLATE = '%(.{id,title,uploader,duration,description,chapters})j'
 
 
 class VideoHandler:
@@ -16,43 +25,142 @@ class VideoHandler:
         """Check if source is a YouTube URL"""
         return 'youtube.com' in source or 'youtu.be' in source
 
-    def download_youtube_audio(self, url):
-        """
-        Download video from YouTube, extract audio, delete video
-        Returns: dict with audio_path and metadata
+    @staticmethod
+    def extract_youtube_id(url):
+        """Extract the 11-character video ID from a YouTube URL, or None"""
+        video_id_match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', url)
+        return video_id_match.group(1) if video_id_match else None
+
+    def download_youtube_audio(self, url, cancel_event=None, cached_metadata=None, on_stage=None):
         """
-        # Use global yt-dlp binary
-        yt_dlp_bin = Config.YT_DLP_PATH
+        Download the audio of a YouTube video as 16 kHz mono WAV
+
+        Metadata is written by the download invocation itself; cached_metadata
+        (from an earlier run) is only used if that output is missing.
+        on_stage, if given, receives an event for the download and for the
+        ffmpeg run (see metrics.stage).
 
+        Returns: dict with audio_path and metadata ('metadata_fresh' is True
+        when the metadata came from this download)
+        """
         # Extract video ID from URL
-        import re
-        video_id_match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', url)
-        if video_id_match:
-            video_id = video_id_match.group(1)
-        else:
-            video_id = 'unknown'
+        video_id = self.extract_youtube_id(url) or 'unknown'
 
         print(f"Processing YouTube video: {video_id}")
 
-        # Download video file (this works reliably and gets metadata)
-        video_file = None
-        output_template = os.path.join(self.temp_dir, f"{video_id}.%(ext)s")
+        audio_path = os.path.join(self.temp_dir, f"{video_id}.wav")
+        info_path = os.path.join(self.temp_dir, f"{video_id}.info.json")
 
         try:
-            print("Downloading video...")
-            download_cmd = [
-                yt_dlp_bin,
-                '-o', output_template,
-                '--no-playlist',
-                '--cookies-from-browser', 'firefox',
-                url
-            ]
-
-            result = subprocess.run(
+            if Config.YT_DLP_STREAM_AUDIO:
+                self._stream_youtube_audio(url, audio_path, info_path, cancel_event, on_stage)
+            else:
+                self._download_youtube_video_audio(url, video_id, audio_path, info_path, cancel_event, on_stage)
+
+            if not os.path.exists(audio_path):
+                raise Exception(f"Audio extraction failed - file not created: {audio_path}")
+
+            print(f"✓ Audio extracted successfully: {audio_path}")
+
+            info = self._read_info_file(info_path)
+            metadata_fresh = bool(info)
+            if not info and cached_metadata:
+                print(f"Using cached metadata for {video_id}")
+                info = {
+                    'title': cached_metadata.get('title'),
+                    'uploader': cached_metadata.get('channel'),
+                    'duration': cached_metadata.get('duration'),
+                    'description': cached_metadata.get('description'),
+                    'chapters': cached_metadata.get('chapters'),
+                }
+
+            return {
+                'audio_path': audio_path,
+                'title': info.get('title') or f'YouTube Video {video_id}',
+                'channel': info.get('uploader') or 'Unknown',
+                'duration': info.get('duration') or 0,
+                'video_id': video_id,
+                'url': url,
+                'description': info.get('description') or '',
+                'chapters': info.get('chapters') or [],
+                'metadata_fresh': metadata_fresh,
+            }
+
+        except ProcessCancelled:
+            print(f"✗ Download cancelled, removing partial files for {video_id}")
+            self._cleanup_partial_files(video_id)
+            raise
+        except subprocess.CalledProcessError as e:
+            error_msg = f"Command failed: {e.stderr if e.stderr else str(e)}"
+            print(f"✗ Failed: {error_msg}")
+            self._cleanup_partial_files(video_id)
+            raise Exception(error_msg)
+        except Exception as e:
+            self._cleanup_partial_files(video_id)
+            raise Exception(f"Failed to download YouTube audio: {e}")
+
+    def _stream_youtube_audio(self, url, audio_path, info_path, cancel_event=None, on_stage=None):
+        """
+        Pipe the best audio-only format from yt-dlp straight into ffmpeg
+
+        Nothing but the final WAV touches the disk, and only the audio stream
+        is fetched (a fraction of the size of a video container).
+        """
+        print(f"Streaming audio ({Config.YT_DLP_AUDIO_FORMAT}) to: {audio_path}")
+
+        download_cmd = [
+            Config.YT_DLP_PATH,
+            '-f', Config.YT_DLP_AUDIO_FORMAT,
+            '-o', '-',  # Write the media to stdout
+            '--print-to-file', METADATA_TEMPLATE, info_path,
+            '--no-simulate',
+            '--no-playlist',
+            '--no-progress',
+            '--cookies-from-browser', 'firefox',
+            url
+        ]
+        ffmpeg_cmd = [
+            'ffmpeg',
+            '-hide_banner', '-loglevel', 'error',
+            '-i', 'pipe:0',
+            '-vn',  # No video
+            '-acodec', 'pcm_s16le',  # 16-bit PCM
+            '-ar', '16000',  # 16kHz sample rate (Whisper requirement)
+            '-ac', '1',  # Mono
+            '-y',  # Overwrite output file
+            audio_path
+        ]
+
+        # One stage for both: the conversion runs as the bytes arrive
+        with metrics.stage('download', on_stage) as event:
+            event['detail'] = 'streamed'
+            run_pipeline([download_cmd, ffmpeg_cmd], cancel_event=cancel_event, timeout=1800)  # 30 minutes timeout
+            event['bytes'], event['audio_seconds'] = self._wav_stats(audio_path)
+
+    def _download_youtube_video_audio(self, url, video_id, audio_path, info_path, cancel_event=None,
+                                      on_stage=None):
+        """
+        Download the full video with yt-dlp, extract its audio, then delete the video
+
+        Used when YT_DLP_STREAM_AUDIO is off (e.g. for formats that can't be piped).
+        """
+        output_template = os.path.join(self.temp_dir, f"{video_id}.%(ext)s")
+
+        print("Downloading video...")
+        download_cmd = [
+            Config.YT_DLP_PATH,
+            '-o', output_template,
+            '--print-to-file', METADATA_TEMPLATE, info_path,
+            '--no-simulate',
+            '--no-playlist',
+            '--cookies-from-browser', 'firefox',
+            url
+        ]
+
+        with metrics.stage('download', on_stage) as event:
+            run_command(
                 download_cmd,
-                capture_output=True,
-                text=True,
-                check=True,
+                cancel_event=cancel_event,
                 timeout=1800  # 30 minutes timeout
             )
 
@@ -67,85 +175,51 @@ class VideoHandler:
 
             if not video_file or not os.path.exists(video_file):
                 raise Exception(f"Video file not found after download")
+            event['bytes'] = os.path.getsize(video_file)
 
-            print(f"✓ Video downloaded: {video_file}")
-
-            # Extract audio using ffmpeg
-            audio_path = os.path.join(self.temp_dir, f"{video_id}.wav")
-            print(f"Extracting audio to: {audio_path}")
+        print(f"✓ Video downloaded: {video_file}")
 
-            ffmpeg_cmd = [
-                'ffmpeg',
-                '-i', video_file,
-                '-vn',  # No video
-                '-acodec', 'pcm_s16le',  # 16-bit PCM
-                '-ar', '16000',  # 16kHz sample rate (Whisper requirement)
-                '-ac', '1',  # Mono
-                '-y',  # Overwrite output file
-                audio_path
-            ]
-
-            subprocess.run(ffmpeg_cmd, capture_output=True, text=True, check=True, timeout=600)
-
-            if not os.path.exists(audio_path):
-                raise Exception(f"Audio extraction failed - file not created: {audio_path}")
+        # Extract audio using ffmpeg
+        print(f"Extracting audio to: {audio_path}")
+
+        ffmpeg_cmd = [
+            'ffmpeg',
+            '-i', video_file,
+            '-vn',  # No video
+            '-acodec', 'pcm_s16le',  # 16-bit PCM
+            '-ar', '16000',  # 16kHz sample rate (Whisper requirement)
+            '-ac', '1',  # Mono
+            '-y',  # Overwrite output file
+            audio_path
+        ]
 
+        try:
+            with metrics.stage('ffmpeg', on_stage) as event:
+                run_command(ffmpeg_cmd, cancel_event=cancel_event, timeout=600)
+                event['bytes'], event['audio_seconds'] = self._wav_stats(audio_path)
+        finally:
             # Delete the video file to save space
             print(f"Deleting video file: {video_file}")
             os.remove(video_file)
 
-            print(f"✓ Audio extracted successfully: {audio_path}")
-
-            # Try to get metadata after successful download
-            try:
-                info_cmd = [
-                    yt_dlp_bin,
-                    '--dump-json',
-                    '--no-playlist',
-                    '--cookies-from-browser', 'firefox',
-                    url
-                ]
-                result = subprocess.run(info_cmd, capture_output=True, text=True, timeout=30)
-                if result.returncode == 0:
-                    info = json.loads(result.stdout)
-                else:
-                    info = {}
-            except:
-                info = {}
-
-            return {
-                'audio_path': audio_path,
-                'title': info.get('title', f'YouTube Video {video_id}'),
-                'channel': info.get('uploader', 'Unknown'),
-                'duration': info.get('duration', 0),
-                'video_id': video_id,
-                'url': url,
-                'description': info.get('description', ''),
-                'chapters': info.get('chapters', []),
-            }
-
-        except subprocess.CalledProcessError as e:
-            error_msg = f"Command failed: {e.stderr if e.stderr else str(e)}"
-            print(f"✗ Failed: {error_msg}")
-            # Try to cleanup video file if it exists
-            if video_file and os.path.exists(video_file):
-                try:
-                    os.remove(video_file)
-                except:
-                    pass
-            raise Exception(error_msg)
-        except Exception as e:
-            # Try to cleanup video file if it exists
-            if video_file and os.path.exists(video_file):
-                try:
-                    os.remove(video_file)
-                except:
-                    pass
-            raise Exception(f"Failed to download YouTube audio: {e}")
-
-    def extract_local_audio(self, video_path, video_id=None):
+    def _read_info_file(self, info_path):
+        """Load (and remove) the metadata yt-dlp wrote during the download; {} if unusable"""
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                # --print-to-file appends, so a retried download leaves one line per attempt
+                lines = [line for line in f.read().splitlines() if line.strip()]
+            return json.loads(lines[-1]) if lines else {}
+        except (OSError, ValueError) as e:
+            print(f"Warning: No metadata from download ({e})")
+            return {}
+        finally:
+            if os.path.exists(info_path):
+                os.remove(info_path)
+
+    def extract_local_audio(self, video_path, video_id=None, cancel_event=None, on_stage=None):
         """
         Extract audio from local video file
+        on_stage, if given, receives an event for the ffmpeg run (see metrics.stage)
         Returns: dict with audio_path and metadata
         """
         if not os.path.exists(video_path):
@@ -162,15 +236,17 @@ class VideoHandler:
 
         # Extract audio using ffmpeg
         try:
-            subprocess.run([
-                'ffmpeg', '-i', video_path,
-                '-vn',  # No video
-                '-acodec', 'pcm_s16le',  # 16-bit PCM
-                '-ar', '16000',  # 16kHz sample rate
-                '-ac', '1',  # Mono
-                '-y',  # Overwrite output file
-                audio_path
-            ], check=True, capture_output=True, text=True)
+            with metrics.stage('ffmpeg', on_stage) as event:
+                run_command([
+                    'ffmpeg', '-i', video_path,
+                    '-vn',  # No video
+                    '-acodec', 'pcm_s16le',  # 16-bit PCM
+                    '-ar', '16000',  # 16kHz sample rate
+                    '-ac', '1',  # Mono
+                    '-y',  # Overwrite output file
+                    audio_path
+                ], cancel_event=cancel_event)
+                event['bytes'], event['audio_seconds'] = self._wav_stats(audio_path)
 
             # Get video duration
             duration = self._get_video_duration(video_path)
@@ -185,9 +261,21 @@ class VideoHandler:
                 'description': '',
                 'chapters': [],
             }
+        except ProcessCancelled:
+            self.cleanup_audio(audio_path)
+            raise
         except subprocess.CalledProcessError as e:
             raise Exception(f"Failed to extract audio: {e.stderr}")
 
+    def _wav_stats(self, audio_path):
+        """Size in bytes and duration in seconds of a WAV file, (None, None) if unreadable"""
+        try:
+            with wave.open(audio_path, 'rb') as wav:
+                seconds = wav.getnframes() / wav.getframerate()
+            return os.path.getsize(audio_path), seconds
+        except (OSError, wave.Error, EOFError):
+            return None, None
+
     def _get_video_duration(self, video_path):
         """Get video duration in seconds using ffprobe"""
         try:
@@ -202,20 +290,37 @@ class VideoHandler:
         except:
             return 0
 
-    def process_source(self, source, is_file=False, file_path=None):
+    def process_source(self, source, is_file=False, file_path=None, cancel_event=None, cached_metadata=None,
+                       on_stage=None):
         """
         Process video source (YouTube URL or local file)
+
+        If cancel_event is set while yt-dlp or ffmpeg is running, the command
+        is killed, partial outputs are removed and ProcessCancelled is raised.
+        cached_metadata is passed on to download_youtube_audio. on_stage, if
+        given, receives an event per yt-dlp/ffmpeg run (see metrics.stage).
+
         Returns: dict with audio_path and metadata
         """
         if is_file and file_path:
             print(f"Processing local file: {file_path}")
-            return self.extract_local_audio(file_path)
+            return self.extract_local_audio(file_path, cancel_event=cancel_event, on_stage=on_stage)
         elif self.is_youtube_url(source):
             print(f"Processing YouTube URL: {source}")
-            return self.download_youtube_audio(source)
+            return self.download_youtube_audio(source, cancel_event=cancel_event,
+                                               cached_metadata=cached_metadata, on_stage=on_stage)
         else:
             raise ValueError("Invalid source: Must be YouTube URL or local file")
 
+    def _cleanup_partial_files(self, video_id):
+        """Remove partial downloads (.part, .ytdl, fragments) and audio for a video ID"""
+        for path in glob.glob(os.path.join(self.temp_dir, f"{glob.escape(video_id)}.*")):
+            try:
+                os.remove(path)
+                print(f"Cleaned up: {path}")
+            except OSError as e:
+                print(f"Warning: Failed to cleanup {path}: {e}")
+
     def cleanup_audio(self, audio_path):
         """Remove temporary audio file"""
         if os.path.exists(audio_path):
@@ -0,0 +1,223 @@
+import http.client
+import json
+import os
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+from config import Config
+from processors.subprocess_utils import ProcessCancelled
+
+CHUNK_SIZE = 256 * 1024
+
+
+class WhisperServerUnavailable(Exception):
+    """Raised when no whisper-server instance can take a request; callers fall back to whisper-cli"""
+
+
+def server_urls():
+    """URLs of the whisper-server instances run by whisper_server.py"""
+    return [f"http://{Config.WHISPER_SERVER_HOST}:{Config.WHISPER_SERVER_PORT + i}"
+            for i in range(Config.WHISPER_SERVER_INSTANCES)]
+
+
+def check_health(url, timeout=2):
+    """
+    Probe a whisper-server instance
+
+    Returns 'ok' when it is serving, 'loading' while the model is still being
+    loaded, or None when it can't be reached. Builds without /health are
+    checked through their index page instead.
+    """
+    parsed = urlparse(url)
+    for path in ('/health', '/'):
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=timeout)
+        try:
+            conn.request('GET', path)
+            status = conn.getresponse().status
+        except OSError:
+            return None
+        finally:
+            conn.close()
+
+        if status == 200:
+            return 'ok'
+        if status == 503:
+            return 'loading'
+        if status != 404:
+            return None
+    return None
+
+
+class WhisperServerClient:
+    """
+    Sends WAV files to resident whisper-server instances
+
+    Requests go to the reachable instance with the fewest requests in flight
+    from this process. An instance that refuses a connection is skipped until
+    it passes a health check again, which happens at most every
+    recheck_interval seconds.
+    """
+
+    def __init__(self, urls, recheck_interval=30, timeout=3600):
+        self.urls = list(urls)
+        self.recheck_interval = recheck_interval
+        self.timeout = timeout
+        self.in_flight = {url: 0 for url in self.urls}
+        self.healthy = {}  # url -> bool
+        self.checked_at = {}  # url -> monotonic time of last probe
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        """
+        Re-probe instances whose last health check is older than recheck_interval
+
+        Probes can take seconds, so they run outside the lock; only the
+        results are written under it (unless the instance was marked down
+        meanwhile).
+        """
+        now = time.monotonic()
+        with self.lock:
+            stale = [url for url in self.urls
+                     if now - self.checked_at.get(url, float('-inf')) >= self.recheck_interval]
+        results = {url: check_health(url) == 'ok' for url in stale}
+        with self.lock:
+            for url, healthy in results.items():
+                if self.checked_at.get(url, float('-inf')) < now:
+                    self.healthy[url] = healthy
+                    self.checked_at[url] = now
+
+    def _mark_down(self, url):
+        with self.lock:
+            self.healthy[url] = False
+            self.checked_at[url] = time.monotonic()
+
+    def available(self):
+        """True if at least one instance is serving"""
+        self._refresh()
+        with self.lock:
+            return any(self.healthy.get(url) for url in self.urls)
+
+    def _acquire(self):
+        self._refresh()
+        with self.lock:
+            candidates = [url for url in self.urls if self.healthy.get(url)]
+            if not candidates:
+                raise WhisperServerUnavailable("no whisper-server instance is serving")
+            url = min(candidates, key=lambda candidate: self.in_flight[candidate])
+            self.in_flight[url] += 1
+            return url
+
+    def _release(self, url):
+        with self.lock:
+            self.in_flight[url] -= 1
+
+    def transcribe(self, audio_path, language='en', cancel_event=None, poll_interval=0.2):
+        """
+        Transcribe a WAV file on a resident model
+
+        Returns:
+            tuple of (transcript_text, timestamps) in the same shapes as a
+            whisper-cli run (timestamps in whisper's JSON segment format)
+
+        Raises:
+            WhisperServerUnavailable if no instance could be reached (nothing
+            was transcribed, so the caller can fall back to whisper-cli);
+            ProcessCancelled if cancel_event is set while waiting. The
+            instance still finishes the abandoned request in the background.
+        """
+        url = self._acquire()
+        try:
+            data = self._post_inference(url, audio_path, language, cancel_event, poll_interval)
+        finally:
+            self._release(url)
+
+        segments = data.get('segments') or []
+        timestamps = [self._segment_entry(segment) for segment in segments]
+        if segments:
+            transcript_text = '\n'.join(segment.get('text', '') for segment in segments).strip()
+        else:
+            transcript_text = (data.get('text') or '').strip()
+        return transcript_text, timestamps or None
+
+    def _post_inference(self, url, audio_path, language, cancel_event, poll_interval):
+        """POST the file to /inference, streaming it from disk, and return the decoded JSON"""
+        boundary = uuid.uuid4().hex
+        fields = {'language': language, 'response_format': 'verbose_json', 'temperature': '0.0'}
+        head = b''.join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            for name, value in fields.items()
+        )
+        head += (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+                 f'filename="{os.path.basename(audio_path)}"\r\nContent-Type: audio/wav\r\n\r\n').encode()
+        tail = f'\r\n--{boundary}--\r\n'.encode()
+        length = len(head) + os.path.getsize(audio_path) + len(tail)
+
+        def body():
+            yield head
+            with open(audio_path, 'rb') as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            yield tail
+
+        parsed = urlparse(url)
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=self.timeout)
+        result = {}
+
+        def send():
+            try:
+                conn.request('POST', '/inference', body=body(), headers={
+                    'Content-Type': f'multipart/form-data; boundary={boundary}',
+                    'Content-Length': str(length),
+                })
+                response = conn.getresponse()
+                result['status'] = response.status
+                result['body'] = response.read()
+            except Exception as e:
+                result['error'] = e
+
+        # The request runs on a helper thread so a cancel can abandon it right away
+        sender = threading.Thread(target=send, daemon=True)
+        sender.start()
+        while sender.is_alive():
+            sender.join(poll_interval)
+            if cancel_event is not None and cancel_event.is_set():
+                conn.close()
+                raise ProcessCancelled()
+        conn.close()
+
+        error = result.get('error')
+        if isinstance(error, ConnectionError):
+            self._mark_down(url)
+            raise WhisperServerUnavailable(f"{url}: {error}")
+        if error:
+            raise Exception(f"whisper-server request failed ({url}): {error}")
+        if result['status'] != 200:
+            raise Exception(f"whisper-server returned HTTP {result['status']}: "
+                            f"{result['body'][:500].decode('utf-8', errors='replace')}")
+
+        data = json.loads(result['body'])
+        if 'error' in data:
+            raise Exception(f"whisper-server error: {data['error']}")
+        return data
+
+    @staticmethod
+    def _segment_entry(segment):
+        """Convert a verbose_json segment (seconds) to whisper-cli's JSON entry (milliseconds)"""
+        start_ms = int(round(float(segment.get('start', 0)) * 1000))
+        end_ms = int(round(float(segment.get('end', 0)) * 1000))
+
+        def fmt(ms):
+            seconds, ms = divmod(ms, 1000)
+            minutes, seconds = divmod(seconds, 60)
+            hours, minutes = divmod(minutes, 60)
+            return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+        return {
+            'timestamps': {'from': fmt(start_ms), 'to': fmt(end_ms)},
+            'offsets': {'from': start_ms, 'to': end_ms},
+            'text': segment.get('text', ''),
+        }
@@ -35,6 +35,15 @@ else
     echo "No existing processes found."
 fi
 
+# Stop processing workers gracefully (running jobs are re-queued if they don't finish)
+WORKER_PIDS=$(ps aux | grep "[p]ython.*worker.py" | awk '{print $2}')
+if [ -n "$WORKER_PIDS" ]; then
+    echo "Stopping workers: $WORKER_PIDS"
+    for pid in $WORKER_PIDS; do
+        kill $pid 2>/dev/null || true
+    done
+fi
+
 # Activate virtual environment
 echo "🚀 Starting application..."
 source venv/bin/activate
@@ -46,7 +55,17 @@ if [ ! -f "app.py" ]; then
 fi
 
 # Start gunicorn in daemon mode with error log
-nohup gunicorn -w 8 -b 0.0.0.0:5000 --timeout 1800 app:app --error-logfile logs/error.log --access-logfile logs/access.log > logs/gunicorn.log 2>&1 &
+nohup gunicorn -w 8 -k gthread --threads 16 -b 0.0.0.0:5000 --timeout 1800 app:app --error-logfile logs/error.log --access-logfile logs/access.log > logs/gunicorn.log 2>&1 &
+
+# Start the processing worker
+nohup python worker.py >> logs/worker.log 2>&1 &
+
+# Keep whisper models resident if enabled and whisper-server is built (transcription falls back to whisper-cli otherwise).
+# Left running across restarts so the models stay loaded.
+if [ "${WHISPER_SERVER_INSTANCES:-0}" -gt 0 ] && [ -x Whisper/build/bin/whisper-server ] && ! pgrep -f "python.*whisper_server.py" > /dev/null; then
+    echo "Starting whisper model server..."
+    nohup python whisper_server.py >> logs/whisper_server.log 2>&1 &
+fi
 
 # Wait a moment for startup
 sleep 3
@@ -89,12 +89,30 @@ if lsof -Pi :$PORT -sTCP:LISTEN -t >/dev/null 2>&1 ; then
     fi
 fi
 
+# Start the processing worker (jobs run here, not in the web workers)
+PROCESSING_WORKERS=${PROCESSING_WORKERS:-1}
+mkdir -p logs
+echo "Starting $PROCESSING_WORKERS processing worker(s)..."
+for i in $(seq 1 "$PROCESSING_WORKERS"); do
+    nohup python worker.py >> logs/worker.log 2>&1 &
+done
+# Keep whisper models resident if enabled and whisper-server is built (transcription falls back to whisper-cli otherwise).
+# Left running across restarts so the models stay loaded.
+if [ "${WHISPER_SERVER_INSTANCES:-0}" -gt 0 ] && [ -x Whisper/build/bin/whisper-server ] && ! pgrep -f "python.*whisper_server.py" > /dev/null; then
+    echo "Starting whisper model server..."
+    nohup python whisper_server.py >> logs/whisper_server.log 2>&1 &
+fi
+echo ""
+
 echo "Starting Voice2Note with Gunicorn..."
 echo ""
 
 # Start gunicorn
+# gthread workers keep long-lived status streams (/status/stream) from tying up a process each
 exec gunicorn \
     -w "$WORKERS" \
+    -k gthread \
+    --threads "${THREADS:-16}" \
     -b "0.0.0.0:$PORT" \
     --timeout "$TIMEOUT" \
     --access-logfile - \
@@ -45,6 +45,32 @@ function debounce(func, wait) {
     };
 }
 
+// Watch processing status over one Server-Sent Events connection for all of
+// the user's active videos (plus videoIds), falling back to polling
+// /status/bulk where EventSource isn't available. Returns a stop function.
+function watchStatus(onStatus, videoIds = []) {
+    const query = videoIds.length ? `?ids=${videoIds.join(',')}` : '';
+
+    if (window.EventSource) {
+        const source = new EventSource(`/status/stream${query}`);
+        source.onmessage = (event) => onStatus(JSON.parse(event.data));
+        return () => source.close();
+    }
+
+    const poll = async () => {
+        try {
+            const response = await fetch(`/status/bulk${query}`);
+            const statuses = await response.json();
+            statuses.forEach(onStatus);
+        } catch (error) {
+            console.error('Error polling status:', error);
+        }
+    };
+    poll();
+    const interval = setInterval(poll, 2000);
+    return () => clearInterval(interval);
+}
+
 // Add event listener when DOM is ready
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Voice2Note app loaded');
@@ -87,5 +113,6 @@ window.Voice2Note = {
     hide,
     formatDuration,
     formatDate,
-    debounce
+    debounce,
+    watchStatus
 };
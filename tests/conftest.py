@@ -0,0 +1,32 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture
+def make_stub(tmp_path):
+    """Write an executable Python script into tmp_path/bin; returns its path"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir(exist_ok=True)
+
+    def make(name, source):
+        path = bin_dir / name
+        path.write_text(f'#!{sys.executable}\n' + textwrap.dedent(source))
+        path.chmod(0o755)
+        return str(path)
+
+    return make
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A DatabaseManager on a fresh database in tmp_path"""
+    from database.db_manager import DatabaseManager
+    manager = DatabaseManager(str(tmp_path / 'voice2note.db'))
+    manager.init_database()
+    return manager
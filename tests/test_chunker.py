@@ -0,0 +1,104 @@
+"""
+Guarantees of the transcript chunker (processors/chunker.py) over randomized inputs
+
+Each case draws a transcript of whisper-like segments and chapters
+(benchmarks/fixtures.py), a token budget, an overlap and a characters per
+token ratio; some cases chunk plain text, some add a run-on segment far
+longer than the budget.
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.fixtures import whisper_segments
+from processors.chunker import chunk_transcript, estimate_tokens
+
+CASES = 150
+
+
+def random_case(seed):
+    rng = np.random.default_rng(seed)
+    text, segments, chapters = whisper_segments(
+        int(rng.integers(0, 30000)), seed=seed, sentences_per_segment=(1, int(rng.integers(1, 12))),
+        split_chance=float(rng.random()), chapter_every=int(rng.integers(3, 60)))
+    if rng.random() < 0.1:
+        # A segment far longer than the budget (whisper run-on) must be split
+        segments.append({'text': ' ' + 'word ' * 3000, 'offsets': {'from': 10 ** 9, 'to': 10 ** 9 + 60000}})
+        text += ' ' + ' '.join(['word'] * 3000)
+    max_tokens = int(rng.integers(20, 3000))
+    overlap_tokens = int(rng.integers(0, max_tokens))
+    chars_per_token = float(rng.choice([1.0, 3.5, 4.0]))
+    if rng.random() < 0.3:
+        segments, chapters = None, None  # Plain text: sentence units, no times
+    return text, segments, chapters, max_tokens, overlap_tokens, chars_per_token
+
+
+def new_words(chunks, chars_per_token):
+    """Each chunk's words without the ones repeated from the previous chunk"""
+    seen = []
+    parts = []
+    for chunk in chunks:
+        words = chunk['text'].split()
+        skip = 0
+        if chunk['overlap_tokens']:
+            skip = next(n for n in range(len(words) + 1)
+                        if words[:n] == seen[len(seen) - n:]
+                        and estimate_tokens(' '.join(words[:n]), chars_per_token) == chunk['overlap_tokens'])
+        parts.append(words[skip:])
+        seen.extend(words[skip:])
+    return parts
+
+
+@pytest.fixture(params=range(CASES))
+def case(request):
+    text, segments, chapters, max_tokens, overlap_tokens, chars_per_token = random_case(request.param)
+    chunks = chunk_transcript(text, segments, chapters, max_tokens=max_tokens, overlap_tokens=overlap_tokens,
+                              chars_per_token=chars_per_token)
+    return {'text': text, 'segments': segments, 'chapters': chapters, 'max_tokens': max_tokens,
+            'overlap_tokens': overlap_tokens, 'chars_per_token': chars_per_token, 'chunks': chunks}
+
+
+def test_chunks_stay_within_budget(case):
+    max_chars = int(case['max_tokens'] * case['chars_per_token'])
+    for chunk in case['chunks']:
+        assert len(chunk['text']) <= max_chars
+        assert chunk['tokens'] == estimate_tokens(chunk['text'], case['chars_per_token'])
+        assert chunk['tokens'] <= case['max_tokens']
+
+
+def test_chunks_cover_the_transcript_in_order(case):
+    rebuilt = [word for words in new_words(case['chunks'], case['chars_per_token']) for word in words]
+
+    assert rebuilt == case['text'].split()
+    if case['segments']:
+        for previous, chunk in zip(case['chunks'], case['chunks'][1:]):
+            assert chunk['start_ms'] <= chunk['end_ms']
+            assert chunk['start_ms'] >= previous['start_ms']
+            assert chunk['end_ms'] >= previous['end_ms']
+
+
+def test_overlap_stays_within_its_limit(case):
+    chunks = case['chunks']
+    if chunks:
+        assert chunks[0]['overlap_tokens'] == 0
+    for chunk in chunks:
+        assert chunk['overlap_tokens'] <= case['overlap_tokens']
+
+
+def test_no_overlap_across_a_chapter_start(case):
+    if not case['segments'] or not case['chapters']:
+        pytest.skip('no chapters')
+    chapter_starts = [int(chapter['start_time'] * 1000) for chapter in case['chapters']]
+    segment_starts = sorted(segment['offsets']['from'] for segment in case['segments'] if segment['text'].strip())
+
+    for previous, chunk in zip(case['chunks'], case['chunks'][1:]):
+        if not chunk['overlap_tokens']:
+            continue
+        # The repeated text runs from the chunk's start to the end of the previous chunk; the new text
+        # starts with the next unit (the next segment, or the rest of a segment cut at the budget)
+        inside_segment = any(segment['offsets']['from'] < previous['end_ms'] < segment['offsets']['to']
+                             for segment in case['segments'])
+        new_start = previous['end_ms'] if inside_segment else min(
+            (start for start in segment_starts if start >= previous['end_ms']), default=previous['end_ms'])
+        crossed = [start for start in chapter_starts if chunk['start_ms'] < start <= new_start]
+        assert not crossed, f"chunk starting at {chunk['start_ms']} ms repeats text across chapter starts {crossed}"
@@ -0,0 +1,65 @@
+"""Connection reuse by ConnectionPool (database/db_manager.py)"""
+
+import threading
+
+from database.db_manager import ConnectionPool
+
+
+def counting_pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'))
+    pool.opened = 0
+    connect = pool._connect
+
+    def counted():
+        pool.opened += 1
+        return connect()
+
+    pool._connect = counted
+    return pool
+
+
+def use(pool):
+    conn = pool.acquire()
+    conn.execute('SELECT 1').fetchone()
+    conn.close()
+
+
+def test_short_lived_threads_reuse_connections(tmp_path):
+    pool = counting_pool(tmp_path)
+
+    for _ in range(20):
+        thread = threading.Thread(target=use, args=(pool,))
+        thread.start()
+        thread.join()
+
+    assert pool.opened == 1
+
+
+def test_nested_use_gets_separate_connections(tmp_path):
+    pool = counting_pool(tmp_path)
+
+    outer = pool.acquire()
+    inner = pool.acquire()
+    assert inner is not outer
+    inner.close()
+    outer.close()
+
+    # Both went back to the pool and are reused
+    use(pool)
+    use(pool)
+    assert pool.opened == 2
+    assert len(pool.idle) == 2
+
+
+def test_released_connection_has_no_open_transaction(tmp_path):
+    pool = counting_pool(tmp_path)
+    conn = pool.acquire()
+    conn.execute('CREATE TABLE t (x INTEGER)')
+    conn.commit()
+    conn.execute('INSERT INTO t VALUES (1)')
+    conn.close()  # Without commit
+
+    conn = pool.acquire()
+    assert not conn.in_transaction
+    assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+    conn.close()
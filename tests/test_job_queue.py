@@ -0,0 +1,79 @@
+"""Job queue: submitting and coalescing work, and the state a worker's heartbeat sees (database/db_manager.py)"""
+
+import pytest
+
+
+def claimed_job(db, user_id, name):
+    video_id = db.create_video(user_id, f'https://www.youtube.com/watch?v={name}', 'youtube', name)
+    db.enqueue_job(video_id, f'https://www.youtube.com/watch?v={name}')
+    job = db.claim_job('worker-1')
+    assert job['video_id'] == video_id
+    return video_id, job['id']
+
+
+def test_deleted_video_cancels_its_running_job(db):
+    user_id = db.create_user('user', 'user@example.com', 'password')
+    deleted_video, deleted_job = claimed_job(db, user_id, 'deleted0001')
+    _, running_job = claimed_job(db, user_id, 'running0001')
+
+    db.request_job_cancel(deleted_video)
+    db.delete_video(deleted_video)
+
+    # The cancel flag went with the row; the job must still be reported as cancelled
+    assert db.get_cancel_requested_jobs([deleted_job, running_job]) == [deleted_job]
+
+
+def test_cancel_flag_is_reported(db):
+    user_id = db.create_user('user', 'user@example.com', 'password')
+    video_id, job_id = claimed_job(db, user_id, 'flagged0001')
+
+    assert db.get_cancel_requested_jobs([job_id]) == []
+    db.request_job_cancel(video_id)
+    assert db.get_cancel_requested_jobs([job_id]) == [job_id]
+
+
+def test_regenerate_job_is_queued_and_claimed_with_its_flag(db):
+    user_id = db.create_user('user', 'user@example.com', 'password')
+    url = 'https://www.youtube.com/watch?v=regenerate1'
+    first = db.create_video(user_id, url, 'youtube', 'first')
+    second = db.create_video(user_id, url, 'youtube', 'second')
+    db.enqueue_job(first, url, content_key='youtube:regenerate1')
+
+    # An identical job is in flight, but its results may come from the caches the restart wants to skip
+    job = db.enqueue_job(second, url, content_key='youtube:regenerate1', regenerate=True)
+    assert job['state'] == 'queued'
+    assert job['leader_job_id'] is None
+
+    claimed = [db.claim_job('worker-1'), db.claim_job('worker-1')]
+    assert [(job['video_id'], job['regenerate']) for job in claimed] == [(first, 0), (second, 1)]
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'db', db)
+    app.app.config['TESTING'] = True
+    user_id = db.create_user('user', 'user@example.com', 'password')
+    with app.app.test_client() as client:
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        yield client
+
+
+def test_process_reusing_stored_results_is_not_processing(db, client):
+    db.save_artifact('youtube:stored00001', {'title': 'Stored lecture'}, 'The transcript.', None, '# Stored notes')
+
+    data = client.post('/process', data={'youtube_url': 'https://www.youtube.com/watch?v=stored00001'}).get_json()
+
+    # Finished in the request: no job was queued for the client to poll
+    assert data['success'] and data['processing'] is False
+    assert data['title'] == 'Stored lecture'
+    assert db.get_notes(data['video_id'])['content'] == '# Stored notes'
+    assert db.claim_job('worker-1') is None
+
+
+def test_process_new_content_is_queued(db, client):
+    data = client.post('/process', data={'youtube_url': 'https://www.youtube.com/watch?v=queued00001'}).get_json()
+
+    assert data['success'] and data['processing'] is True
+    assert db.claim_job('worker-1')['video_id'] == data['video_id']
@@ -0,0 +1,181 @@
+"""
+Retries, limits, circuit breaker and cancellation of the shared LLM client (processors/llm_client.py)
+
+Requests go to the fake Ollama server in benchmarks/fake_ollama.py.
+"""
+
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from processors import llm_client
+from processors.llm_client import CircuitBreaker, LLMClient, LLMUnavailable
+from processors.subprocess_utils import ProcessCancelled
+
+MODEL = 'fake-model'
+MESSAGES = [{'role': 'user', 'content': 'Summarize the lecture. ' + 'word ' * 50}]
+
+
+class Clock:
+    """time.monotonic for the breaker, moved by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_client, 'time', types.SimpleNamespace(monotonic=clock.monotonic, sleep=time.sleep))
+    return clock
+
+
+@pytest.fixture
+def server():
+    with FakeOllamaServer(time_scale=0.01, parallel=8) as server:
+        yield server
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=30)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert not breaker.is_open
+    assert breaker.before_request() is False
+    breaker.record_failure()
+    assert breaker.is_open and breaker.opened == 1
+    with pytest.raises(LLMUnavailable):
+        breaker.before_request()
+
+    # Half-open after the cooldown: one probe goes through, everyone else still waits for it
+    clock.now += 30
+    assert breaker.wait_until_available(timeout=0)
+    assert breaker.before_request() is True
+    with pytest.raises(LLMUnavailable):
+        breaker.before_request()
+
+    # A failed probe opens it for another cooldown; a successful one closes it
+    breaker.record_failure()
+    with pytest.raises(LLMUnavailable):
+        breaker.before_request()
+    clock.now += 30
+    assert breaker.before_request() is True
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.before_request() is False
+    assert breaker.opened == 1
+
+
+def test_open_breaker_stops_requests_until_the_model_is_back(server, clock):
+    llm = LLMClient(server.url, retry_attempts=10, retry_base_delay=0, failure_threshold=3, cooldown=30)
+    server.outage = True
+
+    with pytest.raises(LLMUnavailable):
+        llm.chat(MODEL, MESSAGES)
+    assert server.attempts == 3
+    # Refused without reaching the server while open
+    with pytest.raises(LLMUnavailable):
+        llm.chat(MODEL, MESSAGES)
+    assert server.attempts == 3
+
+    server.outage = False
+    clock.now += 30
+    assert llm.chat(MODEL, MESSAGES) == server.reply(MESSAGES[0]['content'])[0]
+    assert not llm.breaker.is_open
+
+
+def test_unavailable_once_every_attempt_failed(server):
+    llm = LLMClient(server.url, retry_attempts=3, retry_base_delay=0, failure_threshold=100)
+    server.outage = True
+
+    with pytest.raises(LLMUnavailable):
+        llm.chat(MODEL, MESSAGES)
+    assert server.attempts == 3
+    assert llm.retries == 2
+
+
+def test_retries_back_off_exponentially(server, monkeypatch):
+    delays = []
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append(high)
+        return high
+
+    monkeypatch.setattr(llm_client, 'random', types.SimpleNamespace(uniform=uniform))
+    monkeypatch.setattr(llm_client, 'time', types.SimpleNamespace(monotonic=time.monotonic, sleep=delays.append))
+    llm = LLMClient(server.url, retry_attempts=6, retry_base_delay=0.1, retry_max_delay=0.5, failure_threshold=100)
+    server.outage = True
+
+    with pytest.raises(LLMUnavailable):
+        llm.chat(MODEL, MESSAGES)
+
+    # Full jitter: each wait is drawn from [0, min(max, base * 2^n)]
+    assert bounds == pytest.approx([0.1, 0.2, 0.4, 0.5, 0.5])
+    assert delays == bounds
+
+
+def test_transient_errors_are_retried_until_the_request_succeeds():
+    with FakeOllamaServer(time_scale=0.01, error_rate=0.3, drop_rate=0.2, seed=1) as server:
+        llm = LLMClient(server.url, retry_attempts=20, retry_base_delay=0, failure_threshold=100)
+        expected = server.reply(MESSAGES[0]['content'])[0]
+
+        assert all(llm.chat(MODEL, MESSAGES) == expected for _ in range(10))
+        assert llm.retries == server.errors + server.drops > 0
+
+
+def test_in_flight_cap_and_rate_limit_hold(server):
+    llm = LLMClient(server.url, max_in_flight=2, requests_per_minute=600)
+    requests = 8
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        list(pool.map(lambda _: llm.chat(MODEL, MESSAGES), range(requests)))
+
+    assert server.peak_in_flight <= 2
+    assert time.monotonic() - start >= (requests - 1) * 0.1 * 0.95  # Starts spaced 60 / 600 seconds apart
+
+
+def test_cancel_interrupts_a_streaming_request():
+    # Real-time decoding: the reply takes seconds to stream
+    with FakeOllamaServer(time_scale=1.0, decode_tps=50) as server:
+        llm = LLMClient(server.url)
+        cancel_event = threading.Event()
+        texts = []
+
+        def on_text(text):
+            texts.append(text)
+            cancel_event.set()
+
+        start = time.monotonic()
+        with pytest.raises(ProcessCancelled):
+            llm.chat(MODEL, MESSAGES, cancel_event=cancel_event, on_text=on_text)
+
+        assert time.monotonic() - start < 2
+        assert len(texts) == 1
+        assert llm.breaker.failures == 0 and not llm.breaker.is_open
+        # The stream was dropped, so the server stops generating
+        deadline = time.monotonic() + 5
+        while server.in_flight and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert server.in_flight == 0
+
+
+def test_cancel_interrupts_the_backoff(server):
+    llm = LLMClient(server.url, retry_attempts=5, retry_base_delay=30, failure_threshold=100)
+    server.outage = True
+    cancel_event = threading.Event()
+    threading.Timer(0.2, cancel_event.set).start()
+
+    start = time.monotonic()
+    with pytest.raises(ProcessCancelled):
+        llm.chat(MODEL, MESSAGES, cancel_event=cancel_event)
+    assert time.monotonic() - start < 5
@@ -0,0 +1,107 @@
+"""
+NoteGenerator (processors/note_generator.py) against a scripted model
+"""
+
+import pytest
+
+from config import Config
+from processors.llm_cache import LLMResponseCache
+from processors.note_generator import NoteGenerator
+
+
+class Backend:
+    def __init__(self, model):
+        self.model = model
+
+
+class ScriptedLLM:
+    """Stands in for the LLMRouter: answers every prompt with the next reply, from the next backend"""
+
+    def __init__(self, model='preferred', replies=None, backends=None):
+        self.model = model
+        self.replies = list(replies or [])
+        self.backends = list(backends or [])
+        self.prompts = []
+
+    def chat(self, messages, cancel_event=None, on_text=None):
+        self.prompts.append(messages[-1]['content'])
+        reply = self.replies.pop(0) if self.replies else f'# Notes {len(self.prompts)}\n'
+        if on_text is not None:
+            on_text(reply)
+        return reply, Backend(self.backends.pop(0) if self.backends else self.model)
+
+
+class InterruptedRecorder:
+    """A PartialNotesRecorder holding the notes an interrupted attempt streamed for any prompt"""
+
+    def __init__(self, previous):
+        self.previous = previous
+        self.updates = []
+
+    def resumable(self, prompt_key):
+        return self.previous
+
+    def update(self, content, prompt_key=None):
+        self.updates.append(content)
+
+
+@pytest.fixture
+def cache(db):
+    return LLMResponseCache(db)
+
+
+def test_long_transcript_in_one_chunk_is_generated_in_one_prompt(monkeypatch):
+    # Chunks at least as long as the map-reduce threshold: the transcript comes back as a single chunk
+    monkeypatch.setattr(Config, 'NOTES_MAP_REDUCE_TOKENS', 100)
+    monkeypatch.setattr(Config, 'NOTES_CHUNK_TOKENS', 1000)
+    llm = ScriptedLLM(replies=['# Lecture\n'])
+    transcript = 'This sentence is part of a long lecture. ' * 40
+
+    notes = NoteGenerator(llm=llm).generate_notes(transcript)
+
+    assert notes == '# Lecture\n'
+    assert len(llm.prompts) == 1
+    assert transcript.strip() in llm.prompts[0]
+
+
+def test_single_chunk_is_not_chunked_again(monkeypatch):
+    monkeypatch.setattr(Config, 'NOTES_MAP_REDUCE_TOKENS', 100)
+    llm = ScriptedLLM(replies=['# Lecture\n'])
+
+    notes = NoteGenerator(llm=llm).generate_notes_chunked(['A long lecture. ' * 100])
+
+    assert notes == '# Lecture\n'
+    assert len(llm.prompts) == 1
+
+
+@pytest.mark.parametrize('continued_by, cached', [('preferred', True), ('fallback', False)])
+def test_resumed_notes_are_cached_only_when_the_preferred_model_continued_them(cache, continued_by, cached):
+    llm = ScriptedLLM(replies=['the rest\n'], backends=[continued_by])
+    generator = NoteGenerator(cache=cache, llm=llm)
+    recorder = InterruptedRecorder('# Lecture\n')
+
+    notes = generator.generate_notes('A short lecture.', partial=recorder)
+
+    assert notes == '# Lecture\nthe rest\n'
+    assert recorder.updates[-1] == notes
+    prompt = generator._build_prompt('A short lecture.', None)
+    assert cache.get('preferred', prompt) == (notes if cached else None)
+    assert cache.get('fallback', prompt) is None
+    # The continue prompt embeds the interrupted notes; its answer is never worth keeping
+    assert cache.get(continued_by, llm.prompts[0]) is None
+
+
+def test_only_the_preferred_models_answers_are_cached(cache):
+    llm = ScriptedLLM(replies=['# From the fallback\n', '# From the preferred model\n'],
+                      backends=['fallback', 'preferred'])
+    generator = NoteGenerator(cache=cache, llm=llm)
+
+    assert generator.generate_notes('A short lecture.') == '# From the fallback\n'
+    prompt = llm.prompts[0]
+    assert cache.get('fallback', prompt) is None
+
+    # Not answered from the cache, so the preferred model gets another chance
+    assert generator.generate_notes('A short lecture.') == '# From the preferred model\n'
+    assert generator.generate_notes('A short lecture.') == '# From the preferred model\n'
+    assert len(llm.prompts) == 2
+    assert cache.get('preferred', prompt) == '# From the preferred model\n'
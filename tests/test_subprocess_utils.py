@@ -0,0 +1,189 @@
+"""
+Cancellation, timeouts and failures of external commands (processors/subprocess_utils.py)
+
+The commands are stub executables that write partial output, start a child
+of their own and then hang, like yt-dlp running ffmpeg or a slow whisper-cli.
+"""
+
+import os
+import subprocess
+import textwrap
+import threading
+import time
+
+import pytest
+
+from processors.subprocess_utils import ProcessCancelled, run_command, run_pipeline, stream_command
+from processors.transcriber import Transcriber
+from processors.video_handler import VideoHandler
+
+# Writes its own and its child's pid to PID_FILE, then hangs; the child hangs too
+HANGING = '''
+import os, subprocess, sys, time
+child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+with open(os.environ['PID_FILE'], 'w') as f:
+    f.write(f"{os.getpid()} {child.pid}")
+print('started', flush=True)
+time.sleep(60)
+'''
+
+
+def alive(pid):
+    """True if pid is running (zombies waiting to be reaped count as gone)"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def wait_for_pids(pid_file, timeout=10):
+    """The pids a HANGING stub wrote, once it has written them"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if os.path.exists(pid_file) and os.path.getsize(pid_file):
+            with open(pid_file) as f:
+                return [int(pid) for pid in f.read().split()]
+        time.sleep(0.02)
+    raise AssertionError('stub never started')
+
+
+def assert_gone(pids, timeout=5):
+    deadline = time.monotonic() + timeout
+    while any(alive(pid) for pid in pids) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert not any(alive(pid) for pid in pids), f"still running: {[pid for pid in pids if alive(pid)]}"
+
+
+def cancel_when_started(pid_file):
+    """A cancel event that is set as soon as the stub has started its child"""
+    cancel_event = threading.Event()
+
+    def cancel():
+        wait_for_pids(pid_file)
+        cancel_event.set()
+
+    threading.Thread(target=cancel, daemon=True).start()
+    return cancel_event
+
+
+@pytest.fixture
+def pid_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'pids')
+    monkeypatch.setenv('PID_FILE', path)
+    return path
+
+
+def test_run_command_cancel_kills_process_group(make_stub, pid_file):
+    stub = make_stub('hang', HANGING)
+    cancel_event = cancel_when_started(pid_file)
+
+    started = time.monotonic()
+    with pytest.raises(ProcessCancelled):
+        run_command([stub], cancel_event=cancel_event, poll_interval=0.05)
+
+    assert time.monotonic() - started < 10
+    assert_gone(wait_for_pids(pid_file))
+
+
+def test_stream_command_cancel_kills_process_group(make_stub, pid_file):
+    stub = make_stub('hang', HANGING)
+    cancel_event = cancel_when_started(pid_file)
+    lines = []
+
+    with pytest.raises(ProcessCancelled):
+        stream_command([stub], lambda stream, line: lines.append(line), cancel_event=cancel_event,
+                       poll_interval=0.05)
+
+    assert lines == ['started']
+    assert_gone(wait_for_pids(pid_file))
+
+
+@pytest.mark.parametrize('runner', [run_command, lambda cmd, **kwargs: stream_command(cmd, lambda *line: None,
+                                                                                      **kwargs)])
+def test_timeout_kills_process_group(make_stub, pid_file, runner):
+    stub = make_stub('hang', HANGING)
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        runner([stub], timeout=1, poll_interval=0.05)
+
+    assert_gone(wait_for_pids(pid_file))
+
+
+def test_pipeline_reports_the_stage_that_failed(make_stub):
+    # Dies of SIGPIPE when the consumer goes away, like a C program such as ffmpeg
+    producer = make_stub('producer', '''
+        import signal, sys
+        signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+        while True:
+            sys.stdout.buffer.write(b'x' * 65536)
+    ''')
+    consumer = make_stub('consumer', '''
+        import sys
+        sys.stdin.buffer.read(1024)
+        sys.stderr.write('consumer: Invalid data found when processing input\\n')
+        sys.exit(3)
+    ''')
+
+    with pytest.raises(subprocess.CalledProcessError) as raised:
+        run_pipeline([[producer], [consumer]], timeout=10, poll_interval=0.05)
+
+    # The producer only died of SIGPIPE; the consumer is the one to blame
+    assert raised.value.cmd == [consumer]
+    assert raised.value.returncode == 3
+    assert 'Invalid data found' in raised.value.stderr
+
+
+def test_pipeline_cancel_kills_every_stage(make_stub, pid_file, tmp_path, monkeypatch):
+    consumer_pid_file = str(tmp_path / 'consumer_pids')
+    producer = make_stub('producer', HANGING)
+    consumer = make_stub('consumer', HANGING.replace("os.environ['PID_FILE']", repr(consumer_pid_file)))
+    cancel_event = cancel_when_started(pid_file)
+
+    with pytest.raises(ProcessCancelled):
+        run_pipeline([[producer], [consumer]], cancel_event=cancel_event, poll_interval=0.05)
+
+    assert_gone(wait_for_pids(pid_file) + wait_for_pids(consumer_pid_file))
+
+
+def test_cancelled_ffmpeg_leaves_no_partial_wav(make_stub, pid_file, tmp_path, monkeypatch):
+    make_stub('ffmpeg', textwrap.dedent('''
+        import sys
+        with open(sys.argv[-1], 'wb') as f:
+            f.write(b'RIFF partial')
+    ''') + HANGING)
+    monkeypatch.setenv('PATH', str(tmp_path / 'bin') + os.pathsep + os.environ['PATH'])
+    video_path = tmp_path / 'lecture.mp4'
+    video_path.write_bytes(b'not really a video')
+    handler = VideoHandler()
+    handler.temp_dir = str(tmp_path)
+    cancel_event = cancel_when_started(pid_file)
+
+    with pytest.raises(ProcessCancelled):
+        handler.extract_local_audio(str(video_path), video_id='lecture', cancel_event=cancel_event)
+
+    assert_gone(wait_for_pids(pid_file))
+    assert not (tmp_path / 'lecture.wav').exists()
+
+
+def test_cancelled_whisper_leaves_no_partial_transcript(make_stub, pid_file, tmp_path):
+    stub = make_stub('whisper-cli', textwrap.dedent('''
+        import sys
+        base = sys.argv[sys.argv.index('-of') + 1]
+        for ext in ('.txt', '.json'):
+            with open(base + ext, 'w') as f:
+                f.write('partial')
+    ''') + HANGING)
+    audio_path = tmp_path / 'lecture.wav'
+    audio_path.write_bytes(b'')
+    transcriber = Transcriber()
+    transcriber.server = None
+    transcriber.whisper_path = stub
+    cancel_event = cancel_when_started(pid_file)
+
+    with pytest.raises(ProcessCancelled):
+        transcriber._run_whisper(str(audio_path), cancel_event=cancel_event)
+
+    assert_gone(wait_for_pids(pid_file))
+    assert not (tmp_path / 'lecture.txt').exists()
+    assert not (tmp_path / 'lecture.json').exists()
@@ -0,0 +1,32 @@
+"""Stage events and the time report (database/db_manager.py) when videos are deleted"""
+
+from datetime import datetime, timedelta
+
+
+def add_whisper_run(db, video_id, seconds):
+    started = datetime.now() - timedelta(minutes=5)
+    db.add_processing_event(video_id, 'whisper', 'completed', started, started + timedelta(seconds=seconds), seconds,
+                            audio_seconds=seconds * 10)
+
+
+def whisper_row(report):
+    return next(row for row in report if row['stage'] == 'whisper')
+
+
+def test_deleted_videos_still_count_in_the_time_report(db):
+    user_id = db.create_user('user', 'user@example.com', 'password')
+    other_user = db.create_user('other', 'other@example.com', 'password')
+    kept = db.create_video(user_id, 'https://www.youtube.com/watch?v=kept0000001', 'youtube', 'kept')
+    deleted = db.create_video(user_id, 'https://www.youtube.com/watch?v=deleted0001', 'youtube', 'deleted')
+    others = db.create_video(other_user, 'https://www.youtube.com/watch?v=others00001', 'youtube', 'others')
+    add_whisper_run(db, kept, 60)
+    add_whisper_run(db, deleted, 120)
+    add_whisper_run(db, others, 30)
+
+    db.delete_video(deleted)
+
+    assert len(db.get_processing_events(deleted)) == 1
+    everyone = whisper_row(db.get_time_report(days=1))
+    assert (everyone['runs'], everyone['jobs'], everyone['total_seconds']) == (3, 3, 210)
+    mine = whisper_row(db.get_time_report(days=1, user_id=user_id))
+    assert (mine['runs'], mine['jobs'], mine['total_seconds'], mine['audio_seconds']) == (2, 2, 180, 1800)
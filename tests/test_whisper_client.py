@@ -0,0 +1,63 @@
+"""Instance selection and health checks of WhisperServerClient (processors/whisper_client.py)"""
+
+import threading
+import time
+
+import pytest
+
+from processors import whisper_client
+from processors.whisper_client import WhisperServerClient, WhisperServerUnavailable
+
+URLS = ['http://127.0.0.1:1', 'http://127.0.0.1:2']
+
+
+def test_health_probes_do_not_hold_the_lock(monkeypatch):
+    client = WhisperServerClient(URLS)
+    probing = {'now': 0, 'most': 0}
+    counter = threading.Lock()
+
+    def slow_check(url):
+        # Another transcription could pick an instance right now
+        assert client.lock.acquire(blocking=False), 'health probe ran while holding the client lock'
+        client.lock.release()
+        with counter:
+            probing['now'] += 1
+            probing['most'] = max(probing['most'], probing['now'])
+        time.sleep(0.2)
+        with counter:
+            probing['now'] -= 1
+        return 'ok'
+
+    monkeypatch.setattr(whisper_client, 'check_health', slow_check)
+    chosen = []
+    threads = [threading.Thread(target=lambda: chosen.append(client._acquire())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert probing['most'] > 1  # Concurrent callers probed side by side, not one after another
+    assert sorted(chosen) == sorted(URLS * 2)  # Spread by requests in flight
+    assert client.in_flight == {url: 2 for url in URLS}
+
+
+def test_instances_are_rechecked_only_after_the_interval(monkeypatch):
+    client = WhisperServerClient(URLS, recheck_interval=60)
+    checks = []
+    monkeypatch.setattr(whisper_client, 'check_health', lambda url: checks.append(url) or 'ok')
+
+    assert client.available()
+    assert client.available()
+    assert len(checks) == len(set(checks))  # Each instance probed once within the interval
+
+
+def test_instance_marked_down_is_skipped(monkeypatch):
+    client = WhisperServerClient(URLS, recheck_interval=60)
+    monkeypatch.setattr(whisper_client, 'check_health', lambda url: 'ok')
+    assert client.available()
+
+    client._mark_down(URLS[0])
+    assert client._acquire() == URLS[1]
+    client._mark_down(URLS[1])
+    with pytest.raises(WhisperServerUnavailable):
+        client._acquire()
@@ -0,0 +1,111 @@
+"""Stored results, the regenerate flag and waiting for the model in the worker (worker.py)"""
+
+import re
+import threading
+
+import pytest
+
+import worker
+from benchmarks.fixtures import whisper_segments
+from config import Config
+from database.stage_timeline import StageTimeline
+from processors.chunker import chunk_transcript
+from processors.llm_cache import LLMResponseCache
+from processors.llm_client import LLMUnavailable
+from processors.note_generator import NoteGenerator
+from processors.streaming_notes import StreamingNotes
+
+URL = 'https://www.youtube.com/watch?v=stored00001'
+
+
+@pytest.fixture
+def stored_video(db, monkeypatch):
+    monkeypatch.setattr(worker, 'db', db)
+    user_id = db.create_user('user', 'user@example.com', 'password')
+    db.save_artifact('youtube:stored00001', {'title': 'Stored'}, 'The transcript.', None, '# Stored notes')
+    return db.create_video(user_id, URL, 'youtube', 'Processing...')
+
+
+def test_stored_results_are_reused(db, stored_video):
+    status = worker.process_video_background(stored_video, URL, False, None, threading.Event(),
+                                             content_key='youtube:stored00001')
+
+    assert status == 'completed'
+    assert db.get_notes(stored_video)['content'] == '# Stored notes'
+
+
+def test_regenerate_skips_stored_results(db, stored_video):
+    cancel_event = threading.Event()
+    cancel_event.set()  # Stop at the first step, once the stored results have been passed over
+
+    status = worker.process_video_background(stored_video, URL, False, None, cancel_event,
+                                             content_key='youtube:stored00001', regenerate=True)
+
+    assert status == 'cancelled'
+    assert not db.get_notes(stored_video)
+
+
+class Backend:
+    model = 'fake-model'
+
+
+def part_number(prompt):
+    """The part a map-step prompt asks about, or None for other prompts"""
+    match = re.search(r'## Transcript \(part (\d+)', prompt)
+    return int(match.group(1)) if match else None
+
+
+class OutageLLM:
+    """Answers every prompt, except that the first request for part 3 finds the model unreachable"""
+
+    model = 'fake-model'
+
+    def __init__(self):
+        self.prompts = []
+        self.outage_at = None  # len(self.prompts) when the outage hit
+
+    def chat(self, messages, cancel_event=None, on_text=None):
+        prompt = messages[-1]['content']
+        if self.outage_at is None and part_number(prompt) == 3:
+            self.outage_at = len(self.prompts)
+            raise LLMUnavailable('model unreachable')
+        self.prompts.append(prompt)
+        return f'- Notes {len(self.prompts)}\n', Backend()
+
+    def wait_until_available(self, cancel_event=None, timeout=None):
+        return True
+
+
+class Status:
+    def update(self, *args, **kwargs):
+        pass
+
+
+def test_retry_after_llm_outage_reuses_the_streamed_part_notes(db, monkeypatch):
+    monkeypatch.setattr(Config, 'NOTES_MAP_REDUCE_TOKENS', 300)
+    monkeypatch.setattr(Config, 'NOTES_CHUNK_TOKENS', 200)
+    monkeypatch.setattr(Config, 'NOTES_CHUNK_OVERLAP_TOKENS', 20)
+    llm = OutageLLM()
+    generator = NoteGenerator(cache=LLMResponseCache(db), llm=llm)
+    monkeypatch.setattr(worker, 'note_generator', generator)
+    user_id = db.create_user('user', 'user@example.com', 'password')
+    video_id = db.create_video(user_id, URL, 'youtube', 'Processing...')
+    text, segments, chapters = whisper_segments(8000, chapter_every=20)
+    metadata = {'chapters': chapters}
+
+    # Parts are sent while "transcribing", one at a time; part 3 hits the outage
+    streaming_notes = StreamingNotes(generator, metadata, cancel_event=threading.Event(), max_in_flight=1)
+    for start in range(0, len(segments), 10):
+        streaming_notes.add(segments[start:start + 10])
+
+    notes = worker.generate_notes_waiting_for_llm(video_id, {'transcript_text': text, 'timestamps': segments},
+                                                  metadata, streaming_notes, None, Status(), threading.Event(),
+                                                  StageTimeline(db, video_id))
+
+    assert notes
+    before, retry = llm.prompts[:llm.outage_at], llm.prompts[llm.outage_at:]
+    assert [part_number(prompt) for prompt in before] == [1, 2]
+    # Parts 1 and 2 come from the cache; only the other parts and the merge reach the model
+    total = len(chunk_transcript(text, segments, chapters))
+    assert total > 3
+    assert sorted(filter(None, map(part_number, retry))) == list(range(3, total + 1))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Where does processing time go: per-stage totals over all users' jobs
+
+Reads the processing_events table (see database/stage_timeline.py), like
+the /reports/time page but across every user, for capacity planning.
+
+Usage:
+    python time_report.py [--days 14] [--json]
+"""
+
+import argparse
+import json
+from database.db_manager import DatabaseManager
+from database.stage_timeline import STAGES, summarize_report
+
+
+def hours(seconds):
+    return f"{seconds / 3600:.2f}h"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Processing time per stage and per day')
+    parser.add_argument('--days', type=int, default=14, help='Days to cover, including today')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    report = summarize_report(DatabaseManager().get_time_report(args.days))
+
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    if not report['stages']:
+        print(f"No processing recorded in the last {args.days} days")
+        return
+
+    print(f"\nLast {args.days} days, by stage")
+    print(f"{'':18}{'runs':>7}{'failed':>8}{'total':>10}{'share':>8}{'avg s':>9}{'max s':>9}{'s/audio h':>11}")
+    for stage in report['stages']:
+        per_audio_hour = f"{stage['seconds_per_audio_hour']:.0f}" if stage['seconds_per_audio_hour'] else '-'
+        print(f"{stage['stage']:18}{stage['runs']:>7}{stage['failed']:>8}{hours(stage['total_seconds']):>10}"
+              f"{stage['share']:>7.1f}%{stage['avg_seconds']:>9.1f}{stage['max_seconds']:>9.1f}{per_audio_hour:>11}")
+
+    stages = [stage for stage in STAGES if any(stage in day['stages'] for day in report['days'])]
+    print("\nBy day (hours)")
+    print(f"{'':12}{'total':>8}" + ''.join(f"{stage:>17}" for stage in stages))
+    for day in report['days']:
+        print(f"{day['day']:12}{day['total_seconds'] / 3600:>8.2f}"
+              + ''.join(f"{day['stages'].get(stage, 0) / 3600:>17.2f}" for stage in stages))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Voice2Note whisper model server
+
+Keeps whisper.cpp models resident by running WHISPER_SERVER_INSTANCES
+copies of whisper-server on consecutive local ports, starting at
+WHISPER_SERVER_PORT. Each instance loads the model once and then accepts
+WAV files over HTTP, so jobs skip the per-run model load of whisper-cli.
+Instances are health-checked and restarted if they crash or stop
+answering. Transcriber uses the instances automatically while they are up
+and falls back to whisper-cli when they are not.
+
+Off by default (WHISPER_SERVER_INSTANCES=0): a resident model answers only
+when the whole file is done, so those jobs report no live progress and
+can't start notes during transcription.
+
+Usage:
+    python whisper_server.py [--instances N] [--threads N]
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from config import Config
+from processors.whisper_client import check_health
+from processors.subprocess_utils import terminate_process_group
+
+
+class ModelServer:
+    """One supervised whisper-server process"""
+
+    def __init__(self, port, threads, model_path=None, server_path=None, host=None):
+        self.port = port
+        self.threads = threads
+        self.model_path = model_path or Config.WHISPER_MODEL_PATH
+        self.server_path = server_path or Config.WHISPER_SERVER_PATH
+        self.host = host or Config.WHISPER_SERVER_HOST
+        self.proc = None
+        self.started_at = None
+        self.failed_checks = 0
+        self.restarts = 0
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        cmd = [
+            self.server_path,
+            '-m', self.model_path,
+            '--host', self.host,
+            '--port', str(self.port),
+            '--threads', str(self.threads),
+        ]
+        print(f"Starting whisper-server on {self.url}: {' '.join(cmd)}")
+        self.proc = subprocess.Popen(cmd, start_new_session=True)
+        self.started_at = time.monotonic()
+        self.failed_checks = 0
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            terminate_process_group(self.proc, grace_period=5)
+
+    def restart(self):
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+
+class ModelServerSupervisor:
+    """Starts the instances, health-checks them and restarts any that crash or hang"""
+
+    def __init__(self, instances=None, threads=None, base_port=None, health_interval=None,
+                 start_timeout=120, max_failed_checks=3, **server_kwargs):
+        instances = instances if instances is not None else Config.WHISPER_SERVER_INSTANCES
+        threads = threads or Config.WHISPER_SERVER_THREADS
+        base_port = base_port or Config.WHISPER_SERVER_PORT
+        self.servers = [ModelServer(base_port + i, threads, **server_kwargs) for i in range(instances)]
+        self.health_interval = health_interval or Config.WHISPER_SERVER_HEALTH_INTERVAL
+        self.start_timeout = start_timeout  # Seconds a model may take to load before it counts as hung
+        self.max_failed_checks = max_failed_checks
+        self.stopping = threading.Event()
+
+    def check(self, server):
+        """Health-check one instance and restart it if it died or stopped responding"""
+        if server.proc.poll() is not None:
+            print(f"❌ whisper-server on port {server.port} exited with code {server.proc.returncode}, restarting")
+            self._restart_with_backoff(server)
+            return
+
+        state = check_health(server.url)
+        if state == 'ok':
+            if server.failed_checks:
+                print(f"✓ whisper-server on port {server.port} is healthy again")
+            server.failed_checks = 0
+            return
+        if state == 'loading' and time.monotonic() - server.started_at < self.start_timeout:
+            return
+
+        server.failed_checks += 1
+        print(f"Warning: whisper-server on port {server.port} failed health check "
+              f"({server.failed_checks}/{self.max_failed_checks})")
+        if server.failed_checks >= self.max_failed_checks:
+            print(f"❌ whisper-server on port {server.port} is unresponsive, restarting")
+            self._restart_with_backoff(server)
+
+    def _restart_with_backoff(self, server):
+        # Back off on crash loops (e.g. a missing model) instead of spinning
+        delay = min(30, 2 ** min(server.restarts, 5)) if server.restarts else 0
+        if delay and self.stopping.wait(delay):
+            return
+        server.restart()
+
+    def start(self):
+        for server in self.servers:
+            server.start()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run_forever(self):
+        self.start()
+        print(f"✓ Supervising {len(self.servers)} whisper-server instance(s)")
+        try:
+            while not self.stopping.wait(self.health_interval):
+                for server in self.servers:
+                    if self.stopping.is_set():
+                        break
+                    self.check(server)
+        finally:
+            for server in self.servers:
+                server.stop()
+            print("whisper-server instances stopped")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Voice2Note whisper model server')
+    parser.add_argument('--instances', type=int, default=None,
+                        help=f'Resident models to run (default: {Config.WHISPER_SERVER_INSTANCES})')
+    parser.add_argument('--threads', type=int, default=None,
+                        help=f'Threads per instance (default: {Config.WHISPER_SERVER_THREADS})')
+    args = parser.parse_args()
+
+    if not os.path.exists(Config.WHISPER_SERVER_PATH):
+        raise SystemExit(f"whisper-server not found at {Config.WHISPER_SERVER_PATH} "
+                         f"(build whisper.cpp with its examples: cmake --build build --target whisper-server)")
+
+    supervisor = ModelServerSupervisor(instances=args.instances, threads=args.threads)
+    if not supervisor.servers:
+        raise SystemExit("No instances to run: set WHISPER_SERVER_INSTANCES (or pass --instances)")
+
+    def handle_signal(signum, frame):
+        print("Stopping whisper-server instances...")
+        supervisor.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    supervisor.run_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+"""
+Voice2Note processing worker
+
+Pulls jobs from the database-backed queue and runs them through the
+extract -> transcribe -> generate pipeline, with a separate concurrency
+limit per stage so jobs overlap across stages. Run one or more of these next to
+the web server; queued work survives restarts of either side.
+
+Usage:
+    python worker.py [--concurrency N]
+"""
+
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+import metrics
+from config import Config
+from database.db_manager import DatabaseManager
+from database.partial_notes_recorder import PartialNotesRecorder
+from database.stage_timeline import StageTimeline
+from database.status_reporter import StatusReporter
+from processors.video_handler import VideoHandler
+from processors.transcriber import Transcriber
+from processors.note_generator import NoteGenerator
+from processors.llm_cache import LLMResponseCache
+from processors.llm_client import LLMUnavailable
+from processors.streaming_notes import StreamingNotes
+
+# Initialize components
+Config.init_app()
+db = DatabaseManager()
+video_handler = VideoHandler()
+transcriber = Transcriber()
+note_generator = NoteGenerator(cache=LLMResponseCache(db) if Config.LLM_CACHE_ENABLED else None)
+
+
+class StageLimiter:
+    """
+    Bounds how many jobs can be inside each pipeline stage at once
+
+    Downloads are I/O bound, transcription is CPU bound and note generation
+    waits on the network, so each stage gets its own limit. A job only holds
+    one stage slot at a time, which lets different jobs overlap (one
+    downloading while another transcribes) without oversubscribing cores.
+    """
+
+    def __init__(self, limits):
+        self.limits = dict(limits)
+        self.slots = {stage: threading.BoundedSemaphore(limit) for stage, limit in self.limits.items()}
+        self.active = {stage: 0 for stage in self.limits}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, stage, cancel_event, on_stage=None):
+        """
+        Hold a slot in a stage for the duration of the block, giving up if cancelled
+
+        A wait for the slot is reported to on_stage as a wait_<stage> event (see metrics.stage).
+        """
+        semaphore = self.slots[stage]
+        if not semaphore.acquire(blocking=False):
+            print(f"Waiting for a free {stage} slot ({self.limits[stage]} in use)...")
+            with metrics.STAGE_WAITING.track(stage=stage), metrics.stage(f'wait_{stage}', on_stage):
+                while not semaphore.acquire(timeout=0.5):
+                    if cancel_event.is_set():
+                        raise Exception("Processing cancelled by user")
+
+        with self.lock:
+            self.active[stage] += 1
+        metrics.STAGE_ACTIVE.inc(stage=stage)
+        try:
+            yield
+        finally:
+            metrics.STAGE_ACTIVE.dec(stage=stage)
+            with self.lock:
+                self.active[stage] -= 1
+            semaphore.release()
+
+    def snapshot(self):
+        """Return the number of jobs currently inside each stage"""
+        with self.lock:
+            return dict(self.active)
+
+
+stages = StageLimiter({
+    'download': Config.DOWNLOAD_CONCURRENCY,
+    'transcribe': Config.TRANSCRIBE_CONCURRENCY,
+    'generate': Config.GENERATE_CONCURRENCY,
+})
+
+# Maps process_video_background's final status to the job's final state
+JOB_STATES = {
+    'completed': 'done',
+    'cancelled': 'cancelled',
+    'failed': 'failed',
+}
+
+
+def record_job(final_status, started):
+    """Count a finished job and its duration for /metrics; returns final_status"""
+    metrics.JOBS.inc(status=final_status)
+    metrics.JOB_SECONDS.observe(time.monotonic() - started, status=final_status)
+    return final_status
+
+
+def notes_event_details(notes, metadata):
+    """bytes and audio_seconds of a notes timeline event"""
+    return {'bytes': len(notes.encode('utf-8')), 'audio_seconds': metadata.get('duration') or None}
+
+
+def transcription_progress_reporter(video_id, status, start=40, end=55):
+    """
+    Build a Transcriber progress callback that maps whisper's percent complete
+    onto the job's transcribing progress band (writes are coalesced by the
+    StatusReporter)
+    """
+    last = {'progress': start}
+
+    def report(percent, rtf):
+        progress = start + int((end - start) * percent / 100)
+        if progress <= last['progress']:
+            return
+        last['progress'] = progress
+
+        status.update('transcribing', progress=progress)
+        speed = f"{1 / rtf:.1f}x real time" if rtf else "starting"
+        print(f"Transcribing video {video_id}: {percent:.0f}% ({speed})")
+
+    return report
+
+
+def generate_notes_waiting_for_llm(video_id, transcript_result, metadata, streaming_notes, partial_notes, status,
+                                   cancel_event, timeline, use_cache=True):
+    """
+    Generate a job's notes, parking the job while the model is unreachable
+
+    When no model backend can be reached (their circuit breakers are open), the job
+    shows 'waiting_llm', gives its generate slot back and waits for the
+    breaker to let requests through again, for at most LLM_WAIT_MAX_SECONDS
+    in total. Then generation starts over; chunk notes that were finished
+    come back from the response cache (unless use_cache is False). Each
+    attempt is a notes event on the timeline and each wait a wait_llm event.
+    """
+    deadline = time.monotonic() + Config.LLM_WAIT_MAX_SECONDS
+    while True:
+        try:
+            # Chunk notes already underway only need the tail and the merge; else generate from scratch
+            notes = None
+            if streaming_notes is not None:
+                with timeline.stage('notes') as event:
+                    event['detail'] = 'streamed'
+                    notes = streaming_notes.finish()
+                    if notes is None:
+                        event['stage'] = None  # Never started; generated below instead
+                    else:
+                        event.update(notes_event_details(notes, metadata))
+            if notes is None:
+                with stages.slot('generate', cancel_event, on_stage=timeline.record), \
+                        timeline.stage('notes') as event:
+                    notes = note_generator.generate_notes(transcript_result['transcript_text'], metadata,
+                                                           cancel_event=cancel_event,
+                                                           use_cache=use_cache,
+                                                           timestamps=transcript_result.get('timestamps'),
+                                                           partial=partial_notes)
+                    event.update(notes_event_details(notes, metadata))
+            return notes
+        except LLMUnavailable as e:
+            streaming_notes = None  # finish() closed it; the retry generates from the transcript
+            remaining = deadline - time.monotonic()
+            if cancel_event.is_set():
+                raise Exception("Processing cancelled by user")
+            if remaining <= 0:
+                raise Exception(f"Model unavailable for {Config.LLM_WAIT_MAX_SECONDS}s: {e}")
+
+            print(f"Model unavailable ({e}); video {video_id} waiting up to {remaining:.0f}s for it")
+            status.update('waiting_llm', progress=80)
+            with timeline.stage('wait_llm'):
+                available = note_generator.llm.wait_until_available(cancel_event, timeout=remaining)
+            if not available:
+                if cancel_event.is_set():
+                    raise Exception("Processing cancelled by user")
+                raise Exception(f"Model unavailable for {Config.LLM_WAIT_MAX_SECONDS}s: {e}")
+            print(f"Retrying notes for video {video_id}")
+            status.update('generating', progress=80)
+
+
+def process_video_background(video_id, source, is_file, file_path, cancel_event, content_key=None,
+                             regenerate=False):
+    """
+    Background task to process video
+
+    Args:
+        content_key: Optional artifact cache key; a stored result is reused
+            instead of processing, and a new result is stored under it
+        regenerate: True to process from scratch: no stored result is reused
+            and the notes are not answered from the LLM response cache
+
+    Returns:
+        str: final processing status ('completed', 'cancelled' or 'failed')
+    """
+    metadata = None
+    streaming_notes = None
+    started = time.monotonic()
+    status = StatusReporter(db, video_id, window=Config.PROGRESS_UPDATE_INTERVAL, cancel_event=cancel_event)
+    timeline = StageTimeline(db, video_id)
+    try:
+        # Identical content may have finished since this job was queued
+        artifact = db.get_artifact(content_key) if content_key and not regenerate else None
+        if artifact:
+            print(f"✓ Reusing stored transcript and notes for {content_key} [Video ID: {video_id}]")
+            db.apply_artifact(video_id, artifact, title=source if is_file else None)
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+            record_job('reused', started)  # Counted apart from jobs that ran the pipeline
+            return 'completed'
+
+        # Step 1: Extract audio (10-30%)
+        print(f"\n{'='*50}")
+        print(f"STEP 1: Extracting audio [Video ID: {video_id}]")
+        print(f"{'='*50}")
+
+        status.update('extracting', progress=10)
+
+        # Check for cancellation
+        if cancel_event.is_set():
+            raise Exception("Processing cancelled by user")
+
+        # Progress: Processing source
+        status.update('extracting', progress=15)
+
+        # Metadata from an earlier run of the same video, in case the download doesn't report it
+        cached_metadata = None
+        if content_key and content_key.startswith('youtube:'):
+            cached_metadata = db.get_video_metadata(content_key, Config.METADATA_CACHE_TTL)
+
+        with stages.slot('download', cancel_event, on_stage=timeline.record):
+            metadata = video_handler.process_source(
+                source,
+                is_file=is_file,
+                file_path=file_path,
+                cancel_event=cancel_event,
+                cached_metadata=cached_metadata,
+                on_stage=timeline.record
+            )
+
+        if metadata.get('metadata_fresh') and content_key and content_key.startswith('youtube:'):
+            db.save_video_metadata(content_key, metadata, Config.METADATA_CACHE_TTL)
+
+        # Progress: Audio extracted
+        status.update('extracting', progress=25)
+
+        # Check for cancellation
+        if cancel_event.is_set():
+            video_handler.cleanup_audio(metadata.get('audio_path'))
+            raise Exception("Processing cancelled by user")
+
+        # Update video metadata
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE videos
+            SET title = ?, creator = ?, duration = ?, source_url = ?
+            WHERE id = ?
+        ''', (metadata['title'], metadata.get('channel'), metadata.get('duration'),
+              metadata.get('url'), video_id))
+        conn.commit()
+        conn.close()
+
+        # Progress: Metadata saved
+        status.update('extracting', progress=28)
+
+        status.update('transcribing', progress=30)
+
+        # Step 2: Transcribe audio (30-60%)
+        print(f"\n{'='*50}")
+        print(f"STEP 2: Transcribing audio [Video ID: {video_id}]")
+        print(f"{'='*50}")
+
+        # Check for cancellation
+        if cancel_event.is_set():
+            video_handler.cleanup_audio(metadata['audio_path'])
+            raise Exception("Processing cancelled by user")
+
+        # Progress: Loading transcription model
+        status.update('transcribing', progress=35)
+
+        # Progress: Starting transcription
+        status.update('transcribing', progress=40)
+
+        # Notes are saved as they stream in, for the notes page and in case this attempt dies
+        partial_notes = PartialNotesRecorder(db, video_id, window=Config.NOTES_PARTIAL_FLUSH_SECONDS)
+        # Long transcripts get their chunk notes started while later audio is still being transcribed
+        if Config.NOTES_DURING_TRANSCRIPTION:
+            streaming_notes = StreamingNotes(note_generator, metadata, cancel_event=cancel_event,
+                                             partial=partial_notes, use_cache=not regenerate,
+                                             slot=lambda: stages.slot('generate', cancel_event))
+
+        with stages.slot('transcribe', cancel_event, on_stage=timeline.record):
+            transcript_result = transcriber.transcribe(
+                metadata['audio_path'],
+                cancel_event=cancel_event,
+                progress_callback=transcription_progress_reporter(video_id, status),
+                on_segments=streaming_notes.add if streaming_notes else None,
+                on_stage=timeline.record
+            )
+        transcript_text = transcript_result['transcript_text']
+        trim = transcript_result.get('silence_trim')
+        if trim:
+            print(f"✓ Skipped {trim['skipped_percent']:.1f}% of the audio as silence "
+                  f"[Video ID: {video_id}], saving about {trim['time_saved_seconds']:.0f}s of transcription")
+
+        # Progress: Transcription complete
+        status.update('transcribing', progress=55)
+
+        # Check for cancellation
+        if cancel_event.is_set():
+            video_handler.cleanup_audio(metadata['audio_path'])
+            raise Exception("Processing cancelled by user")
+
+        # Save transcript
+        db.create_transcript(
+            video_id,
+            transcript_text,
+            transcript_result.get('timestamps')
+        )
+
+        # Progress: Transcript saved
+        status.update('transcribing', progress=58)
+
+        status.update('generating', progress=60)
+
+        # Step 3: Generate notes (60-100%)
+        print(f"\n{'='*50}")
+        print(f"STEP 3: Generating notes [Video ID: {video_id}]")
+        print(f"{'='*50}")
+
+        # Check for cancellation
+        if cancel_event.is_set():
+            video_handler.cleanup_audio(metadata['audio_path'])
+            raise Exception("Processing cancelled by user")
+
+        # Progress: Analyzing transcript
+        status.update('generating', progress=70)
+
+        # Progress: Generating notes
+        status.update('generating', progress=80)
+
+        try:
+            notes = generate_notes_waiting_for_llm(video_id, transcript_result, metadata, streaming_notes,
+                                                   partial_notes, status, cancel_event, timeline,
+                                                   use_cache=not regenerate)
+        finally:
+            partial_notes.flush()
+        if partial_notes.first_write_at is not None:
+            print(f"✓ First notes visible {partial_notes.first_write_at - started:.1f}s into the job, "
+                  f"{partial_notes.writes} partial saves [Video ID: {video_id}]")
+        if note_generator.cache is not None:
+            cache_stats = note_generator.cache.stats()
+            print(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses this run, "
+                  f"{cache_stats['entries']} responses ({cache_stats['bytes'] / 1048576:.1f} MB)")
+        if len(note_generator.llm.backends) > 1:
+            llm_stats = note_generator.llm.stats()
+            print(f"LLM backends: {llm_stats['hedges']} hedged requests ({llm_stats['hedge_wins']} answered by the "
+                  f"hedge), {llm_stats['fallbacks']} fallbacks this run")
+
+        # Progress: Formatting notes
+        status.update('generating', progress=90)
+
+        # Check for cancellation
+        if cancel_event.is_set():
+            video_handler.cleanup_audio(metadata['audio_path'])
+            raise Exception("Processing cancelled by user")
+
+        # Save notes
+        db.create_notes(video_id, notes)
+        db.delete_partial_notes(video_id)
+
+        # Keep the result for repeat submissions of the same content
+        if content_key:
+            db.save_artifact(content_key, metadata, transcript_text,
+                             transcript_result.get('timestamps'), notes)
+
+        # Progress: Saving notes
+        status.update('generating', progress=95)
+
+        status.update('completed', progress=100)
+
+        # Cleanup
+        video_handler.cleanup_audio(metadata['audio_path'])
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+
+        print(f"\n{'='*50}")
+        print(f"✓ Processing completed successfully! [Video ID: {video_id}]")
+        print(f"{'='*50}\n")
+
+        return record_job('completed', started)
+
+    except Exception as e:
+        error_msg = str(e)
+        is_cancelled = "cancelled" in error_msg.lower()
+
+        print(f"\n❌ {'Cancelled' if is_cancelled else 'Error'} processing video {video_id}: {error_msg}")
+        if not is_cancelled:
+            traceback.print_exc()
+
+        # Stop chunk notes started during transcription
+        if streaming_notes is not None:
+            streaming_notes.close()
+
+        # Don't leave the WAV behind when a later stage was interrupted
+        if metadata and metadata.get('audio_path'):
+            video_handler.cleanup_audio(metadata['audio_path'])
+
+        final_status = 'cancelled' if is_cancelled else 'failed'
+        status.update(
+            final_status,
+            progress=0,
+            error_message=error_msg
+        )
+        return record_job(final_status, started)
+
+
+class JobWorker:
+    """Claims queued jobs and processes them on a small pool of threads"""
+
+    def __init__(self, worker_id=None, concurrency=None, lease_seconds=None,
+                 max_attempts=None, poll_interval=None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency or Config.WORKER_CONCURRENCY
+        self.lease_seconds = lease_seconds or Config.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or Config.JOB_MAX_ATTEMPTS
+        self.poll_interval = poll_interval or Config.JOB_POLL_INTERVAL
+
+        # Jobs currently running in this worker
+        self.active_jobs = {}  # {job_id: {'job': job_dict, 'thread': thread_obj, 'cancel': threading.Event()}}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def start(self):
+        """Run the worker loop in a daemon thread (used by the development server)"""
+        thread = threading.Thread(target=self.run_forever, name='job-worker', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Stop claiming new jobs; running jobs are allowed to finish"""
+        self.stopping.set()
+
+    def run_forever(self):
+        """Main loop: heartbeat active jobs, reap dead ones and claim new work"""
+        print(f"✓ Worker {self.worker_id} started (concurrency: {self.concurrency})")
+
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+        metrics.registry.start()
+
+        while not self.stopping.is_set():
+            try:
+                self._reap_expired()
+                claimed = self._claim_available()
+            except Exception as e:
+                print(f"❌ Worker loop error: {e}")
+                traceback.print_exc()
+                claimed = False
+
+            # Poll again right away while there is work and free capacity
+            if not claimed:
+                self.stopping.wait(self.poll_interval)
+
+        # Drain: let running jobs finish before returning
+        while True:
+            with self.lock:
+                threads = [entry['thread'] for entry in self.active_jobs.values()]
+            if not threads:
+                break
+            for thread in threads:
+                thread.join()
+
+        print(f"✓ Worker {self.worker_id} stopped")
+
+    def _claim_available(self):
+        """Claim jobs until this worker is at capacity; returns True if any were claimed"""
+        claimed = False
+        while not self.stopping.is_set():
+            with self.lock:
+                if len(self.active_jobs) >= self.concurrency:
+                    break
+
+            job = db.claim_job(self.worker_id, self.lease_seconds, self.max_attempts)
+            if not job:
+                break
+
+            self._start_job(job)
+            claimed = True
+        return claimed
+
+    def _start_job(self, job):
+        """Run a claimed job on its own thread"""
+        cancel_event = threading.Event()
+        thread = threading.Thread(
+            target=self._run_job,
+            args=(job, cancel_event),
+            name=f"job-{job['id']}",
+            daemon=True
+        )
+
+        with self.lock:
+            self.active_jobs[job['id']] = {
+                'job': job,
+                'thread': thread,
+                'cancel': cancel_event
+            }
+
+        print(f"✓ Claimed job {job['id']} for video {job['video_id']} (attempt {job['attempts']})")
+        thread.start()
+
+    def _run_job(self, job, cancel_event):
+        """Process a single job and record its outcome"""
+        try:
+            final_status = process_video_background(
+                job['video_id'],
+                job['source'],
+                bool(job['is_file']),
+                job['file_path'],
+                cancel_event,
+                content_key=job.get('content_key'),
+                regenerate=bool(job.get('regenerate'))
+            )
+            db.finish_job(job['id'], JOB_STATES.get(final_status, 'failed'))
+
+            if final_status == 'completed':
+                self._complete_attached(job)
+        except Exception as e:
+            print(f"❌ Job {job['id']} crashed: {e}")
+            traceback.print_exc()
+            db.finish_job(job['id'], 'failed')
+        finally:
+            with self.lock:
+                self.active_jobs.pop(job['id'], None)
+
+    def _complete_attached(self, job):
+        """Complete jobs that were waiting on this one from its stored result"""
+        attached = db.get_attached_jobs(job['id'])
+        if not attached:
+            return
+
+        artifact = db.get_artifact(job['content_key'])
+        if not artifact:
+            db.promote_attached_jobs(job['id'])
+            return
+
+        for follower in attached:
+            db.apply_artifact(follower['video_id'], artifact,
+                              title=follower['source'] if follower['is_file'] else None)
+            db.finish_job(follower['id'], 'done')
+            if follower['file_path'] and os.path.exists(follower['file_path']):
+                os.remove(follower['file_path'])
+            print(f"✓ Completed attached video {follower['video_id']} from job {job['id']}")
+
+    def _heartbeat_loop(self):
+        """Pick up cancellation requests quickly and renew leases of running jobs"""
+        lease_interval = min(5, max(1, self.lease_seconds // 3))
+        last_renewal = 0
+        while True:
+            with self.lock:
+                entries = dict(self.active_jobs)
+
+            if entries:
+                # Cheap read every tick so a cancelled (or deleted) job stops within a second
+                try:
+                    for job_id in db.get_cancel_requested_jobs(list(entries)):
+                        entries[job_id]['cancel'].set()
+                except Exception as e:
+                    print(f"Warning: Failed to check for cancelled jobs: {e}")
+
+                if time.monotonic() - last_renewal >= lease_interval:
+                    for job_id, entry in entries.items():
+                        try:
+                            lease = db.renew_job_lease(job_id, self.worker_id, self.lease_seconds)
+                        except Exception as e:
+                            print(f"Warning: Failed to renew lease for job {job_id}: {e}")
+                            continue
+
+                        # The lease was lost to another worker
+                        if lease is None:
+                            entry['cancel'].set()
+                    last_renewal = time.monotonic()
+
+            time.sleep(Config.JOB_CANCEL_POLL_INTERVAL)
+
+    def _reap_expired(self):
+        """Fail jobs that exhausted their attempts on workers that went away"""
+        for video_id in db.reap_expired_jobs(self.max_attempts):
+            db.update_processing_status(video_id, 'failed', progress=0,
+                                        error_message='Worker stopped responding')
+            print(f"❌ Job for video {video_id} failed after {self.max_attempts} attempts")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Voice2Note processing worker')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help=f'Jobs to run at once (default: {Config.WORKER_CONCURRENCY})')
+    args = parser.parse_args()
+
+    worker = JobWorker(concurrency=args.concurrency)
+
+    def handle_signal(signum, frame):
+        if worker.stopping.is_set():
+            # Second signal: exit now, leases expire and jobs are picked up again
+            print("Forcing worker shutdown")
+            os._exit(1)
+        print("Stopping worker after running jobs finish (signal again to force)...")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    worker.run_forever()
+
+
+if __name__ == '__main__':
+    main()